@@ -1,58 +1,241 @@
+import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, current_user
 from werkzeug.security import generate_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from models.models import db, User # Import models correctly
+from models.database import configure_database, init_database
+from models.score_writer import score_writer
+from models.identity_cache import identity_cache
+from models.attempt_sessions import attempt_sessions
+from models.autosave import autosave
+from models.catalog import catalog
+from models.item_analysis import item_analysis
+from models.migrations import run_migrations, explain_hot_queries
+import click
 
-app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
-app.config['SECRET_KEY'] = "ade26f904f1afa3c56fafadc438b8239"
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quizmasterdb.sqlite3'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db.init_app(app)  # Initialize database with app
+def create_app(config=None):
+    """Build the application.
 
-# Import routes after initializing the app
-from controllers.routes import routes_blueprint
-from controllers.auth_routes import auth_blueprint
-from controllers.admin_routes import admin_blueprint
-from controllers.user_routes import user_blueprint
+    Settings are applied in order: the defaults below, then QUIZMASTER_* environment
+    variables (e.g. QUIZMASTER_SECRET_KEY, QUIZMASTER_ASYNC_READS=true), then ``config``.
+    See wsgi.py and asgi.py for the production entry points.
+    """
+    app = Flask(__name__)
 
-# Register Blueprints
-app.register_blueprint(routes_blueprint)
-app.register_blueprint(auth_blueprint, url_prefix="/auth")
-app.register_blueprint(admin_blueprint, url_prefix="/admin")
-app.register_blueprint(user_blueprint, url_prefix="/user")
+    app.config['SECRET_KEY'] = "ade26f904f1afa3c56fafadc438b8239"
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quizmasterdb.sqlite3'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-@app.context_processor
-def inject_user():
-    return dict(current_user=current_user)
+    # Write-behind mode for quiz submissions: Scores inserts are spooled and flushed in batches
+    app.config['SCORES_WRITE_BEHIND'] = False
+    app.config['SCORES_WRITE_BEHIND_BATCH_SIZE'] = 200
+    app.config['SCORES_WRITE_BEHIND_INTERVAL'] = 0.5  # seconds
 
-# Login Manager
-login_manager = LoginManager(app)
-login_manager.login_view = 'auth.login'
+    # Password hashing runs in a process pool; logins are throttled per IP and per account.
+    # Changing PASSWORD_HASH_METHOD rehashes each user's password on their next login.
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256'
+    app.config['PASSWORD_HASH_MAX_QUEUE'] = 64
+    # Only failed logins count. A whole exam lab may share one IP (NAT), so the per-IP limit is
+    # generous; raise it further for very large sites behind one address.
+    app.config['LOGIN_LIMIT_PER_IP'] = 100  # failed attempts per LOGIN_LIMIT_WINDOW
+    app.config['LOGIN_LIMIT_PER_ACCOUNT'] = 10
+    app.config['LOGIN_LIMIT_WINDOW'] = 60  # seconds
+
+    # Number of reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted
+    # (werkzeug ProxyFix). 0: use the socket peer, which behind a proxy is the proxy itself.
+    app.config['TRUSTED_PROXIES'] = 0
+
+    # Open quiz attempts are tracked in memory; submissions later than the quiz duration
+    # plus this many seconds are rejected
+    app.config['ATTEMPT_GRACE_SECONDS'] = 30
+    app.config['ATTEMPT_SWEEP_INTERVAL'] = 60  # seconds between sweeps of expired attempts
+
+    # Autosaved answers are coalesced per attempt and upserted in batches
+    app.config['AUTOSAVE_FLUSH_INTERVAL'] = 2.0  # seconds
+
+    # Item analysis on the manage-questions page is recomputed at most this often while a
+    # quiz gets new attempts (the item-analysis CLI command always recomputes)
+    app.config['ITEM_ANALYSIS_REFRESH_INTERVAL'] = 60  # seconds
+
+    # CSV score exports are streamed; Parquet ones are built inside the request, so the web
+    # view refuses more attempts than this (`flask export-scores` has no limit)
+    app.config['SCORES_EXPORT_PARQUET_MAX_ROWS'] = 200000
+
+    # Subjects, chapters and quizzes are read from an in-process snapshot; each worker checks
+    # the catalog version at most this often and rebuilds the snapshot when it moved
+    app.config['CATALOG_CHECK_INTERVAL'] = 1.0  # seconds
+
+    # Serve the read-heavy user pages (dashboard, quiz result) from async views on an async
+    # database driver; needs asgiref plus aiosqlite or asyncpg (see controllers/async_reads.py)
+    app.config['ASYNC_READS'] = False
+
+    # Max SQL statements per user/admin request; set in tests to catch N+1 queries
+    app.config['SQL_QUERY_BUDGET'] = None
+
+    # Request latency, SQL and template timings at /metrics (Prometheus text format), for
+    # scrapers sending METRICS_TOKEN as a bearer token (no token: anyone who can reach it).
+    # PROFILING_ENABLED lets admins profile a single request with ?_profile=1.
+    app.config['METRICS_ENABLED'] = False
+    app.config['METRICS_TOKEN'] = None
+    app.config['PROFILING_ENABLED'] = False
+    app.config['LOG_LEVEL'] = 'INFO'
+
+    # Static assets: `flask vendor-assets` downloads third-party files into static/vendor and
+    # `flask build-assets` writes fingerprinted, precompressed copies (default: static/dist)
+    # that asset_url() in templates points to. Text responses of at least COMPRESS_MIN_SIZE
+    # bytes are gzipped on the fly (None turns that off).
+    app.config['ASSETS_BUILD_DIR'] = None
+    app.config['ASSETS_CDN_FALLBACK'] = False  # development only: load missing vendored files from their CDN
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_LEVEL'] = 6
+
+    app.config.from_prefixed_env("QUIZMASTER")
+    if config:
+        app.config.update(config)
+
+    logging.basicConfig(level=app.config['LOG_LEVEL'], format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'], x_proto=app.config['TRUSTED_PROXIES'])
+
+    configure_database(app)  # DATABASE_URL / pool sizing from the environment
+    db.init_app(app)  # Initialize database with app
+    init_database(app)  # SQLite pragmas (WAL, busy_timeout, ...) on every connection
+    score_writer.init_app(app)
+    attempt_sessions.init_app(app)
+    autosave.init_app(app)
+    catalog.init_app(app)
+    item_analysis.init_app(app)
+
+    # Import routes after initializing the app
+    from controllers.routes import routes_blueprint
+    from controllers.auth_routes import auth_blueprint
+    from controllers.admin_routes import admin_blueprint
+    from controllers.user_routes import user_blueprint
+    from controllers.query_budget import init_query_budget
+    from controllers.instrumentation import init_instrumentation
+    from controllers.compression import init_compression
+    from controllers.assets import assets
+    from controllers.password_hashing import password_hasher, login_throttle
+
+    # Register Blueprints
+    app.register_blueprint(routes_blueprint)
+    app.register_blueprint(auth_blueprint, url_prefix="/auth")
+    app.register_blueprint(admin_blueprint, url_prefix="/admin")
+    app.register_blueprint(user_blueprint, url_prefix="/user")
+
+    init_query_budget(app)
+    init_instrumentation(app)
+    init_compression(app)
+    assets.init_app(app)
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+
+    if app.config['ASYNC_READS']:
+        from controllers.async_reads import init_async_reads
+        init_async_reads(app)
+
+    @app.context_processor
+    def inject_user():
+        return dict(current_user=current_user)
+
+    # Login Manager
+    login_manager = LoginManager(app)
+    login_manager.login_view = 'auth.login'
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        # Served from the short-TTL identity cache; hits the database at most once per TTL
+        return identity_cache.get(int(user_id))
+
+    register_commands(app)
+    return app
+
+
+def init_db():
+    """Create tables, apply migrations and make sure the default admin exists."""
+    db.create_all()
+
+    # Bring existing databases up to date (indexes, full-text search, ...)
+    for migration in run_migrations():
+        logger.info(f"Applied migration {migration}")
+
+    # Create default admin if not exists
+    if not User.query.filter_by(username='admin').first():
+        admin = User(
+            username='admin',
+            email='admin@example.com',
+            password=generate_password_hash('admin123', method='pbkdf2:sha256'),
+            full_name='Administrator',
+            qualification='Admin',
+            dob='N/A',
+            is_admin=True
+        )
+        db.session.add(admin)
+        db.session.commit()
+        logger.info("Admin account created: Username - admin, Password - admin123 (hashed)")
+
+
+# Database maintenance commands
+def register_commands(app):
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create tables, apply migrations and create the default admin (run once per deploy)."""
+        init_db()
+
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Create missing tables and apply pending schema migrations."""
+        db.create_all()
+        applied = run_migrations()
+        for migration in applied:
+            click.echo(f"Applied migration {migration}")
+        if not applied:
+            click.echo("Database schema is up to date")
+
+    @app.cli.command("check-indexes")
+    def check_indexes_command():
+        """Fail if any hot query is planned as a full table scan or a temp-b-tree sort."""
+        if db.engine.dialect.name != "sqlite":
+            raise click.ClickException("check-indexes uses EXPLAIN QUERY PLAN and only supports SQLite")
+
+        failed = False
+        for name, (plan, problems) in explain_hot_queries().items():
+            click.echo(f"{'FAIL' if problems else 'ok  '} {name}")
+            for step in plan:
+                click.echo(f"       {step}")
+            failed = failed or bool(problems)
+        if failed:
+            raise click.ClickException("Some hot queries do not use an index")
+
+
+    @app.cli.command("vendor-assets")
+    def vendor_assets_command():
+        """Download the third-party CSS and JavaScript into static/vendor (commit the result)."""
+        from controllers.assets import vendor_assets
+        for path in vendor_assets(app.static_folder):
+            click.echo(f"Downloaded {path}")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Write fingerprinted, precompressed copies of static/ and their manifest (run once per deploy)."""
+        from controllers.assets import build_assets, assets
+        try:
+            manifest = build_assets(app.static_folder, assets.build_dir)
+        except FileNotFoundError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Built {len(manifest)} assets into {assets.build_dir}")
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
 
 if __name__ == '__main__':
+    # Development server only (reloader and debugger on); see wsgi.py for production
+    app = create_app()
     with app.app_context():
-        db.create_all()  
-
-        # Create default admin if not exists
-        if not User.query.filter_by(username='admin').first():
-            admin = User(
-                username='admin',
-                email='admin@example.com',
-                password=generate_password_hash('admin123', method='pbkdf2:sha256'),
-                full_name='Administrator',
-                qualification='Admin',
-                dob='N/A',
-                is_admin=True
-            )
-            db.session.add(admin)
-            db.session.commit()
-            print("Admin account created: Username - admin, Password - admin123 (hashed)")
+        init_db()
 
     app.run(debug=True)
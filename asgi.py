@@ -0,0 +1,20 @@
+"""ASGI entry point, for ASGI servers such as uvicorn:
+
+    QUIZMASTER_ASYNC_READS=true uvicorn asgi:application --workers 4
+
+Flask is a WSGI framework, so the app is wrapped in a WSGI-to-ASGI adapter that runs each
+request on a thread pool; views stay the same. With QUIZMASTER_ASYNC_READS the dashboard
+and result pages run as async views on an async database driver.
+Needs `pip install uvicorn a2wsgi 'flask[async]' aiosqlite` (or asyncpg).
+"""
+from app import create_app
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    # asgiref's WsgiToAsgi runs every request on one shared thread and breaks under
+    # concurrent requests, so fall back to uvicorn's own (deprecated) adapter instead
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+
+app = create_app()
+application = WSGIMiddleware(app)
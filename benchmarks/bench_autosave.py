@@ -0,0 +1,118 @@
+"""Per-request cost of autosave for many concurrent students, and how many row writes it saves.
+
+Opens one attempt per student, then replays answer changes (with students revisiting
+questions) from --threads threads against POST /user/quiz/<id>/autosave. Compares the
+buffered endpoint with a direct upsert-and-commit per click.
+
+Usage: python benchmarks/bench_autosave.py [--students 5000] [--changes 10] [--threads 16]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+from app import create_app
+from models.models import db, User, Subject, Chapter, Quiz, Question, DraftAnswer
+from models.autosave import autosave
+
+QUESTIONS = 20
+
+app = create_app()
+
+
+def seed(students):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [{"id": i, "username": f"s{i}", "email": f"s{i}@x.com", "password": "x"} for i in range(1, students + 1)])
+        db.session.add(Subject(id=1, name="Bench"))
+        db.session.add(Chapter(id=1, name="Bench", subject_id=1))
+        db.session.add(Quiz(id=1, name="Bench", chapter_id=1, date=date.today(), duration=dtime(2, 0)))
+        db.session.execute(db.insert(Question), [{
+            "id": i, "quiz_id": 1, "question_statement": f"Q{i}", "option1": "a", "option2": "b",
+            "option3": "c", "option4": "d", "correct_option": 1,
+        } for i in range(1, QUESTIONS + 1)])
+        db.session.commit()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return f"p50 {pick(0.50):6.2f} ms   p99 {pick(0.99):6.2f} ms"
+
+
+def run(clients, changes, threads, post):
+    rng = random.Random(7)
+    work = [(client, f"q{rng.randint(1, QUESTIONS)}", str(rng.randint(1, 4))) for _ in range(changes) for client in clients]
+    samples, lock = [], threading.Lock()
+
+    def worker(items):
+        local = []
+        for client, question, option in items:
+            start = time.perf_counter()
+            post(client, question, option)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            samples.extend(local)
+
+    # Each thread owns a disjoint set of students, so one student's requests stay ordered
+    per_thread = [[item for item in work if id(item[0]) % threads == t] for t in range(threads)]
+    pool = [threading.Thread(target=worker, args=(items,)) for items in per_thread]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=10, help="answer changes per student")
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    seed(args.students)
+    clients = []
+    for user_id in range(1, args.students + 1):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+        client.get("/user/quiz/1/attempt")  # opens the attempt session
+        clients.append(client)
+
+    def buffered(client, question, option):
+        response = client.post("/user/quiz/1/autosave", json={"answers": {question: option}})
+        assert response.status_code == 200, response.status_code
+
+    samples, elapsed = run(clients, args.changes, args.threads, buffered)
+    autosave.flush()
+    stats = autosave.stats()
+    print(f"{args.students} students x {args.changes} changes, {args.threads} threads")
+    print(f"buffered autosave     {percentiles(samples)}   {len(samples) / elapsed:8.0f} req/s")
+    print(f"  {stats['received']} answers received, {stats['written']} rows upserted in {stats['flushes']} transactions (one per click otherwise)")
+
+    def direct(client, question, option):
+        # The naive alternative: one upsert and commit per click
+        with app.app_context():
+            db.session.execute(autosave._upsert(), [{
+                "user_id": id(client) % args.students + 1, "quiz_id": 1, "question_id": int(question[1:]),
+                "selected_option": int(option), "attempt_started": 0.0, "updated_at": datetime.utcnow(),
+            }])
+            db.session.commit()
+
+    samples, elapsed = run(clients, args.changes, args.threads, direct)
+    print(f"write per click       {percentiles(samples)}   {len(samples) / elapsed:8.0f} req/s (database only)")
+    with app.app_context():
+        print(f"draft rows in table: {DraftAnswer.query.count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Throughput of the vectorized batch grader (models/grading.py).
+
+Usage: python benchmarks/bench_batch_grading.py [--students 100000] [--questions 50]
+Target: at least 100k graded and stored submissions per minute.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask import Flask
+from models.models import db, User, Subject, Chapter, Quiz, Question, Scores
+from models.grading import grade_batch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=50)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmpdir, 'bench.sqlite3')}"
+    db.init_app(app)
+
+    rng = np.random.default_rng(0)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Subject(id=1, name="Bench"))
+        db.session.add(Chapter(id=1, name="Bench", subject_id=1))
+        db.session.add(Quiz(id=1, name="Bench", chapter_id=1, date=date.today(), duration=dtime(1, 0)))
+        db.session.execute(db.insert(Question), [
+            {"quiz_id": 1, "question_statement": f"Q{i}", "option1": "a", "option2": "b", "option3": "c",
+             "option4": "d", "correct_option": int(rng.integers(1, 5))}
+            for i in range(args.questions)
+        ])
+        db.session.execute(db.insert(User), [
+            {"username": f"u{i}", "email": f"u{i}@example.com", "password": "x"} for i in range(args.students)
+        ])
+        db.session.commit()
+
+        question_ids = [q.id for q in db.session.query(Question.id).order_by(Question.id)]
+        answers = rng.integers(1, 5, size=(args.students, args.questions))
+        submissions = [
+            (i + 1, {str(q_id): str(opt) for q_id, opt in zip(question_ids, row)})
+            for i, row in enumerate(answers.tolist())
+        ]
+
+        start = time.perf_counter()
+        scores = grade_batch(1, submissions)
+        elapsed = time.perf_counter() - start
+
+        assert db.session.query(Scores).count() == args.students
+        per_minute = args.students / elapsed * 60
+        print(f"graded {len(scores)} submissions x {args.questions} questions in {elapsed:.2f}s "
+              f"({per_minute:,.0f} submissions/minute)")
+
+
+if __name__ == "__main__":
+    main()
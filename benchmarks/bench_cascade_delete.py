@@ -0,0 +1,153 @@
+"""Deleting a large subject: ORM cascade (every row loaded and deleted one by one) vs the
+set-based, chunked delete of models/cascade_delete.py.
+
+Seeds one subject with --scores attempts (each with --answers per-question answers) plus
+a second subject that keeps receiving submissions, one Scores insert every 20 ms from a
+writer thread, while the first subject is deleted. Reports the delete time and the
+longest the writer had to wait for the database.
+
+Usage: python benchmarks/bench_cascade_delete.py [--scores 100000] [--answers 5] [--modes orm set]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TMPDIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(TMPDIR, "bench.sqlite3")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import create_app, init_db
+from models.models import db, User, Subject, Chapter, Quiz, Question, Scores, AttemptAnswer
+from models.aggregates import rebuild_all, users_with_attempts, rebuild_user_stats
+from models.cascade_delete import remove_subject, DELETE_CHUNK_SIZE
+
+USERS = 5000
+CHAPTERS = 5
+QUIZZES_PER_CHAPTER = 4
+QUESTIONS = 20
+WRITER_QUIZ = CHAPTERS * QUIZZES_PER_CHAPTER + 1  # the one quiz of the second subject
+
+app = create_app({"LOG_LEVEL": "WARNING"})
+
+
+def seed(scores, answers):
+    rng = random.Random(1)
+    with app.app_context():
+        init_db()
+        db.session.execute(db.insert(User), [{"id": i, "username": f"s{i}", "email": f"s{i}@x.com", "password": "x"} for i in range(2, USERS + 2)])
+        db.session.add_all([Subject(id=1, name="Large"), Subject(id=2, name="Live")])
+        db.session.flush()
+        db.session.execute(db.insert(Chapter), [{"id": c, "name": f"Chapter {c}", "subject_id": 1} for c in range(1, CHAPTERS + 1)]
+                           + [{"id": CHAPTERS + 1, "name": "Live", "subject_id": 2}])
+        db.session.execute(db.insert(Quiz), [{
+            "id": q, "name": f"Quiz {q}", "chapter_id": (q - 1) // QUIZZES_PER_CHAPTER + 1 if q < WRITER_QUIZ else CHAPTERS + 1,
+            "date": date.today(), "duration": dtime(1, 0),
+        } for q in range(1, WRITER_QUIZ + 1)])
+        db.session.execute(db.insert(Question), [{
+            "id": (q - 1) * QUESTIONS + n, "quiz_id": q, "question_statement": f"Q{n}", "option1": "a",
+            "option2": "b", "option3": "c", "option4": "d", "correct_option": 1,
+        } for q in range(1, WRITER_QUIZ + 1) for n in range(1, QUESTIONS + 1)])
+        db.session.execute(db.insert(Scores), [{
+            "id": i, "user_id": rng.randint(2, USERS + 1), "quiz_id": rng.randint(1, WRITER_QUIZ - 1), "total_scored": rng.randint(0, QUESTIONS),
+        } for i in range(1, scores + 1)])
+        for start in range(1, scores + 1, 20_000):
+            db.session.execute(db.insert(AttemptAnswer), [{
+                "scores_id": i, "question_id": n, "selected_option": rng.randint(1, 4),
+            } for i in range(start, min(start + 20_000, scores + 1)) for n in range(1, answers + 1)])
+        db.session.commit()
+        rebuild_all()
+        db.session.execute(db.text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        db.session.remove()
+        db.engine.dispose()
+    shutil.copy(DB_PATH, DB_PATH + ".seed")
+
+
+def orm_delete(subject_id):
+    # What session.delete(subject) did with non-passive "all, delete-orphan" cascades and
+    # SQLite foreign keys off: load every collection below the subject and delete each row
+    db.session.execute(db.text("PRAGMA foreign_keys = OFF"))  # before the first write: not in a transaction yet
+    subject = db.session.get(Subject, subject_id)
+    quiz_ids = [quiz.id for chapter in subject.chapters for quiz in chapter.quizzes]
+    affected_users = users_with_attempts(quiz_ids)
+    with db.session.no_autoflush:  # one flush at the end, as the cascade did
+        for chapter in subject.chapters:
+            for quiz in chapter.quizzes:
+                for score in quiz.scores:
+                    for answer in score.answers:
+                        db.session.delete(answer)
+                    db.session.delete(score)
+                for question in quiz.questions:
+                    db.session.delete(question)
+                db.session.delete(quiz)
+            db.session.delete(chapter)
+        db.session.delete(subject)
+    db.session.flush()
+    rebuild_user_stats(affected_users)
+    db.session.commit()
+    db.session.execute(db.text("PRAGMA foreign_keys = ON"))
+
+
+def writer(stop, waits, failures):
+    with app.app_context():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                db.session.execute(db.insert(Scores), [{"user_id": 2, "quiz_id": WRITER_QUIZ, "total_scored": 1}])
+                db.session.commit()
+            except OperationalError:  # database is locked: busy_timeout ran out
+                db.session.rollback()
+                failures.append(1)
+            waits.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+
+def run(mode, chunk_size):
+    shutil.copy(DB_PATH + ".seed", DB_PATH)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+    stop, waits, failures = threading.Event(), [], []
+    thread = threading.Thread(target=writer, args=(stop, waits, failures))
+    thread.start()
+    time.sleep(0.2)
+    with app.app_context():
+        start = time.perf_counter()
+        if mode == "orm":
+            orm_delete(1)
+        else:
+            remove_subject(1, chunk_size)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        thread.join()
+        left = db.session.execute(db.select(db.func.count()).select_from(Scores).where(Scores.quiz_id != WRITER_QUIZ)).scalar()
+        db.session.remove()
+        db.engine.dispose()
+    print(f"{mode:4} delete {elapsed:7.2f} s   writer: {len(waits)} inserts, {len(failures)} timed out,"
+          f" longest wait {max(waits) * 1000:7.1f} ms   scores left {left}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scores", type=int, default=100_000)
+    parser.add_argument("--answers", type=int, default=5, help="per-question answers stored per attempt")
+    parser.add_argument("--modes", nargs="+", choices=["orm", "set"], default=["orm", "set"])
+    parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SIZE, help="scores per delete transaction (set mode)")
+    args = parser.parse_args()
+
+    seed(args.scores, args.answers)
+    print(f"subject with {CHAPTERS * QUIZZES_PER_CHAPTER} quizzes, {args.scores} scores, {args.scores * args.answers} attempt answers")
+    for mode in args.modes:
+        run(mode, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Bytes transferred per page: HTML with and without on-the-fly gzip, and the CSS/JS it links.
+
+Builds the fingerprinted assets into a temporary directory (static/ itself is left alone),
+seeds a small dataset and fetches each page through the test client. Per page it reports
+the HTML size uncompressed and gzipped, and the size of the linked assets as stored and as
+served precompressed (br if brotli is installed, else gzip). A first visit downloads both;
+a repeat visit only the HTML, as the assets are cached as immutable. Assets still linked
+from a CDN (run `flask --app app vendor-assets` first) are listed but not counted.
+
+Usage: python benchmarks/bench_page_bytes.py [--questions 50]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+from app import create_app, init_db
+from controllers.assets import build_assets, assets
+from models.models import db, User, Subject, Chapter, Quiz, Question
+
+ASSET_LINK = re.compile(r'(?:href|src)="([^"]+\.(?:css|js))"')
+
+PAGES = [
+    # (name, path, user id to log in as, or None)
+    ("index", "/", None),
+    ("login", "/auth/login", None),
+    ("register", "/auth/register", None),
+    ("user_dashboard", "/user/dashboard", 2),
+    ("quiz_attempt", "/user/quiz/1/attempt", 2),
+    ("admin_dashboard", "/admin/dashboard", 1),
+    ("admin_users", "/admin/users", 1),
+    ("admin_questions", "/admin/quizzes/1/questions", 1),
+]
+
+
+def seed(questions):
+    init_db()
+    db.session.add(User(id=2, username="student", email="student@example.com", password="x", full_name="Student"))
+    db.session.add(Subject(id=1, name="Subject"))
+    db.session.add(Chapter(id=1, name="Chapter", subject_id=1))
+    db.session.add(Quiz(id=1, name="Quiz", chapter_id=1, date=date.today(), duration=dtime(1, 0)))
+    db.session.execute(db.insert(Question), [
+        {"quiz_id": 1, "question_statement": f"Which of these is statement number {n}?", "option1": "The first option",
+         "option2": "The second option", "option3": "The third option", "option4": "The fourth option", "correct_option": 1}
+        for n in range(questions)
+    ])
+    db.session.commit()
+
+
+def client_for(app, user_id):
+    client = app.test_client()
+    if user_id is not None:
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+            session["user_id"] = user_id
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=50, help="questions of the quiz on the attempt page")
+    args = parser.parse_args()
+
+    app = create_app({"ASSETS_BUILD_DIR": tempfile.mkdtemp(), "LOG_LEVEL": "WARNING"})
+    manifest = build_assets(app.static_folder, assets.build_dir, require_vendor=False)
+    assets.load()
+    with app.app_context():
+        seed(args.questions)
+
+    external = set()
+    totals = [0, 0, 0, 0]
+    print(f"{'page':16} {'html':>8} {'html gz':>8} {'assets':>8} {'assets c':>8} {'first':>8} {'repeat':>8}")
+    for name, path, user_id in PAGES:
+        client = client_for(app, user_id)
+        plain = client.get(path, headers={"Accept-Encoding": "identity"})
+        compressed = client.get(path, headers={"Accept-Encoding": "gzip, br"})
+        assert plain.status_code == 200 and compressed.status_code == 200, (path, plain.status_code)
+
+        asset_bytes = asset_served = 0
+        for url in ASSET_LINK.findall(plain.get_data(as_text=True)):
+            if not url.startswith("/"):
+                external.add(url)
+                continue
+            raw = client.get(url, headers={"Accept-Encoding": "identity"})
+            served = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+            asset_bytes += len(raw.data)
+            asset_served += len(served.data)
+            raw.close()
+            served.close()
+
+        row = [len(plain.data), len(compressed.data), asset_bytes, asset_served]
+        totals = [t + v for t, v in zip(totals, row)]
+        print(f"{name:16} {row[0]:8} {row[1]:8} {row[2]:8} {row[3]:8} {row[1] + row[3]:8} {row[1]:8}")
+
+    print(f"{'total':16} {totals[0]:8} {totals[1]:8} {totals[2]:8} {totals[3]:8} {totals[1] + totals[3]:8} {totals[1]:8}")
+    print(f"{len(manifest)} assets built; HTML gzip saves {1 - totals[1] / totals[0]:.0%}")
+    for url in sorted(external):
+        print(f"not vendored, not counted: {url}")
+
+
+if __name__ == "__main__":
+    main()
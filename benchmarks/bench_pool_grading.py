@@ -0,0 +1,90 @@
+"""Question pools (models/question_pools.py): drawing and grading sampled papers.
+
+For each pool size in --pools, seeds a quiz with that many questions and measures, per
+submission of --sample answers:
+
+  full     grading against the whole answer key, as for a quiz without a pool
+  sampled  re-drawing the paper from its seed, then grading only its questions
+  draw     drawing a paper from the cached id array
+  random   picking the paper's questions with ORDER BY RANDOM() LIMIT k instead
+
+Usage: python benchmarks/bench_pool_grading.py [--pools 1000 10000] [--sample 20] [--submissions 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, select
+from models.models import db, Subject, Chapter, Quiz, Question
+from models.answer_keys import answer_key_cache
+from models.question_pools import draw_paper, new_seed
+
+
+def seed(pools):
+    rng = random.Random(0)
+    db.session.add(Subject(id=1, name="Bench"))
+    db.session.add(Chapter(id=1, name="Bench", subject_id=1))
+    for quiz_id, size in enumerate(pools, start=1):
+        db.session.add(Quiz(id=quiz_id, name=f"Pool {size}", chapter_id=1, date=date.today(), duration=dtime(1, 0)))
+        db.session.execute(db.insert(Question), [
+            {"quiz_id": quiz_id, "question_statement": f"Q{i}", "option1": "a", "option2": "b", "option3": "c",
+             "option4": "d", "correct_option": rng.randint(1, 4)}
+            for i in range(size)
+        ])
+    db.session.commit()
+
+
+def rate(count, run):
+    start = time.perf_counter()
+    run()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pools", type=int, nargs="+", default=[1000, 10_000], help="questions in each pool")
+    parser.add_argument("--sample", type=int, default=20, help="questions drawn per attempt")
+    parser.add_argument("--submissions", type=int, default=20_000)
+    parser.add_argument("--random-draws", type=int, default=500, help="ORDER BY RANDOM() queries timed")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+    db.init_app(app)
+
+    rng = random.Random(1)
+    print(f"{args.sample} questions per paper, {args.submissions} submissions; rates per second")
+    print(f"{'pool':>7} {'full':>10} {'sampled':>10} {'draw':>10} {'random':>10}")
+    with app.app_context():
+        db.create_all()
+        seed(args.pools)
+        for quiz_id, size in enumerate(args.pools, start=1):
+            answer_key = answer_key_cache.get(quiz_id)
+            seeds = [new_seed() for _ in range(args.submissions)]
+            # Each student answers the questions of their own paper
+            sampled_posts = [
+                {str(q_id): str(rng.randint(1, 4)) for q_id in draw_paper(answer_key, args.sample, s).question_ids}
+                for s in seeds
+            ]
+            full_posts = [{str(q_id): str(rng.randint(1, 4)) for q_id in answer_key.question_ids} for _ in range(200)]
+
+            full = rate(len(full_posts), lambda: [answer_key.grade(post) for post in full_posts])
+            sampled = rate(args.submissions, lambda: [
+                answer_key.grade(post, draw_paper(answer_key, args.sample, s, shuffle_options=False).question_ids)
+                for s, post in zip(seeds, sampled_posts)
+            ])
+            draw = rate(args.submissions, lambda: [draw_paper(answer_key, args.sample, s) for s in seeds])
+            statement = select(Question.id).where(Question.quiz_id == quiz_id).order_by(func.random()).limit(args.sample)
+            by_random = rate(args.random_draws, lambda: [db.session.scalars(statement).all() for _ in range(args.random_draws)])
+            print(f"{size:7} {full:10.0f} {sampled:10.0f} {draw:10.0f} {by_random:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
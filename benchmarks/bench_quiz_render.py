@@ -0,0 +1,79 @@
+"""Latency of the quiz attempt page: full render vs cached question fragment vs 304 revalidation.
+
+Drives GET /user/quiz/<id>/attempt through the Flask test client against a throwaway
+SQLite database seeded with one quiz of --questions questions.
+
+Usage: python benchmarks/bench_quiz_render.py [--questions 200] [--repeat 300]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+from app import create_app
+from models.models import db, User, Subject, Chapter, Quiz, Question
+from controllers.fragment_cache import quiz_fragments
+
+app = create_app()
+
+
+def seed(questions):
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username="student", email="student@example.com", password="x"))
+        db.session.add(Subject(id=1, name="Bench"))
+        db.session.add(Chapter(id=1, name="Bench", subject_id=1))
+        db.session.add(Quiz(id=1, name="Bench", chapter_id=1, date=date.today(), duration=dtime(1, 0)))
+        db.session.execute(db.insert(Question), [{
+            "quiz_id": 1, "question_statement": f"Question {i}: which option is correct?",
+            "option1": f"Option A{i}", "option2": f"Option B{i}", "option3": f"Option C{i}", "option4": f"Option D{i}",
+            "correct_option": i % 4 + 1,
+        } for i in range(questions)])
+        db.session.commit()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return f"p50 {pick(0.50):7.2f} ms   p99 {pick(0.99):7.2f} ms"
+
+
+def measure(client, repeat, before=None, headers=None):
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        response = client.get("/user/quiz/1/attempt", headers=headers or {})
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    seed(args.questions)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+
+    cold, response = measure(client, args.repeat, before=quiz_fragments.clear)
+    print(f"cold render ({args.questions} questions, {len(response.data) // 1024} KiB)   {percentiles(cold)}")
+    warm, response = measure(client, args.repeat)
+    print(f"cached fragment                          {percentiles(warm)}")
+    revalidated, response = measure(client, args.repeat, headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    print(f"If-None-Match -> 304                     {percentiles(revalidated)}")
+    print(quiz_fragments.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Requests per second on the read-heavy user pages under each way of serving the app.
+
+Starts the app as a subprocess in each mode, then hammers GET /user/dashboard and
+GET /user/quiz/<id>/result from --clients keep-alive connections for --seconds:
+
+  dev       flask run (the threaded development server)
+  gunicorn  gunicorn -c gunicorn.conf.py wsgi:app, --workers processes
+  asgi      uvicorn asgi:application, --workers processes, with QUIZMASTER_ASYNC_READS
+
+Modes whose server is not installed are skipped. The load generator runs on the same
+machine, so compare modes with each other rather than with production numbers.
+
+Usage: python benchmarks/bench_serving.py [--modes dev gunicorn asgi] [--workers 4] [--clients 16] [--seconds 10]
+"""
+import argparse
+import http.client
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+from app import create_app
+from models.models import db, User, Subject, Chapter, Quiz, Scores
+
+USERS = 1000
+QUIZZES = 50
+PORT = 8765
+
+
+def seed(app):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [{"id": i, "username": f"s{i}", "email": f"s{i}@x.com", "password": "x"} for i in range(1, USERS + 1)])
+        db.session.add(Subject(id=1, name="Bench"))
+        db.session.add(Chapter(id=1, name="Bench", subject_id=1))
+        db.session.execute(db.insert(Quiz), [{"id": i, "name": f"Quiz {i}", "chapter_id": 1, "date": date.today(), "duration": dtime(1, 0)} for i in range(1, QUIZZES + 1)])
+        db.session.execute(db.insert(Scores), [{"user_id": i % USERS + 1, "quiz_id": i % QUIZZES + 1, "total_scored": i % 10} for i in range(200_000)])
+        db.session.commit()
+
+
+def session_cookies(app):
+    # Signed Flask session cookies, as the login view would set them
+    serializer = app.session_interface.get_signing_serializer(app)
+    return {user_id: serializer.dumps({"_user_id": str(user_id), "_fresh": True}) for user_id in range(1, USERS + 1)}
+
+
+def commands(workers):
+    return {
+        "dev": [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(PORT)],
+        "gunicorn": ["gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{PORT}", "-w", str(workers), "wsgi:app"],
+        "asgi": ["uvicorn", "asgi:application", "--port", str(PORT), "--workers", str(workers), "--no-access-log", "--log-level", "warning"],
+    }
+
+
+def wait_until_up(timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def load(cookies, clients, seconds):
+    latencies, errors, lock = [], [0], threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=10)
+        local, failed = [], 0
+        while time.monotonic() < stop:
+            user_id = rng.randint(1, USERS)
+            # seed() gives user u attempts at quiz (u - 1) % QUIZZES + 1 only
+            path = "/user/dashboard" if rng.random() < 0.5 else f"/user/quiz/{(user_id - 1) % QUIZZES + 1}/result"
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path, headers={"Cookie": f"session={cookies[user_id]}"})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=10)
+                ok = False
+            if ok:
+                local.append((time.perf_counter() - start) * 1000)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies), errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=["dev", "gunicorn", "asgi"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app()
+    seed(app)
+    cookies = session_cookies(app)
+
+    env = dict(os.environ, QUIZMASTER_PASSWORD_HASH_WORKERS="1", GUNICORN_ACCESS_LOG="/dev/null")
+    for mode in args.modes:
+        command = commands(args.workers)[mode]
+        if mode != "dev" and shutil.which(command[0]) is None:
+            print(f"{mode:9} skipped: {command[0]} is not installed")
+            continue
+        mode_env = dict(env, QUIZMASTER_ASYNC_READS="true") if mode == "asgi" else env
+        server = subprocess.Popen(command, cwd=ROOT, env=mode_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_until_up():
+                print(f"{mode:9} failed to start")
+                continue
+            latencies, errors = load(cookies, args.clients, args.seconds)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        if not latencies:
+            print(f"{mode:9} no successful requests ({errors} errors)")
+            continue
+        pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+        print(f"{mode:9} {len(latencies) / args.seconds:8.0f} req/s   p50 {pick(0.5):6.1f} ms   p99 {pick(0.99):6.1f} ms   errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
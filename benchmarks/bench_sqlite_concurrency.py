@@ -0,0 +1,106 @@
+"""Concurrent-reader throughput while quiz submissions are being written.
+
+Compares SQLite with default settings (rollback journal) against the tuned pragmas of
+models/database.py. Readers run the dashboard's past-attempts query; writers insert one
+Scores row per transaction, like attempt_quiz.
+
+Usage: python benchmarks/bench_sqlite_concurrency.py [--readers 8] [--writers 4] [--seconds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models.models import db, User, Subject, Chapter, Quiz, Scores
+from models.database import configure_database, init_database, DEFAULT_SQLITE_PRAGMAS
+
+USERS = 1000
+
+
+def make_app(pragmas):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+    app.config["SQLITE_PRAGMAS"] = pragmas
+    configure_database(app)
+    db.init_app(app)
+    init_database(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Subject(id=1, name="Bench"))
+        db.session.add(Chapter(id=1, name="Bench", subject_id=1))
+        db.session.add(Quiz(id=1, name="Bench", chapter_id=1, date=date.today(), duration=dtime(1, 0)))
+        db.session.execute(db.insert(User), [{"username": f"u{i}", "email": f"u{i}@x.com", "password": "x"} for i in range(USERS)])
+        db.session.execute(db.insert(Scores), [{"user_id": i % USERS + 1, "quiz_id": 1, "total_scored": i % 10} for i in range(50_000)])
+        db.session.commit()
+    return app
+
+
+def run(app, readers, writers, seconds):
+    stop = threading.Event()
+    counts = {"read": 0, "write": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader(n):
+        with app.app_context():
+            done = 0
+            while not stop.is_set():
+                try:
+                    (db.session.query(Scores.id, Scores.total_scored, Quiz.name)
+                     .join(Quiz, Scores.quiz_id == Quiz.id)
+                     .filter(Scores.user_id == (done * 7 + n) % USERS + 1)
+                     .order_by(Scores.id.desc()).limit(50).all())
+                    db.session.rollback()
+                    done += 1
+                except Exception:
+                    db.session.rollback()
+                    with lock:
+                        counts["errors"] += 1
+            with lock:
+                counts["read"] += done
+
+    def writer(n):
+        with app.app_context():
+            done = 0
+            while not stop.is_set():
+                try:
+                    db.session.add(Scores(user_id=(done + n) % USERS + 1, quiz_id=1, total_scored=done % 10))
+                    db.session.commit()
+                    done += 1
+                except Exception:
+                    db.session.rollback()
+                    with lock:
+                        counts["errors"] += 1
+            with lock:
+                counts["write"] += done
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {k: v / seconds if k != "errors" else v for k, v in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    for label, pragmas in (("default (rollback journal)", {}), ("tuned (WAL + pragmas)", DEFAULT_SQLITE_PRAGMAS)):
+        result = run(make_app(pragmas), args.readers, args.writers, args.seconds)
+        print(f"{label:>28}: {result['read']:>8.0f} reads/s  {result['write']:>6.0f} writes/s  {result['errors']} errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Latency of admin user search: FTS5 index (models/user_search.py) vs the old username ILIKE scan.
+
+Usage: python benchmarks/bench_user_search.py [--sizes 10000 100000 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models.models import db, User
+from models.user_search import create_user_search_index, search_users
+import models.user_search as user_search
+
+FIRST = ["arjun", "priya", "rahul", "sneha", "vikram", "ananya", "rohan", "kavya", "aditya", "meera"]
+LAST = ["sharma", "patel", "iyer", "reddy", "gupta", "nair", "singh", "das", "joshi", "menon"]
+QUALIFICATIONS = ["BTech", "MTech", "BSc", "MSc", "PhD", "BCA", "MCA"]
+QUERIES = ["priya", "sha", "iyer", "mtech", "vik red", "user4242"]
+
+
+def seed(count):
+    rng = random.Random(count)
+    batch = []
+    for i in range(count):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        batch.append({
+            "username": f"{first}{last}{i}", "email": f"user{i}@example.com", "password": "x",
+            "full_name": f"{first.title()} {last.title()}", "qualification": rng.choice(QUALIFICATIONS),
+        })
+        if len(batch) == 50_000:
+            db.session.execute(db.insert(User), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(User), batch)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def ilike_page(query):
+    return User.query.filter(User.username.ilike(f"%{query}%")).order_by(User.id).limit(50).all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'users':>9} {'query':>10} {'ilike ms':>9} {'fts ms':>8}")
+    for size in args.sizes:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            seed(size)
+            with db.engine.begin() as connection:
+                create_user_search_index(connection)
+            user_search._index_ready = None
+
+            for query in QUERIES:
+                ilike_ms = timed(lambda: ilike_page(query), args.repeat)
+                fts_ms = timed(lambda: search_users(query, 0, 50), args.repeat)
+                print(f"{size:>9} {query:>10} {ilike_ms:>9.2f} {fts_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""End-to-end benchmark of the quiz workflow, with JSON results for comparing commits.
+
+Seeds a synthetic dataset with bulk inserts (--subjects x --chapters x --quizzes quizzes
+of --questions questions, --users students, --scores historical attempts), then drives
+the real views through the Flask test client from --threads threads:
+
+  auth     POST /auth/register, then POST /auth/login as the new user
+  student  GET /user/dashboard, GET + POST /user/quiz/<id>/attempt, GET /user/quiz/<id>/result
+  admin    GET /admin/dashboard, /admin/subjects, /admin/quizzes, /admin/users
+
+Each scenario runs --iterations times (auth --auth-iterations times: it is dominated by
+password hashing, which is slow by design); every request is timed and checked against the
+status code the flow expects. Data and flows are drawn from --seed, so two runs with the
+same arguments do the same work.
+
+Usage: python benchmarks/bench_workflow.py [--users 10000] [--scores 200000] [--iterations 500]
+           [--output results.json] [--compare baseline.json] [--threshold 0.15]
+
+--compare prints each step's change in p50/p99 and throughput against an earlier
+--output file and exits with status 1 if any p50 got slower by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, time as dtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+from werkzeug.security import generate_password_hash
+from app import create_app, init_db
+from models.models import db, User, Subject, Chapter, Quiz, Question, Scores
+from models.aggregates import rebuild_all
+
+PASSWORD = "bench-password"
+SCENARIOS = ("auth", "student", "admin")
+
+
+class Dataset:
+    """Ids of what seed() inserted, for the flows to pick from."""
+
+    def __init__(self, user_ids, quiz_questions):
+        self.user_ids = user_ids
+        self.quiz_questions = quiz_questions  # quiz_id -> [question_id, ...]
+        self.quiz_ids = list(quiz_questions)
+
+
+def seed(app, args):
+    rng = random.Random(args.seed)
+    password = generate_password_hash(PASSWORD, method=app.config["PASSWORD_HASH_METHOD"])
+    with app.app_context():
+        init_db()  # tables, migrations and the admin account (id 1)
+        first_user = db.session.scalar(db.select(db.func.max(User.id))) + 1
+        user_ids = list(range(first_user, first_user + args.users))
+        db.session.execute(db.insert(User), [{
+            "id": user_id, "username": f"student{user_id}", "email": f"student{user_id}@example.com",
+            "password": password, "full_name": f"Student {user_id}", "qualification": "BSc", "dob": "2000-01-01",
+        } for user_id in user_ids])
+
+        subjects = [{"id": s, "name": f"Subject {s}"} for s in range(1, args.subjects + 1)]
+        chapters = [{"id": (s - 1) * args.chapters + c, "name": f"Chapter {c}", "subject_id": s}
+                    for s in range(1, args.subjects + 1) for c in range(1, args.chapters + 1)]
+        quizzes = [{"id": (chapter["id"] - 1) * args.quizzes + q, "name": f"Quiz {chapter['id']}.{q}",
+                    "chapter_id": chapter["id"], "date": date.today(), "duration": dtime(1, 0)}
+                   for chapter in chapters for q in range(1, args.quizzes + 1)]
+        questions = [{"id": (quiz["id"] - 1) * args.questions + n, "quiz_id": quiz["id"],
+                      "question_statement": f"Question {n} of {quiz['name']}?", "option1": "Option A",
+                      "option2": "Option B", "option3": "Option C", "option4": "Option D",
+                      "correct_option": rng.randint(1, 4)}
+                     for quiz in quizzes for n in range(1, args.questions + 1)]
+        db.session.execute(db.insert(Subject), subjects)
+        db.session.execute(db.insert(Chapter), chapters)
+        db.session.execute(db.insert(Quiz), quizzes)
+        db.session.execute(db.insert(Question), questions)
+
+        now = datetime.utcnow()
+        for start in range(0, args.scores, 50_000):
+            db.session.execute(db.insert(Scores), [{
+                "user_id": rng.choice(user_ids), "quiz_id": rng.randint(1, len(quizzes)),
+                "total_scored": rng.randint(0, args.questions),
+                "time_stamp_of_attempt": now - timedelta(minutes=rng.randint(1, 525_600)),
+            } for _ in range(start, min(start + 50_000, args.scores))])
+        db.session.commit()
+        rebuild_all()
+
+        quiz_questions = {quiz["id"]: [] for quiz in quizzes}
+        for question in questions:
+            quiz_questions[question["quiz_id"]].append(question["id"])
+    return Dataset(user_ids, quiz_questions)
+
+
+def logged_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+        session["user_id"] = user_id
+    return client
+
+
+# Each flow yields (step, response, expected status codes) for every request it makes
+
+def auth_flow(app, data, rng, iteration, thread):
+    client = app.test_client()
+    name = f"bench{thread}x{iteration}x{rng.randrange(10**9)}"
+    yield "register", client.post("/auth/register", data={
+        "full_name": "Bench User", "username": name, "email": f"{name}@example.com",
+        "qualification": "BSc", "dob": "2000-01-01", "password": PASSWORD,
+    }), (302,)
+    yield "login", client.post("/auth/login", data={"email": f"{name}@example.com", "password": PASSWORD}), (302,)
+
+
+def student_flow(app, data, rng, iteration, thread):
+    client = logged_in_client(app, rng.choice(data.user_ids))
+    quiz_id = rng.choice(data.quiz_ids)
+    yield "dashboard", client.get("/user/dashboard"), (200,)
+    yield "attempt_get", client.get(f"/user/quiz/{quiz_id}/attempt"), (200,)
+    answers = {f"q{question_id}": str(rng.randint(1, 4)) for question_id in data.quiz_questions[quiz_id]}
+    yield "attempt_post", client.post(f"/user/quiz/{quiz_id}/attempt", data=answers), (302,)
+    yield "result", client.get(f"/user/quiz/{quiz_id}/result"), (200,)
+
+
+def admin_flow(app, data, rng, iteration, thread):
+    client = logged_in_client(app, 1)
+    for step, path in (("admin_dashboard", "/admin/dashboard"), ("admin_subjects", "/admin/subjects"),
+                       ("admin_quizzes", "/admin/quizzes"), ("admin_users", "/admin/users")):
+        yield step, client.get(path), (200,)
+
+
+FLOWS = {"auth": auth_flow, "student": student_flow, "admin": admin_flow}
+
+
+def run_scenario(app, data, flow, iterations, threads, seed):
+    samples, errors, lock = {}, {}, threading.Lock()
+
+    def worker(thread):
+        rng = random.Random(f"{seed}:{flow.__name__}:{thread}")
+        local, failed = {}, {}
+        for iteration in range(thread, iterations, threads):
+            steps = flow(app, data, rng, iteration, thread)
+            while True:
+                start = time.perf_counter()
+                try:
+                    step, response, expected = next(steps)
+                except StopIteration:
+                    break
+                local.setdefault(step, []).append((time.perf_counter() - start) * 1000)
+                if response.status_code not in expected:
+                    failed[step] = failed.get(step, 0) + 1
+        with lock:
+            for step, values in local.items():
+                samples.setdefault(step, []).extend(values)
+            for step, count in failed.items():
+                errors[step] = errors.get(step, 0) + count
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    # req/s of a step is its count over the scenario's wall time, as steps run interleaved
+    results = {}
+    for step, values in samples.items():
+        values.sort()
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+        results[step] = {
+            "count": len(values), "errors": errors.get(step, 0), "rps": round(len(values) / elapsed, 1),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": round(pick(0.50), 3), "p90_ms": round(pick(0.90), 3), "p99_ms": round(pick(0.99), 3),
+        }
+    return results
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {(baseline.get('commit') or '?')[:10]})")
+    regressions = []
+    for step, current in results.items():
+        before = baseline["results"].get(step)
+        if not before:
+            continue
+        change = lambda key: (current[key] - before[key]) / before[key] if before[key] else 0.0
+        print(f"  {step:16} p50 {change('p50_ms'):+7.1%}   p99 {change('p99_ms'):+7.1%}   req/s {change('rps'):+7.1%}")
+        if change("p50_ms") > threshold:
+            regressions.append(step)
+    if regressions:
+        print(f"p50 regressed by more than {threshold:.0%}: {', '.join(regressions)}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subjects", type=int, default=10)
+    parser.add_argument("--chapters", type=int, default=5, help="chapters per subject")
+    parser.add_argument("--quizzes", type=int, default=4, help="quizzes per chapter")
+    parser.add_argument("--questions", type=int, default=20, help="questions per quiz")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--scores", type=int, default=200_000)
+    parser.add_argument("--iterations", type=int, default=500, help="runs of each scenario")
+    parser.add_argument("--auth-iterations", type=int, default=40, help="runs of the auth scenario")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.15, help="p50 slowdown counted as a regression")
+    args = parser.parse_args()
+
+    # No throttling: every request of the auth scenario comes from the same address
+    app = create_app({"LOGIN_LIMIT_PER_IP": 10**9, "LOGIN_LIMIT_PER_ACCOUNT": 10**9, "LOG_LEVEL": "WARNING"})
+
+    start = time.perf_counter()
+    data = seed(app, args)
+    seed_seconds = time.perf_counter() - start
+    print(f"seeded {len(data.quiz_ids)} quizzes, {args.users} users, {args.scores} scores in {seed_seconds:.1f} s")
+
+    results = {}
+    for scenario in args.scenarios:
+        iterations = args.auth_iterations if scenario == "auth" else args.iterations
+        results.update(run_scenario(app, data, FLOWS[scenario], iterations, args.threads, args.seed))
+
+    print(f"{'step':16} {'count':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for step, r in results.items():
+        print(f"{step:16} {r['count']:7} {r['errors']:6} {r['rps']:8.1f} {r['p50_ms']:8.2f} {r['p90_ms']:8.2f} {r['p99_ms']:8.2f}")
+
+    commit, dirty = git_revision()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": commit, "dirty": dirty, "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                "params": vars(args), "seed_seconds": round(seed_seconds, 2), "results": results,
+            }, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,79 @@
-from flask import Blueprint, render_template, request, redirect, url_for
+import logging
+import os
+import tempfile
+import click
+from flask import Blueprint, Response, current_app, send_file, render_template, stream_template, stream_with_context, request, redirect, url_for, jsonify, abort
 from flask_login import login_required
 from controllers.decorators import admin_required
+from controllers.pagination import render_listing, offset_paginate
+from controllers.password_hashing import password_hasher
 from datetime import datetime, time
-from models.models import db, Subject, Chapter, Quiz, Question, User, Scores
+from sqlalchemy import func
+from models.models import db, Subject, Chapter, Quiz, Question, User, QuizStats
+from models.answer_keys import answer_key_cache
+from controllers.fragment_cache import quiz_fragments
+from models.grading import parse_submissions, grade_batch, SubmissionFormatError
+from models.score_export import parse_filters, export_csv, export_parquet, last_exported_id, more_than, ExportError
+from models.question_io import clean_question, import_questions, export_questions, QuestionFormatError
+from models.user_search import search_users
+from models.cascade_delete import remove_subject, remove_chapter, remove_quiz, remove_user
+from models.identity_cache import identity_cache
+from models.attempt_sessions import attempt_sessions
+from models.autosave import autosave
+from models.item_analysis import item_analysis
+from models.score_writer import score_writer
+from models.aggregates import summary, leaderboard, rebuild_all
+from models.catalog import catalog
+from models.schedule import schedule
+
+logger = logging.getLogger(__name__)
 
 admin_blueprint = Blueprint("admin", __name__)
 
 @admin_blueprint.route("/dashboard")
 @admin_required
 def admin_dashboard():
-    return render_template("admin_dashboard.html")
+    # Reads only the precomputed aggregates, never the Scores table
+    totals = db.session.query(func.sum(QuizStats.attempt_count), func.sum(QuizStats.score_sum)).one()
+    top_quizzes = (
+        db.session.query(QuizStats, Quiz.name)
+        .join(Quiz, QuizStats.quiz_id == Quiz.id)
+        .order_by(QuizStats.attempt_count.desc())
+        .limit(10)
+        .all()
+    )
+    quiz_summaries = [(stats.quiz_id, name, summary(stats)) for stats, name in top_quizzes]
+    attempts = totals[0] or 0
+    overview = {"attempts": attempts, "mean": (totals[1] or 0) / attempts if attempts else 0.0}
+    return render_template("admin_dashboard.html", overview=overview, quiz_summaries=quiz_summaries)
+
+# Per-quiz score summary and top-N leaderboard
+@admin_blueprint.route("/quizzes/<int:quiz_id>/leaderboard")
+@admin_required
+def quiz_leaderboard(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    stats = db.session.get(QuizStats, quiz_id)
+    entries = leaderboard(stats) if stats else []
+    usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_([e["user_id"] for e in entries])))
+    for entry in entries:
+        entry["username"] = usernames.get(entry["user_id"], "(deleted user)")
+    return render_template("admin/quiz_leaderboard.html", quiz=quiz, summary=summary(stats) if stats else None, entries=entries)
+
+# In-process cache statistics (per worker)
+@admin_blueprint.route("/stats/caches")
+@admin_required
+def cache_stats():
+    return jsonify(
+        identity=identity_cache.stats(),
+        answer_keys=answer_key_cache.stats(),
+        quiz_fragments=quiz_fragments.stats(),
+        attempt_sessions=attempt_sessions.stats(),
+        autosave=autosave.stats(),
+        catalog=catalog.stats(),
+        schedule=schedule.stats(),
+        score_queue_depth=score_writer.queue_depth() if score_writer.enabled else 0,
+        password_hashing=dict(password_hasher.latency_percentiles(), rejected=password_hasher.rejected),
+    )
 
 #CRUD routes for managing subjects
 
@@ -17,8 +81,7 @@ def admin_dashboard():
 @admin_blueprint.route("/subjects")
 @admin_required
 def manage_subjects():
-    subjects = Subject.query.all()
-    return render_template("admin/admin_subject.html", subjects=subjects)
+    return render_listing("admin/admin_subject.html", catalog.get().subjects, Subject.id, "subjects")
 
 # Add subject
 @admin_blueprint.route("/subjects/add", methods=["GET", "POST"])
@@ -29,17 +92,18 @@ def add_subject():
         description = request.form["description"].strip()
 
         if not name:
-            print("Subject name cannot be empty")
+            logger.warning("Subject name cannot be empty")
             return redirect(url_for("admin.add_subject"))
         
         if Subject.query.filter_by(name=name).first():
-            print("Subject with this name already exists")
+            logger.warning("Subject with this name already exists")
             return redirect(url_for("admin.add_subject"))
 
         new_subject = Subject(name=name, description=description)
         db.session.add(new_subject)
+        catalog.changed()
         db.session.commit()
-        print(f"✅ {new_subject.name} Subject added successfully")
+        logger.info(f"{new_subject.name} Subject added successfully")
 
         return redirect(url_for("admin.manage_subjects"))
 
@@ -56,32 +120,45 @@ def edit_subject(id):
         new_description = request.form["description"].strip()
 
         if not new_name:
-            print("⚠ Subject name cannot be empty.")
+            logger.warning("Subject name cannot be empty.")
             return redirect(url_for("admin.edit_subject", id=id))
 
         existing_subject = Subject.query.filter_by(name=new_name).filter(Subject.id!=id).first()
         if existing_subject:
-            print("⚠ Subject with this name already exists.")
+            logger.warning("Subject with this name already exists.")
             return redirect(url_for("admin.edit_subject", id=id))
 
         subject.name = new_name
         subject.description = new_description
 
+        catalog.changed()
         db.session.commit()
-        print("✅ Subject updated successfully")
+        logger.info("Subject updated successfully")
         return redirect(url_for("admin.manage_subjects"))
 
     return render_template("admin/edit_subject.html", subject=subject)
 
+def _forget_quizzes(quiz_ids):
+    # Drop everything cached or buffered in memory for quizzes that were just deleted. The
+    # caches go first: an autosave validated against a stale answer key could otherwise
+    # buffer answers again after forget() (the flush drops those anyway).
+    for quiz_id in quiz_ids:
+        answer_key_cache.invalidate(quiz_id)
+        quiz_fragments.bump(quiz_id)
+    autosave.forget(quiz_ids=quiz_ids)
+    # The rows are gone already (removed in their own transaction); move the catalog on too
+    catalog.changed()
+    db.session.commit()
+
 #Delete Subject
 @admin_blueprint.route("/subjects/delete/<int:id>", methods=["POST"])
 @admin_required
 def delete_subject(id):
     subject = Subject.query.get_or_404(id)
-    db.session.delete(subject)
-    db.session.commit()
+    name = subject.name
+    _forget_quizzes(remove_subject(subject.id))
 
-    print(f"✅ Subject {subject.name} deleted successfully.")
+    logger.info(f"Subject {name} deleted successfully.")
     return redirect(url_for("admin.manage_subjects"))
 
 
@@ -91,8 +168,11 @@ def delete_subject(id):
 @admin_blueprint.route("/subjects/<int:subject_id>/chapters")
 @admin_required
 def manage_chapters(subject_id):
-    subject = Subject.query.get_or_404(subject_id)
-    return render_template("admin/admin_chapters.html", subject=subject, chapters=subject.chapters)
+    snapshot = catalog.get()
+    subject = snapshot.subject_by_id.get(subject_id)
+    if subject is None:
+        abort(404)
+    return render_template("admin/admin_chapters.html", subject=subject, chapters=snapshot.chapters_of.get(subject_id, ()))
 
 # Add Chapter
 @admin_blueprint.route("/subjects/<int:subject_id>/chapters/add", methods=["GET", "POST"])
@@ -104,19 +184,20 @@ def add_chapter(subject_id):
         description = request.form["description"].strip()
 
         if not name:
-            print("⚠ Chapter name cannot be empty.")
+            logger.warning("Chapter name cannot be empty.")
             return redirect(url_for("admin.add_chapter", subject_id=subject_id))
 
         existing_chapter = Chapter.query.filter_by(name=name, subject_id=subject_id).first()
         if existing_chapter:
-            print("⚠ A chapter with this name already exists under this subject.")
+            logger.warning("A chapter with this name already exists under this subject.")
             return redirect(url_for("admin.add_chapter", subject_id=subject_id))
 
         new_chapter = Chapter(name=name, description=description, subject_id=subject_id)
         db.session.add(new_chapter)
+        catalog.changed()
         db.session.commit()
 
-        print(f"✅ {new_chapter.name} Chapter added successfully.")
+        logger.info(f"{new_chapter.name} Chapter added successfully.")
         return redirect(url_for("admin.manage_chapters", subject_id=subject_id))
 
     return render_template("admin/add_chapter.html", subject=subject)
@@ -132,19 +213,20 @@ def edit_chapter(id):
         new_description = request.form["description"].strip()
 
         if not new_name:
-            print("⚠ Chapter cannot be empty")
+            logger.warning("Chapter cannot be empty")
             return redirect(url_for("admin.edit_chapter", id=id))
 
         existing_chapter = Chapter.query.filter_by(name=new_name, subject_id=chapter.subject_id).filter(Chapter.id!=id).first()
         if existing_chapter:
-            print("⚠ A chapter with this name already exists under this subject.")
+            logger.warning("A chapter with this name already exists under this subject.")
             return redirect(url_for("admin.edit_chapter", id=id))
 
         chapter.name = new_name
         chapter.description = new_description
 
+        catalog.changed()
         db.session.commit()
-        print("✅ Chapter updated successfully.")
+        logger.info("Chapter updated successfully.")
         return redirect(url_for("admin.manage_chapters", subject_id=chapter.subject_id))
 
     return render_template("admin/edit_chapter.html", chapter=chapter)
@@ -154,11 +236,10 @@ def edit_chapter(id):
 @admin_required
 def delete_chapter(id):
     chapter = Chapter.query.get_or_404(id)
-    subject_id = chapter.subject_id
-    db.session.delete(chapter)
-    db.session.commit()
+    subject_id, name = chapter.subject_id, chapter.name
+    _forget_quizzes(remove_chapter(chapter.id))
 
-    print(f"✅ {chapter.name} Chapter deleted successfully.")
+    logger.info(f"{name} Chapter deleted successfully.")
     return redirect(url_for("admin.manage_chapters", subject_id=subject_id))
         
 
@@ -168,32 +249,32 @@ def delete_chapter(id):
 @admin_blueprint.route("/quizzes")
 @admin_required
 def manage_quizzes_all():
-    quizzes = (
-        db.session.query(
-            Quiz.id, Quiz.name, Quiz.date, Quiz.description, Quiz.duration,
-            Chapter.name.label("chapter_name"), Subject.name.label("subject_name")
-        )
-        .select_from(Quiz)
-        .join(Chapter, Quiz.chapter_id == Chapter.id)
-        .join(Subject, Chapter.subject_id == Subject.id)
-        .all()
-    )
-    return render_template("admin/manage_quizzes.html", quizzes=quizzes)
+    # Quiz records carry their chapter and subject names, so no joins are needed
+    return render_listing("admin/manage_quizzes.html", catalog.get().quizzes, Quiz.id, "quizzes")
 
 @admin_blueprint.route("/quizzes/select_chapter")
 @admin_required
 def select_chapter_for_quiz():
-    chapters = Chapter.query.join(Subject).add_columns(
-        Chapter.id, Chapter.name, Subject.name.label("subject_name")
-    ).all()
-    return render_template("admin/select_chapter.html", chapters=chapters)
+    return render_template("admin/select_chapter.html", chapters=catalog.get().chapters)
 
 # View Quizzes under a chapter
 @admin_blueprint.route("/chapters/<int:chapter_id>/quizzes")
 @admin_required
 def manage_quizzes(chapter_id):
-    chapter = Chapter.query.get_or_404(chapter_id)
-    return render_template("admin/admin_quizzes.html", chapter=chapter, quizzes=chapter.quizzes)
+    snapshot = catalog.get()
+    chapter = snapshot.chapter_by_id.get(chapter_id)
+    if chapter is None:
+        abort(404)
+    return render_template("admin/admin_quizzes.html", chapter=chapter, quizzes=snapshot.quizzes_of.get(chapter_id, ()))
+
+def _parse_sample_size(value):
+    value = value.strip()
+    if not value:
+        return None
+    sample_size = int(value)
+    if sample_size < 1:
+        raise ValueError(value)
+    return sample_size
 
 # Add Quiz
 @admin_blueprint.route("/chapters/<int:chapter_id>/quizzes/add", methods=["GET", "POST"])
@@ -208,33 +289,42 @@ def add_quiz(chapter_id):
         duration_str = request.form["duration"].strip()
 
         if not name or not date_str or not duration_str:
-            print("⚠ Quiz name, date, and duration are required.")
+            logger.warning("Quiz name, date, and duration are required.")
             return redirect(url_for("admin.add_quiz", chapter_id=chapter_id))
 
         # ✅ Convert date string to Python `date` object
         try:
             date = datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
-            print("⚠ Invalid date format. Please use YYYY-MM-DD.")
+            logger.warning("Invalid date format. Please use YYYY-MM-DD.")
             return redirect(url_for("admin.add_quiz", chapter_id=chapter_id))
 
         # ✅ Convert duration string (hh:mm) to Python `time` object
         try:
             duration = datetime.strptime(duration_str, "%H:%M").time()
         except ValueError:
-            print("⚠ Invalid duration format. Please use HH:MM (e.g., 02:00).")
+            logger.warning("Invalid duration format. Please use HH:MM (e.g., 02:00).")
+            return redirect(url_for("admin.add_quiz", chapter_id=chapter_id))
+
+        # Optional question pool: draw this many questions per attempt (empty: all of them)
+        try:
+            sample_size = _parse_sample_size(request.form.get("sample_size", ""))
+        except ValueError:
+            logger.warning("Questions per attempt must be a positive whole number.")
             return redirect(url_for("admin.add_quiz", chapter_id=chapter_id))
 
         existing_quiz = Quiz.query.filter_by(name=name, chapter_id=chapter_id).first()
         if existing_quiz:
-            print("⚠ A quiz with this name already exists in this chapter.")
+            logger.warning("A quiz with this name already exists in this chapter.")
             return redirect(url_for("admin.add_quiz", chapter_id=chapter_id))
 
-        new_quiz = Quiz(name=name, description=description, date=date, duration=duration, chapter_id=chapter_id)
+        new_quiz = Quiz(name=name, description=description, date=date, duration=duration, sample_size=sample_size,
+                        chapter_id=chapter_id)
         db.session.add(new_quiz)
+        catalog.changed()
         db.session.commit()
 
-        print(f"✅ Quiz {new_quiz.name} added successfully.")
+        logger.info(f"Quiz {new_quiz.name} added successfully.")
         return redirect(url_for("admin.manage_quizzes", chapter_id=chapter_id))
 
     return render_template("admin/add_quiz.html", chapter=chapter)
@@ -252,27 +342,34 @@ def edit_quiz(id):
         duration_str = request.form["duration"].strip()
 
         if not new_name or not date_str or not duration_str:
-            print("⚠ Quiz name, date, and duration are required.")
+            logger.warning("Quiz name, date, and duration are required.")
             return redirect(url_for("admin.edit_quiz", id=id))
 
         # ✅ Convert date string to Python `date` object
         try:
             new_date = datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
-            print("⚠ Invalid date format. Please use YYYY-MM-DD.")
+            logger.warning("Invalid date format. Please use YYYY-MM-DD.")
             return redirect(url_for("admin.edit_quiz", id=id))
 
         # ✅ Convert duration string (hh:mm) to Python `time` object
         try:
             new_duration = datetime.strptime(duration_str, "%H:%M").time()
         except ValueError:
-            print("⚠ Invalid duration format. Please use HH:MM (e.g., 02:00).")
+            logger.warning("Invalid duration format. Please use HH:MM (e.g., 02:00).")
+            return redirect(url_for("admin.edit_quiz", id=id))
+
+        # Optional question pool: draw this many questions per attempt (empty: all of them)
+        try:
+            new_sample_size = _parse_sample_size(request.form.get("sample_size", ""))
+        except ValueError:
+            logger.warning("Questions per attempt must be a positive whole number.")
             return redirect(url_for("admin.edit_quiz", id=id))
 
         # Check if a quiz with the same name exists (excluding the current quiz)
         existing_quiz = Quiz.query.filter(Quiz.name == new_name, Quiz.chapter_id == quiz.chapter_id, Quiz.id != id).first()
         if existing_quiz:
-            print("⚠ A quiz with this name already exists in this chapter.")
+            logger.warning("A quiz with this name already exists in this chapter.")
             return redirect(url_for("admin.edit_quiz", id=id))
 
         # ✅ Update quiz details
@@ -280,9 +377,14 @@ def edit_quiz(id):
         quiz.description = new_description
         quiz.date = new_date
         quiz.duration = new_duration
-
+        if new_sample_size != quiz.sample_size:
+            # Papers are redrawn from the seed and the content version (see attempt_quiz)
+            quiz.sample_size = new_sample_size
+            catalog.content_changed(quiz.id)
+        else:
+            catalog.changed()
         db.session.commit()
-        print("✅ Quiz updated successfully.")
+        logger.info("Quiz updated successfully.")
         return redirect(url_for("admin.manage_quizzes", chapter_id=quiz.chapter_id))
 
     return render_template("admin/edit_quiz.html", quiz=quiz)
@@ -292,11 +394,10 @@ def edit_quiz(id):
 @admin_required
 def delete_quiz(id):
     quiz = Quiz.query.get_or_404(id)
-    chapter_id = quiz.chapter_id
-    db.session.delete(quiz)
-    db.session.commit()
+    chapter_id, name = quiz.chapter_id, quiz.name
+    _forget_quizzes(remove_quiz(quiz.id))
 
-    print(f"✅ Quiz {quiz.name} deleted successfully.")
+    logger.info(f"Quiz {name} deleted successfully.")
     return redirect(url_for("admin.manage_quizzes", chapter_id=chapter_id))
 
 
@@ -307,8 +408,11 @@ def delete_quiz(id):
 @admin_required
 def manage_questions(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
-    questions = Question.query.filter_by(quiz_id=quiz_id).all()
-    return render_template("admin/manage_questions.html", quiz=quiz, questions=questions)
+    questions = Question.query.filter_by(quiz_id=quiz_id)
+    # Difficulty, discrimination and option shares per question; refreshed at most once per
+    # ITEM_ANALYSIS_REFRESH_INTERVAL while new attempts come in
+    analysis = item_analysis.get(quiz_id)
+    return render_listing("admin/manage_questions.html", questions, Question.id, "questions", quiz=quiz, analysis=analysis)
 
 # Add questions
 @admin_blueprint.route("/quizzes/<int:quiz_id>/questions/add", methods=["GET", "POST"])
@@ -317,38 +421,23 @@ def add_question(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
 
     if request.method == "POST":
-        question_statement = request.form["question_statement"].strip()
-        option1 = request.form["option1"].strip()
-        option2 = request.form["option2"].strip()
-        option3 = request.form["option3"].strip()
-        option4 = request.form["option4"].strip()
-        correct_option = request.form["correct_option"].strip()
-
-        # Validation: Ensure all fields are filled
-        if not question_statement or not option1 or not option2 or not option3 or not option4 or not correct_option:
-            print("⚠ All fields are required.")
-            return redirect(url_for("admin.add_question", quiz_id=quiz_id))
-
-        # Ensure correct_option is a valid number (1-4)
-        if correct_option not in ["1", "2", "3", "4"]:
-            print("⚠ Correct option must be 1, 2, 3, or 4.")
+        # Same rules as the bulk import: all fields filled, correct option 1-4
+        try:
+            fields = clean_question(request.form)
+        except QuestionFormatError as e:
+            logger.warning(f"{e}")
             return redirect(url_for("admin.add_question", quiz_id=quiz_id))
 
         # Create new question
-        new_question = Question(
-            quiz_id=quiz.id,
-            question_statement=question_statement,
-            option1=option1,
-            option2=option2,
-            option3=option3,
-            option4=option4,
-            correct_option=int(correct_option)  # Convert to integer
-        )
+        new_question = Question(quiz_id=quiz.id, **fields)
 
         db.session.add(new_question)
+        catalog.content_changed(quiz.id)
         db.session.commit()
+        answer_key_cache.invalidate(quiz.id)
+        quiz_fragments.bump(quiz.id)
 
-        print(f"✅ Question added successfully")
+        logger.info("Question added successfully")
         return redirect(url_for("admin.manage_questions", quiz_id=quiz_id))
 
     return render_template("admin/add_question.html", quiz=quiz)
@@ -361,33 +450,22 @@ def edit_question(question_id):
     question = Question.query.get_or_404(question_id)
 
     if request.method == "POST":
-        question_statement = request.form["question_statement"].strip()
-        option1 = request.form["option1"].strip()
-        option2 = request.form["option2"].strip()
-        option3 = request.form["option3"].strip()
-        option4 = request.form["option4"].strip()
-        correct_option = request.form["correct_option"].strip()
-
-        # Validation: Ensure all fields are filled
-        if not question_statement or not option1 or not option2 or not option3 or not option4 or not correct_option:
-            print("⚠ All fields are required.")
-            return redirect(url_for("admin.edit_question", question_id=question.id))
-
-        # Ensure correct_option is a valid number (1-4)
-        if correct_option not in ["1", "2", "3", "4"]:
-            print("⚠ Correct option must be 1, 2, 3, or 4.")
+        # Same rules as the bulk import: all fields filled, correct option 1-4
+        try:
+            fields = clean_question(request.form)
+        except QuestionFormatError as e:
+            logger.warning(f"{e}")
             return redirect(url_for("admin.edit_question", question_id=question.id))
 
         # Update question fields
-        question.question_statement = question_statement
-        question.option1 = option1
-        question.option2 = option2
-        question.option3 = option3
-        question.option4 = option4
-        question.correct_option = int(correct_option)  
+        for field, value in fields.items():
+            setattr(question, field, value)
 
+        catalog.content_changed(question.quiz_id)
         db.session.commit()
-        print(f"✅ Question updated successfully")
+        answer_key_cache.invalidate(question.quiz_id)
+        quiz_fragments.bump(question.quiz_id)
+        logger.info("Question updated successfully")
         return redirect(url_for("admin.manage_questions", quiz_id=question.quiz_id))
 
     return render_template("admin/edit_question.html", question=question)
@@ -401,48 +479,252 @@ def delete_question(question_id):
     quiz_id = question.quiz_id  
 
     db.session.delete(question)
+    catalog.content_changed(quiz_id)
     db.session.commit()
+    answer_key_cache.invalidate(quiz_id)
+    quiz_fragments.bump(quiz_id)
 
-    print(f"✅ Question deleted successfully")
+    logger.info("Question deleted successfully")
     return redirect(url_for("admin.manage_questions", quiz_id=quiz_id))
 
 
-# Manage Users
-@admin_blueprint.route("/users", methods=["GET", "POST"])
+# Bulk grading of offline/OMR submissions
+@admin_blueprint.route("/quizzes/<int:quiz_id>/scores/import", methods=["GET", "POST"])
 @admin_required
-def manage_users():
-    search_query = request.args.get("search", "").strip()  # Get search input
+def import_scores(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    result = None
 
-    if search_query:
-        users = User.query.filter(User.username.ilike(f"%{search_query}%")).all()
-    else:
-        users = User.query.all()
+    if request.method == "POST":
+        upload = request.files.get("submissions")
+        if not upload or not upload.filename:
+            logger.warning("Please choose a submissions file.")
+            return redirect(url_for("admin.import_scores", quiz_id=quiz_id))
+
+        try:
+            submissions = parse_submissions(upload.stream, upload.filename)
+            scores = grade_batch(quiz.id, submissions)
+        except SubmissionFormatError as e:
+            logger.warning(f"{e}")
+            return render_template("admin/import_scores.html", quiz=quiz, error=str(e))
 
-    return render_template("admin/manage_users.html", users=users, search_query=search_query)
+        result = {"count": len(scores), "average": float(scores.mean()) if len(scores) else 0.0}
+        logger.info(f"Graded {result['count']} submissions for quiz {quiz.name}")
 
+    return render_template("admin/import_scores.html", quiz=quiz, result=result)
 
-@admin_blueprint.route("/users/<int:user_id>/delete", methods=["POST"])
+
+# Bulk question import/export
+@admin_blueprint.route("/quizzes/<int:quiz_id>/questions/import", methods=["GET", "POST"])
 @admin_required
-def delete_user(user_id):
-    user = User.query.get_or_404(user_id)
+def import_questions_view(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    result = None
 
-    # Delete all related scores before deleting the user
-    Scores.query.filter_by(user_id=user.id).delete()
+    if request.method == "POST":
+        upload = request.files.get("questions")
+        if not upload or not upload.filename:
+            logger.warning("Please choose a questions file.")
+            return redirect(url_for("admin.import_questions_view", quiz_id=quiz_id))
 
-    db.session.delete(user)
-    db.session.commit()
+        try:
+            result = import_questions(quiz.id, upload.stream, upload.filename)
+        except QuestionFormatError as e:
+            logger.warning(f"{e}")
+            return render_template("admin/import_questions.html", quiz=quiz, error=str(e))
 
-    print(f"✅ User {user.username} deleted successfully")
-    return redirect(url_for("admin.manage_users"))
+        if result["imported"]:
+            catalog.content_changed(quiz.id)
+            db.session.commit()
+            answer_key_cache.invalidate(quiz.id)
+            quiz_fragments.bump(quiz.id)
+        logger.info(f"Imported {result['imported']} questions into quiz {quiz.name} ({result['error_count']} rows rejected)")
 
+    return render_template("admin/import_questions.html", quiz=quiz, result=result)
 
 
+@admin_blueprint.route("/quizzes/<int:quiz_id>/questions/export")
+@admin_required
+def export_questions_view(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    fmt = "jsonl" if request.args.get("format") == "jsonl" else "csv"
+    mimetype = "application/x-ndjson" if fmt == "jsonl" else "text/csv"
+    return Response(
+        stream_with_context(export_questions(quiz.id, fmt)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=quiz-{quiz.id}-questions.{fmt}"},
+    )
 
 
+@admin_blueprint.cli.command("import-questions")
+@click.argument("quiz_id", type=int)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_questions_command(quiz_id, path):
+    """Import questions for QUIZ_ID from a CSV/JSONL file."""
+    quiz = db.session.get(Quiz, quiz_id)
+    if quiz is None:
+        raise click.ClickException(f"Quiz {quiz_id} does not exist")
 
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        try:
+            result = import_questions(quiz.id, f, path)
+        except QuestionFormatError as e:
+            raise click.ClickException(str(e))
+
+    for line_no, message in result["errors"]:
+        click.echo(f"line {line_no}: {message}", err=True)
+    if result["error_count"] > len(result["errors"]):
+        click.echo(f"... and {result['error_count'] - len(result['errors'])} more rejected rows", err=True)
+    click.echo(f"Imported {result['imported']} questions into quiz {quiz.name}, rejected {result['error_count']} rows")
+
+
+@admin_blueprint.cli.command("export-questions")
+@click.argument("quiz_id", type=int)
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default="csv")
+@click.option("--output", type=click.Path(dir_okay=False), help="Write to a file instead of stdout")
+def export_questions_command(quiz_id, fmt, output):
+    """Export the questions of QUIZ_ID as CSV or JSONL."""
+    if db.session.get(Quiz, quiz_id) is None:
+        raise click.ClickException(f"Quiz {quiz_id} does not exist")
+    with click.open_file(output or "-", "w", encoding="utf-8") as f:
+        for text in export_questions(quiz_id, fmt):
+            f.write(text)
+
+
+# Scores export for reporting: every attempt joined with user, quiz, chapter and subject
+@admin_blueprint.route("/scores/export")
+@admin_required
+def export_scores():
+    try:
+        filters = parse_filters(request.args)
+    except ExportError as e:
+        return str(e), 400
+
+    if request.args.get("format") == "parquet":
+        # Parquet needs its footer written last, so the file is built before the first byte
+        # is sent; larger exports would outlast the worker timeout and go through the CLI
+        limit = current_app.config.get("SCORES_EXPORT_PARQUET_MAX_ROWS")
+        if limit is not None and more_than(limit, **filters):
+            return (f"More than {limit} attempts match: narrow start/end/subject_id, split the export "
+                    f"with after_id, download CSV (streamed) or run flask export-scores"), 400
+        spool = tempfile.TemporaryFile()
+        try:
+            export_parquet(spool, **filters)
+        except ExportError as e:
+            spool.close()
+            return str(e), 400
+        spool.seek(0)
+        return send_file(spool, mimetype="application/vnd.apache.parquet", as_attachment=True, download_name="scores.parquet")
+
+    # Resume an interrupted download with ?after_id=<last scores_id received>
+    return Response(
+        stream_with_context(export_csv(**filters)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=scores.csv"},
+    )
 
 
+@admin_blueprint.cli.command("export-scores")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "parquet"]), default="csv")
+@click.option("--start", type=click.DateTime(formats=["%Y-%m-%d"]), help="First attempt date to include")
+@click.option("--end", type=click.DateTime(formats=["%Y-%m-%d"]), help="Last attempt date to include")
+@click.option("--subject-id", type=int)
+@click.option("--after-id", type=int, help="Only attempts with a larger Scores id")
+@click.option("--resume", is_flag=True, help="Append to an existing CSV export, continuing after its last row")
+def export_scores_command(output, fmt, start, end, subject_id, after_id, resume):
+    """Export every attempt (optionally filtered) to OUTPUT as CSV or Parquet; '-' writes CSV to stdout."""
+    filters = {"start": start.date() if start else None, "end": end.date() if end else None,
+               "subject_id": subject_id, "after_id": after_id}
+
+    if fmt == "parquet":
+        if resume or output == "-":
+            raise click.ClickException("Parquet exports are written to a file in one go; use --after-id to split them")
+        try:
+            count = export_parquet(output, **filters)
+        except ExportError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Exported {count} attempts to {output}", err=True)
+        return
+
+    header = True
+    if resume and output != "-" and os.path.exists(output) and os.path.getsize(output):
+        try:
+            filters["after_id"] = last_exported_id(output) or after_id
+        except ExportError as e:
+            raise click.ClickException(str(e))
+        header = False
+        click.echo(f"Resuming after Scores id {filters['after_id']}", err=True)
+
+    with click.open_file(output, "a" if not header else "w", encoding="utf-8") as f:
+        for text in export_csv(header=header, **filters):
+            f.write(text)
+
+
+@admin_blueprint.cli.command("grade-batch")
+@click.argument("quiz_id", type=int)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def grade_batch_command(quiz_id, path):
+    """Grade a CSV/JSON file of submissions for QUIZ_ID and store the scores."""
+    quiz = db.session.get(Quiz, quiz_id)
+    if quiz is None:
+        raise click.ClickException(f"Quiz {quiz_id} does not exist")
+
+    with open(path, encoding="utf-8", newline="") as f:
+        try:
+            scores = grade_batch(quiz.id, parse_submissions(f, path))
+        except SubmissionFormatError as e:
+            raise click.ClickException(str(e))
 
+    click.echo(f"Graded {len(scores)} submissions for quiz {quiz.name}")
 
 
+@admin_blueprint.cli.command("item-analysis")
+@click.argument("quiz_id", type=int)
+def item_analysis_command(quiz_id):
+    """Print difficulty, discrimination and option shares for each question of QUIZ_ID."""
+    if db.session.get(Quiz, quiz_id) is None:
+        raise click.ClickException(f"Quiz {quiz_id} does not exist")
+    analysis = item_analysis.get(quiz_id, fresh=True)
+    click.echo(f"{analysis['students']} attempts with stored answers")
+    click.echo(f"{'question':>9} {'p':>6} {'D':>6}   blank     1     2     3     4")
+    for q_id, item in analysis["items"].items():
+        options = " ".join(f"{item['options'][option]:5.2f}" for option in range(1, 5))
+        flag = "  <- review" if item["flagged"] else ""
+        click.echo(f"{q_id:>9} {item['difficulty']:6.2f} {item['discrimination']:6.2f}   {item['blank']:5.2f} {options}{flag}")
 
+
+@admin_blueprint.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recompute the per-quiz and per-user score aggregates from the Scores table."""
+    rebuild_all()
+    click.echo(f"Rebuilt statistics for {QuizStats.query.count()} quizzes")
+
+
+# Manage Users
+@admin_blueprint.route("/users", methods=["GET", "POST"])
+@admin_required
+def manage_users():
+    search_query = request.args.get("search", "").strip()  # Get search input
+
+    if search_query:
+        # Ranked full-text search over username, full name, email and qualification
+        if request.args.get("all") == "1":
+            return stream_template("admin/manage_users.html", users=search_users(search_query), page=None, search_query=search_query)
+        page = offset_paginate(lambda offset, limit: search_users(search_query, offset, limit))
+        return render_template("admin/manage_users.html", users=page.items, page=page, search_query=search_query)
+
+    return render_listing("admin/manage_users.html", User.query, User.id, "users", search_query=search_query)
+
+
+@admin_blueprint.route("/users/<int:user_id>/delete", methods=["POST"])
+@admin_required
+def delete_user(user_id):
+    user = User.query.get_or_404(user_id)
+    username = user.username
+    autosave.forget(user_ids=[user_id])
+    remove_user(user_id)  # scores, answers, drafts and aggregates go with it (ON DELETE CASCADE)
+    identity_cache.invalidate(user_id)
+
+    logger.info(f"User {username} deleted successfully")
+    return redirect(url_for("admin.manage_users"))
@@ -0,0 +1,185 @@
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import urllib.request
+from flask import url_for, request, session, send_from_directory, abort
+
+try:
+    import brotli
+except ImportError:  # optional: without it assets are precompressed to gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_MAX_AGE = 365 * 24 * 3600  # fingerprinted names change with their content, so they never go stale
+MANIFEST_NAME = "manifest.json"
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".map", ".svg", ".json", ".txt")
+
+# Third-party assets, kept under static/vendor so no page depends on a CDN. Fetched (and
+# checked against their subresource integrity hashes) by `flask vendor-assets`.
+VENDOR_ASSETS = {
+    "vendor/bootstrap/bootstrap.min.css": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+        "sha384-9ndCyUaIbzAi2FUVXJi0CjmCapSmO7SnpJef0486qhLnuZ2cdeRhO02iuK6FUUVM",
+    ),
+    "vendor/bootstrap/bootstrap.bundle.min.js": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js",
+        "sha384-geWF76RCwLtnZ8qwWowPQNguL3RmwHVBC9FhGdlKrxdiJJigb/j/68SIy3Te4Bkz",
+    ),
+}
+
+# Precompressed variants, best first: (Accept-Encoding token, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def vendor_assets(static_folder, timeout=30):
+    """Download VENDOR_ASSETS into ``static_folder``. Returns the paths written."""
+    written = []
+    for path, (source, integrity) in VENDOR_ASSETS.items():
+        with urllib.request.urlopen(source, timeout=timeout) as response:
+            data = response.read()
+        algorithm, expected = integrity.split("-", 1)
+        actual = base64.b64encode(hashlib.new(algorithm, data).digest()).decode("ascii")
+        if actual != expected:
+            raise ValueError(f"{source} does not match its integrity hash {integrity}")
+        target = os.path.join(static_folder, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        written.append(path)
+    return written
+
+
+def missing_vendor_assets(static_folder):
+    return [path for path in VENDOR_ASSETS if not os.path.exists(os.path.join(static_folder, path))]
+
+
+def build_assets(static_folder, build_dir, require_vendor=True):
+    """Copy every static file to ``build_dir`` under a content-hashed name, with .gz (and,
+    if brotli is installed, .br) variants, and write the manifest. Returns the manifest.
+
+    Files of earlier builds are kept: pages rendered before a deploy may still reference them.
+    Raises FileNotFoundError if a vendored asset has not been downloaded, as pages would
+    then depend on its CDN; ``require_vendor=False`` builds anyway.
+    """
+    missing = missing_vendor_assets(static_folder)
+    if missing and require_vendor:
+        raise FileNotFoundError(f"Vendored assets missing (run flask vendor-assets): {', '.join(missing)}")
+    build_dir = os.path.abspath(build_dir)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != build_dir)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            stem, suffix = os.path.splitext(path)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{suffix}"
+            variants = {"": data}
+            if suffix in COMPRESSIBLE_SUFFIXES:
+                variants[".gz"] = gzip.compress(data, compresslevel=9, mtime=0)
+                if brotli is not None:
+                    variants[".br"] = brotli.compress(data, quality=11)
+            for extension, content in variants.items():
+                if extension and len(content) >= len(data):
+                    continue  # not worth a Content-Encoding
+                target = os.path.join(build_dir, hashed + extension)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    f.write(content)
+            manifest[path] = hashed
+
+    temporary = os.path.join(build_dir, MANIFEST_NAME + ".tmp")
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary, os.path.join(build_dir, MANIFEST_NAME))
+    return manifest
+
+
+class AssetPipeline:
+    """Fingerprinted static assets: the ``asset_url`` template helper and the /assets route.
+
+    With a manifest from `flask build-assets`, ``asset_url("css/auth.css")`` points at
+    /assets/css/auth.<hash>.css, served with a one-year immutable Cache-Control and, when
+    the client accepts it, from the precompressed .br or .gz file. Without a build, assets
+    are served unfingerprinted from /static. A vendored file that is missing is logged as an
+    error and left to 404, so it gets noticed; only with ASSETS_CDN_FALLBACK (development)
+    is it loaded from its CDN instead. A build refuses to run without the vendored files.
+    """
+
+    def __init__(self):
+        self.static_folder = None
+        self.build_dir = None
+        self.cdn_fallback = False
+        self.manifest = {}
+        self._encoded = frozenset()
+        self._missing = frozenset()
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.build_dir = app.config.get("ASSETS_BUILD_DIR") or os.path.join(app.static_folder, "dist")
+        self.cdn_fallback = app.config.get("ASSETS_CDN_FALLBACK", False)
+        self.load()
+        app.add_url_rule("/assets/<path:filename>", "assets", self.serve)
+        app.jinja_env.globals["asset_url"] = self.url
+
+        # flask_login reads the session after every request, which makes Flask add Vary: Cookie
+        # and keeps shared caches from storing assets. Registered before the LoginManager, so
+        # this runs after its hook.
+        @app.after_request
+        def drop_vary_cookie(response):
+            if request.endpoint == "assets":
+                session.accessed = False
+            return response
+
+    def load(self):
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST_NAME), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+            logger.info("No asset manifest: serving static files unfingerprinted (run flask build-assets)")
+        self._missing = frozenset(path for path in missing_vendor_assets(self.static_folder)
+                                  if path not in self.manifest)
+        if self._missing:
+            fallback = "loading them from their CDN" if self.cdn_fallback else "pages will render without them"
+            logger.error(f"Vendored assets missing ({fallback}): {', '.join(sorted(self._missing))};"
+                         " run flask vendor-assets and commit static/vendor")
+        # Which precompressed variants exist, checked once instead of on every request
+        self._encoded = frozenset(
+            hashed + extension for hashed in self.manifest.values() for _, extension in ENCODINGS
+            if os.path.exists(os.path.join(self.build_dir, hashed + extension))
+        )
+
+    def url(self, path):
+        hashed = self.manifest.get(path)
+        if hashed is not None:
+            return url_for("assets", filename=hashed)
+        if path in self._missing and self.cdn_fallback:
+            return VENDOR_ASSETS[path][0]
+        return url_for("static", filename=path)
+
+    def serve(self, filename):
+        if filename == MANIFEST_NAME or filename.endswith((".gz", ".br", ".tmp")):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        for encoding, extension in ENCODINGS:
+            if filename + extension in self._encoded and request.accept_encodings[encoding]:
+                response = send_from_directory(self.build_dir, filename + extension, mimetype=mimetype,
+                                               max_age=ASSET_MAX_AGE)
+                response.content_encoding = encoding
+                break
+        else:
+            response = send_from_directory(self.build_dir, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+assets = AssetPipeline()
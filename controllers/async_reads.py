@@ -0,0 +1,64 @@
+import logging
+import asyncio
+from flask import render_template, redirect, url_for
+from flask_login import login_required, current_user
+from controllers.pagination import keyset_paginate_async
+from controllers.user_routes import attempts_of, latest_score, spooled_score, pending_score, forget_pending_score
+from models.models import Scores
+from models.schedule import schedule
+from models.async_db import async_db
+from models.score_writer import score_writer
+
+logger = logging.getLogger(__name__)
+
+# Async versions of the read-heavy user pages. With ASYNC_READS on, init_async_reads()
+# swaps them in for the sync views under the same endpoints, so URLs and templates are
+# unchanged. They run the same statements as the sync views, on the async engine; the
+# quiz listing comes from the in-process quiz schedule, as in the sync dashboard.
+
+
+async def user_dashboard():
+    view = schedule.get()
+    async with async_db.session() as session:
+        page = await keyset_paginate_async(session, attempts_of(current_user.id), Scores.id, descending=True)
+    return render_template("user_dashboard.html", quizzes=view.open, upcoming=view.upcoming, user_attempts=page.items, page=page)
+
+
+async def quiz_result(quiz_id):
+    # A just-submitted attempt may still be waiting in the write-behind queue (see the sync view)
+    saved = pending_score(quiz_id)
+    queued = score_writer.latest(current_user.id, quiz_id)
+    if queued is not None and (saved is None or queued["key"] == saved[1]):
+        return render_template("user/quiz_result.html", quiz_id=quiz_id, score=queued["total_scored"])
+
+    async with async_db.session() as session:
+        if saved is not None:
+            if (await session.execute(spooled_score(saved[1]))).first() is None:
+                return render_template("user/quiz_result.html", quiz_id=quiz_id, score=saved[0])
+            forget_pending_score(quiz_id)
+        score = (await session.execute(latest_score(current_user.id, quiz_id))).scalar()
+
+    if score is None:
+        logger.warning("No attempt found for this quiz.")
+        return redirect(url_for("user.user_dashboard"))
+    return render_template("user/quiz_result.html", quiz_id=quiz_id, score=score)
+
+
+ASYNC_VIEWS = {
+    "user.user_dashboard": user_dashboard,
+    "user.quiz_result": quiz_result,
+}
+
+
+def init_async_reads(app):
+    try:
+        import asgiref  # noqa: F401  Flask needs it to run async views
+    except ImportError:
+        raise RuntimeError("ASYNC_READS needs asgiref and an async driver: pip install 'flask[async]' aiosqlite (or asyncpg)")
+    async_db.init_app(app)
+    # Run each async view to completion in a fresh loop on the request's own thread. The
+    # default (asgiref's async_to_sync) hands it back to the server's loop when served
+    # through WsgiToAsgi, which deadlocks or fails under concurrent requests.
+    app.async_to_sync = lambda func: lambda *args, **kwargs: asyncio.run(func(*args, **kwargs))
+    for endpoint, view in ASYNC_VIEWS.items():
+        app.view_functions[endpoint] = login_required(view)
@@ -1,9 +1,12 @@
+import logging
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, current_user, logout_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from controllers.password_hashing import password_hasher, login_throttle, HashingBusy
 from datetime import datetime
 from models.models import db, User
 
+logger = logging.getLogger(__name__)
+
 auth_blueprint = Blueprint("auth", __name__)
 
 # User registration route
@@ -21,21 +24,32 @@ def register():
         try:
             dob = datetime.strptime(dob, "%Y-%m-%d").date()
         except ValueError:
-            print("Invalid Date Format! Use YYYY-MM-DD.")
+            logger.warning("Invalid Date Format! Use YYYY-MM-DD.")
             return redirect(url_for("auth.register"))
 
         # Check if user already exists
         if User.query.filter_by(email=email).first():
-            print("Email already registered")
+            login_throttle.failed(request.remote_addr or "", email)
+            logger.warning("Email already registered")
             return redirect(url_for("auth.register"))
 
-        hashed_password = generate_password_hash(password, method="pbkdf2:sha256")
+        if not login_throttle.allow(request.remote_addr or "", email):
+            logger.warning("Too many attempts, please wait a minute.")
+            return render_template("register.html", error="Too many attempts, please wait a minute."), 429
+
+        # Hashing runs in the bounded worker pool, not on the request thread
+        try:
+            hashed_password = password_hasher.generate(password)
+        except HashingBusy:
+            logger.warning("Password hashing queue is full")
+            return render_template("register.html", error="The server is busy, please try again in a moment."), 503
+
         new_user = User(full_name=full_name, username=username, email=email, qualification=qualification, dob=dob, password=hashed_password)
 
         db.session.add(new_user)
         db.session.commit()
 
-        print("Registration successful! You can now log in.")
+        logger.info("Registration successful! You can now log in.")
         return redirect(url_for("auth.login"))
     
     return render_template("register.html")
@@ -48,10 +62,28 @@ def login():
         email = request.form.get("email")
         password = request.form.get("password")
 
+        # Only failed attempts count (recorded below), from the client IP ProxyFix resolves
+        if not login_throttle.allow(request.remote_addr or "", email or ""):
+            logger.warning(f"Too many failed login attempts for: {email}")
+            return render_template("login.html", error="Too many failed login attempts, please wait a minute."), 429
+
         user = User.query.filter_by(email=email).first()
 
-        if user and check_password_hash(user.password, password):
-            print(f"✅ Login Successful for: {user.email}")
+        matches = False
+        if user:
+            try:
+                matches, new_hash = password_hasher.verify(user.password, password)
+            except HashingBusy:
+                logger.warning("Password hashing queue is full")
+                return render_template("login.html", error="The server is busy, please try again in a moment."), 503
+
+        if matches:
+            # Transparently upgrade hashes made with an older work factor
+            if new_hash:
+                user.password = new_hash
+                db.session.commit()
+
+            logger.info(f"Login Successful for: {user.email}")
             login_user(user, remember=True)  # Logs in user via Flask-Login
             session["user_id"] = user.id  # Store user ID
             session["is_admin"] = user.is_admin  # Store admin status
@@ -62,7 +94,8 @@ def login():
                 return redirect(next_page)
             return redirect(url_for("admin.admin_dashboard") if user.is_admin else url_for("user.user_dashboard"))
         
-        print("❌ Invalid Credentials")
+        login_throttle.failed(request.remote_addr or "", email or "")
+        logger.warning("Invalid Credentials")
         return render_template("login.html")  # Stay on login page
 
     return render_template("login.html")
@@ -73,7 +106,7 @@ def logout():
     session.pop("user_id", None)
     session.pop("is_admin", None)
     logout_user()
-    print("🔴 User logged out")
+    logger.info("User logged out")
     return redirect(url_for("auth.login"))
 
 
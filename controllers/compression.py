@@ -0,0 +1,42 @@
+import gzip
+from flask import request
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    "text/html", "text/plain", "text/css", "text/csv", "application/json", "application/javascript",
+})
+
+
+def init_compression(app):
+    """gzip text responses of at least COMPRESS_MIN_SIZE bytes for clients that accept it.
+
+    Static files are left alone: they are passed through as files, and the fingerprinted
+    ones already have precompressed variants (controllers/assets.py). A compressed response
+    keeps its ETag as a weak one, since the bytes differ from the uncompressed entity.
+    """
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    level = app.config.get("COMPRESS_LEVEL", 6)
+    if min_size is None:
+        return
+
+    @app.after_request
+    def compress(response):
+        if (
+            response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.vary.add("Accept-Encoding")
+        if not request.accept_encodings["gzip"]:
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=level))
+        response.content_encoding = "gzip"
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,7 +1,10 @@
+import logging
 from flask import session, redirect, url_for, abort
 from flask_login import current_user, logout_user
 from functools import wraps
-from models.models import User
+from models.identity_cache import identity_cache
+
+logger = logging.getLogger(__name__)
 
 def admin_required(f):
     @wraps(f)
@@ -10,15 +13,15 @@ def admin_required(f):
 
         # Check if user is logged in
         if not user_id:
-            print("[DEBUG] Unauthorized access. Redirecting to login page.")
+            logger.debug("Unauthorized access. Redirecting to login page.")
             return redirect(url_for("auth.login"))
 
-        # Fetch user from the database
-        user = User.query.get(user_id)
+        # Fetch user identity (id, username, is_admin) from the cache
+        user = identity_cache.get(user_id)
 
         # Check if user exists and is an admin
         if not user or not user.is_admin:
-            print("[DEBUG] Non-admin user tried accessing admin dashboard. Logging out.")
+            logger.debug("Non-admin user tried accessing admin dashboard. Logging out.")
             logout_user()  # Logout non-admin users who try to access admin pages
             session.pop("user_id", None)
             session.pop("is_admin", None)
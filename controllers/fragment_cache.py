@@ -0,0 +1,84 @@
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from threading import Lock
+from markupsafe import Markup
+from models.catalog import catalog
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class Fragment:
+    __slots__ = ("html", "etag", "last_modified", "size")
+
+    def __init__(self, html, last_modified):
+        self.html = Markup(html)
+        # Content-addressed, so every worker computes the same ETag for the same content
+        self.etag = hashlib.sha1(html.encode("utf-8")).hexdigest()[:20]
+        self.last_modified = last_modified
+        self.size = len(html.encode("utf-8"))
+
+
+class FragmentCache:
+    """Rendered HTML fragments keyed by quiz id and version, evicted LRU past ``max_bytes``.
+
+    The version pairs a local counter, moved by ``bump(quiz_id)`` in the worker that changed
+    the quiz, with the quiz's content version in the catalog snapshot, which reaches the
+    other workers within one catalog check. Admin routes do both on every question change.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+        self._versions = {}
+        self._lock = Lock()
+
+    def get_or_render(self, quiz_id, render):
+        content_version = catalog.content_version(quiz_id)
+        with self._lock:
+            key = (quiz_id, self._versions.get(quiz_id, 0), content_version)
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        fragment = Fragment(render(), datetime.now(timezone.utc).replace(microsecond=0))
+
+        with self._lock:
+            if key[1] != self._versions.get(quiz_id, 0):
+                # Bumped while we were rendering; serve it once but don't cache stale content
+                return fragment
+            if key not in self._fragments:
+                # Older versions of this quiz are never asked for again
+                for stale in [k for k in self._fragments if k[0] == quiz_id]:
+                    self.size -= self._fragments.pop(stale).size
+                self._fragments[key] = fragment
+                self.size += fragment.size
+            while self.size > self.max_bytes and self._fragments:
+                _, evicted = self._fragments.popitem(last=False)
+                self.size -= evicted.size
+        return fragment
+
+    def bump(self, quiz_id):
+        with self._lock:
+            self._versions[quiz_id] = self._versions.get(quiz_id, 0) + 1
+            for stale in [k for k in self._fragments if k[0] == quiz_id]:
+                self.size -= self._fragments.pop(stale).size
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._fragments), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+quiz_fragments = FragmentCache()
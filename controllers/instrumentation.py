@@ -0,0 +1,192 @@
+import cProfile
+import hmac
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, g, has_request_context, request, before_render_template, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from models.models import db
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+METRICS = {
+    # name: (help, buckets)
+    "quizmaster_request_duration_seconds": ("Time to handle a request, by endpoint", LATENCY_BUCKETS),
+    "quizmaster_request_sql_statements": ("SQL statements issued per request, by endpoint", STATEMENT_BUCKETS),
+    "quizmaster_request_sql_seconds": ("Time spent in SQL per request, by endpoint", LATENCY_BUCKETS),
+    "quizmaster_template_render_seconds": ("Time to render a template, by template", LATENCY_BUCKETS),
+}
+
+
+class Histogram:
+    """Counts of observations per bucket, cumulated only when rendered."""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+
+class Metrics:
+    """Per-process request metrics in Prometheus text format.
+
+    Histograms are kept per (metric, labels) and only touched under one lock, which is
+    cheap next to a request. With several gunicorn workers each process has its own
+    numbers, so scrape every worker or sum them in the Prometheus query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.counts[bisect_left(buckets, value)] += 1
+            histogram.sum += value
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted((key, list(h.counts), h.sum) for key, h in self._histograms.items())
+
+        lines = []
+        for name, (help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), counts, total in snapshot:
+                if metric != name:
+                    continue
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                cumulative = 0
+                for bound, count in zip([*buckets, "+Inf"], counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label_text}}} {total}")
+                lines.append(f"{name}_count{{{label_text}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+def init_instrumentation(app):
+    """Record per-request latency, SQL and template timings and serve them at /metrics.
+
+    METRICS_ENABLED (default off) adds the hooks and the /metrics endpoint; with
+    METRICS_TOKEN set, scrapes must send it as ``Authorization: Bearer <token>``. With
+    PROFILING_ENABLED, an admin can add ?_profile=1 to any URL to get the cProfile stats
+    of that request instead of its response, or ?_profile=pyinstrument for a sampling
+    profile if pyinstrument is installed.
+    """
+    if app.config.get("METRICS_ENABLED", False):
+        _init_metrics(app)
+    if app.config.get("PROFILING_ENABLED"):
+        _init_profiling(app)
+
+
+def _init_metrics(app):
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def start_statement(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+        @event.listens_for(db.engine, "after_cursor_execute")
+        def end_statement(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+            if has_request_context():
+                g.sql_count = g.get("sql_count", 0) + 1
+                g.sql_time = g.get("sql_time", 0.0) + elapsed
+
+    def start_template(sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault("template_started", []).append(time.perf_counter())
+
+    def end_template(sender, template, context, **extra):
+        started = g.get("template_started") if has_request_context() else None
+        if started:
+            metrics.observe("quizmaster_template_render_seconds", {"template": template.name},
+                            time.perf_counter() - started.pop())
+
+    # Strong references: the signal handlers are local functions
+    before_render_template.connect(start_template, app, weak=False)
+    template_rendered.connect(end_template, app, weak=False)
+
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        started = g.get("request_started")
+        if started is None:
+            return
+        # Unrouted URLs share one label so that scanners cannot blow up the series count
+        endpoint = request.endpoint or "unmatched"
+        metrics.observe("quizmaster_request_duration_seconds",
+                        {"endpoint": endpoint, "method": request.method, "status": g.get("response_status", 500)},
+                        time.perf_counter() - started)
+        metrics.observe("quizmaster_request_sql_statements", {"endpoint": endpoint}, g.get("sql_count", 0))
+        metrics.observe("quizmaster_request_sql_seconds", {"endpoint": endpoint}, g.get("sql_time", 0.0))
+
+    token = app.config.get("METRICS_TOKEN")
+
+    @app.route("/metrics")
+    def metrics_view():
+        if token is not None:
+            scheme, _, given = request.headers.get("Authorization", "").partition(" ")
+            if scheme.lower() != "bearer" or not hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8")):
+                abort(401)
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _init_profiling(app):
+    @app.before_request
+    def start_profile():
+        mode = request.args.get("_profile")
+        if not mode or not (current_user.is_authenticated and current_user.is_admin):
+            return
+        if mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                return Response("pyinstrument is not installed: pip install pyinstrument\n", 501, mimetype="text/plain")
+            g.profiler = Profiler()
+            g.profiler.start()
+        else:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def end_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(60)
+            return Response(report.getvalue(), mimetype="text/plain")
+        profiler.stop()
+        return Response(profiler.output_html(), mimetype="text/html")
@@ -0,0 +1,151 @@
+from bisect import bisect_left, bisect_right
+from flask import request, url_for, render_template, stream_template
+from sqlalchemy import Select
+from models.models import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows fetched per round trip when streaming a full listing
+STREAM_BATCH_SIZE = 1000
+
+
+class Page:
+    """One page of a keyset-paginated listing, with URLs for the neighbouring pages."""
+
+    def __init__(self, items, next_cursor, prev_cursor, size):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.size = size
+
+    @property
+    def next_url(self):
+        return _page_url(after=self.next_cursor) if self.next_cursor is not None else None
+
+    @property
+    def prev_url(self):
+        return _page_url(before=self.prev_cursor) if self.prev_cursor is not None else None
+
+    @property
+    def stream_url(self):
+        return _page_url(all=1)
+
+
+class OffsetPage(Page):
+    """A page of a ranked listing (e.g. search results) that has no key order to seek on."""
+
+    def __init__(self, items, number, has_next, size):
+        super().__init__(items, None, None, size)
+        self.number = number
+        self.has_next = has_next
+
+    @property
+    def next_url(self):
+        return _page_url(page=self.number + 1) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return _page_url(page=self.number - 1) if self.number > 1 else None
+
+
+def _page_url(**cursor):
+    args = {k: v for k, v in request.args.items() if k not in ("after", "before", "page", "all")}
+    args.update(cursor)
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def page_size():
+    size = request.args.get("size", DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_paginate(query, key_column, descending=False):
+    """Paginate ``query`` on ``key_column`` using the ``after``/``before`` cursors in the request.
+
+    Rows must expose the key under the column's name (e.g. ``row.id``). Each page costs one
+    indexed range scan of ``size + 1`` rows, however deep into the listing it is.
+    """
+    query, cursors = _keyset_query(query, key_column, descending)
+    rows = db.session.execute(query).all() if isinstance(query, Select) else query.all()
+    return _keyset_page(rows, key_column, *cursors)
+
+
+def keyset_paginate_sequence(items, key_column):
+    """keyset_paginate over an in-memory sequence sorted by ``key_column`` (e.g. a catalog snapshot)."""
+    size = page_size()
+    after = request.args.get("after", type=int)
+    before = request.args.get("before", type=int)
+    key = lambda item: _key(item, key_column)
+    if before is not None:
+        end = bisect_left(items, before, key=key)
+        rows = list(items[max(0, end - size - 1):end][::-1])
+    else:
+        start = bisect_right(items, after, key=key) if after is not None else 0
+        rows = list(items[start:start + size + 1])
+    return _keyset_page(rows, key_column, size, after, before)
+
+
+async def keyset_paginate_async(session, statement, key_column, descending=False):
+    """keyset_paginate for a select() statement run on an AsyncSession."""
+    statement, cursors = _keyset_query(statement, key_column, descending)
+    return _keyset_page((await session.execute(statement)).all(), key_column, *cursors)
+
+
+def _keyset_query(query, key_column, descending):
+    # Works on both legacy Query objects and select() statements (both have filter/order_by/limit)
+    size = page_size()
+    after = request.args.get("after", type=int)
+    before = request.args.get("before", type=int)
+    forward, backward = (key_column.desc(), key_column.asc()) if descending else (key_column.asc(), key_column.desc())
+
+    if before is not None:
+        preceding = key_column > before if descending else key_column < before
+        return query.filter(preceding).order_by(backward).limit(size + 1), (size, after, before)
+    if after is not None:
+        query = query.filter(key_column < after if descending else key_column > after)
+    return query.order_by(forward).limit(size + 1), (size, after, before)
+
+
+def _keyset_page(rows, key_column, size, after, before):
+    has_more = len(rows) > size
+    if before is not None:
+        rows = rows[:size][::-1]
+        next_cursor = _key(rows[-1], key_column) if rows else None
+        prev_cursor = _key(rows[0], key_column) if rows and has_more else None
+    else:
+        rows = rows[:size]
+        next_cursor = _key(rows[-1], key_column) if rows and has_more else None
+        prev_cursor = _key(rows[0], key_column) if rows and after is not None else None
+    return Page(rows, next_cursor, prev_cursor, size)
+
+
+def offset_paginate(fetch):
+    """Paginate a ranked result set; ``fetch(offset, limit)`` returns the rows."""
+    size = page_size()
+    number = max(1, request.args.get("page", 1, type=int))
+    rows = fetch((number - 1) * size, size + 1)
+    return OffsetPage(rows[:size], number, len(rows) > size, size)
+
+
+def render_listing(template, query, key_column, items_name, descending=False, **context):
+    """Render a paginated listing, or stream every row when the request asks for ``all=1``.
+
+    ``query`` may also be a sequence already sorted by ``key_column`` (ascending only).
+    """
+    if isinstance(query, (list, tuple)):
+        if request.args.get("all") == "1":
+            return render_template(template, page=None, **{items_name: query}, **context)
+        page = keyset_paginate_sequence(query, key_column)
+        return render_template(template, page=page, **{items_name: page.items}, **context)
+
+    if request.args.get("all") == "1":
+        order = key_column.desc() if descending else key_column.asc()
+        rows = query.order_by(order).yield_per(STREAM_BATCH_SIZE)
+        return stream_template(template, page=None, **{items_name: rows}, **context)
+
+    page = keyset_paginate(query, key_column, descending)
+    return render_template(template, page=page, **{items_name: page.items}, **context)
+
+
+def _key(row, key_column):
+    return getattr(row, key_column.key)
@@ -0,0 +1,176 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HASH_METHOD = "pbkdf2:sha256"
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued, or the pool could not finish one."""
+
+
+def normalize_method(method):
+    """The method prefix Werkzeug writes into hashes made with ``method``, defaults filled in.
+
+    "pbkdf2" -> "pbkdf2:sha256:<default iterations>", "scrypt" -> "scrypt:32768:8:1". Stored
+    hashes are compared with it, so a bare or partial setting does not look outdated forever.
+    """
+    name, *args = method.split(":")
+    if name == "pbkdf2" and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    if name == "scrypt" and not args:
+        return "scrypt:32768:8:1"
+    return method
+
+
+def _verify(stored_hash, password, method):
+    # Runs in a worker process: check the password and, if the hash uses an outdated
+    # work factor, return a fresh hash for the caller to store.
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split("$", 1)[0] != method:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    """Runs pbkdf2 hashing in a bounded process pool so login storms cannot starve request threads.
+
+    At most ``max_queue`` hashes may be pending; beyond that HashingBusy is raised and the
+    caller should answer 503 instead of piling up more CPU work.
+    """
+
+    def __init__(self):
+        self.method = normalize_method(DEFAULT_HASH_METHOD)
+        self.workers = max(1, (os.cpu_count() or 2) // 2)
+        self.max_queue = 64
+        self.timeout = 30
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._latencies = deque(maxlen=2000)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def init_app(self, app):
+        self.method = normalize_method(app.config.get("PASSWORD_HASH_METHOD", DEFAULT_HASH_METHOD))
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", self.workers)
+        self.max_queue = app.config.get("PASSWORD_HASH_MAX_QUEUE", self.max_queue)
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+
+    def verify(self, stored_hash, password):
+        """Return (matches, new_hash); new_hash is set when the stored hash should be upgraded."""
+        return self._run(_verify, stored_hash, password, self.method)
+
+    def generate(self, password):
+        return self._run(generate_password_hash, password, method=self.method)
+
+    def latency_percentiles(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return {}
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+        return {"count": len(samples), "p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99)}
+
+    def _run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+        start = time.perf_counter()
+        executor = self._pool()
+        try:
+            return executor.submit(fn, *args, **kwargs).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            logger.warning(f"Password hash did not finish within {self.timeout} s")
+            raise HashingBusy() from None
+        except BrokenProcessPool:
+            # A worker process died; replace the pool so later logins do not fail as well
+            logger.error("Password hashing pool is broken, starting a new one")
+            self._reset(executor)
+            raise HashingBusy() from None
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._latencies.append((time.perf_counter() - start) * 1000)
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Not fork: the web process already runs threads that may hold locks
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LoginThrottle:
+    """Sliding-window limits on failed logins per client IP and per account.
+
+    Only failures count, so a lab full of students behind one address is never held back
+    by its own successful logins. Behind a reverse proxy the client IP is only right with
+    TRUSTED_PROXIES set (see app.py); otherwise every client shares the proxy's address.
+    """
+
+    def __init__(self, per_ip=100, per_account=10, window=60):
+        self.per_ip = per_ip
+        self.per_account = per_account
+        self.window = window
+        self._attempts = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def init_app(self, app):
+        self.per_ip = app.config.get("LOGIN_LIMIT_PER_IP", self.per_ip)
+        self.per_account = app.config.get("LOGIN_LIMIT_PER_ACCOUNT", self.per_account)
+        self.window = app.config.get("LOGIN_LIMIT_WINDOW", self.window)
+
+    def allow(self, ip, account):
+        """False if the IP or the account has had too many failed attempts in the window."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep > self.window:
+                self._sweep(now)
+            return (len(self._recent(("ip", ip), now)) < self.per_ip
+                    and len(self._recent(("account", account.lower()), now)) < self.per_account)
+
+    def failed(self, ip, account):
+        """Record a failed attempt."""
+        now = time.monotonic()
+        with self._lock:
+            self._recent(("ip", ip), now).append(now)
+            self._recent(("account", account.lower()), now).append(now)
+
+    def clear(self):
+        with self._lock:
+            self._attempts.clear()
+
+    def _recent(self, key, now):
+        hits = self._attempts[key]
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        return hits
+
+    def _sweep(self, now):
+        # Drop keys with no attempts left in the window so the table stays small
+        for key in [k for k, hits in self._attempts.items() if not hits or hits[-1] <= now - self.window]:
+            del self._attempts[key]
+        self._last_sweep = now
+
+
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
@@ -0,0 +1,37 @@
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from models.models import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def init_query_budget(app):
+    """Count SQL statements per request and fail requests that exceed SQL_QUERY_BUDGET.
+
+    Meant for tests: set SQL_QUERY_BUDGET (and TESTING, so the error propagates to the
+    test client) to catch N+1 regressions in user and admin routes. Per-endpoint limits
+    can be given in SQL_QUERY_BUDGET_OVERRIDES, e.g. {"admin.import_scores": 20}.
+    """
+    budget = app.config.get("SQL_QUERY_BUDGET")
+    if budget is None:
+        return  # 0 is a budget: no SQL at all
+
+    overrides = app.config.get("SQL_QUERY_BUDGET_OVERRIDES", {})
+
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context():
+                g.sql_statements = g.get("sql_statements", 0) + 1
+
+    @app.after_request
+    def check_query_budget(response):
+        if request.blueprint not in ("user", "admin"):
+            return response
+        limit = overrides.get(request.endpoint, budget)
+        issued = g.get("sql_statements", 0)
+        if issued > limit:
+            raise QueryBudgetExceeded(f"{request.endpoint} issued {issued} SQL statements (budget {limit})")
+        return response
@@ -1,27 +1,140 @@
-from flask import Blueprint, render_template, request, url_for, redirect
+import hashlib
+import logging
+import time
+from sqlalchemy import select
+from flask import Blueprint, render_template, request, url_for, redirect, make_response, session, jsonify
 from flask_login import login_required, current_user
+from controllers.pagination import keyset_paginate
+from controllers.fragment_cache import quiz_fragments, Fragment
 from models.models import Quiz, Scores, Question, db
+from models.answer_keys import answer_key_cache
+from models.score_writer import score_writer
+from models.aggregates import record_attempts
+from models.attempt_sessions import attempt_sessions
+from models.autosave import autosave
+from models.item_analysis import answer_rows, store_answers
+from models.question_pools import draw_paper, paper_of
+from models.schedule import schedule, in_window
 import datetime
 
+logger = logging.getLogger(__name__)
 
 user_blueprint = Blueprint("user", __name__)
 
+# Statements behind the read-heavy pages, shared with the async views in controllers/async_reads.py
+def attempts_of(user_id):
+    return (
+        select(
+            Scores.id, Scores.total_scored, Scores.time_stamp_of_attempt,
+            Quiz.name.label("quiz_name")
+        )
+        .join(Quiz, Scores.quiz_id == Quiz.id)
+        .where(Scores.user_id == user_id)
+    )
+
+
+def latest_score(user_id, quiz_id):
+    return (
+        select(Scores.total_scored)
+        .where(Scores.user_id == user_id, Scores.quiz_id == quiz_id)
+        .order_by(Scores.id.desc())
+        .limit(1)
+    )
+
+
+def spooled_score(spool_key):
+    # Whether a write-behind attempt has reached the scores table (unique index ux_scores_spool_key)
+    return select(Scores.id).where(Scores.spool_key == spool_key)
+
+
+def remember_pending_score(quiz_id, record):
+    # The write-behind queue is per worker: keep the score in the session so the result page
+    # shows it whichever worker serves it, until the row is in the scores table
+    pending = session.get("pending_scores", {})
+    pending[str(quiz_id)] = [record["total_scored"], record["key"]]
+    session["pending_scores"] = pending
+
+
+def pending_score(quiz_id):
+    """``[score, spool key]`` of this user's last write-behind attempt at a quiz, kept in the session."""
+    return session.get("pending_scores", {}).get(str(quiz_id))
+
+
+def forget_pending_score(quiz_id):
+    pending = session.get("pending_scores", {})
+    if pending.pop(str(quiz_id), None) is not None:
+        session["pending_scores"] = pending
+
+
 # User Dashboard
 @user_blueprint.route("/dashboard")
 @login_required
 def user_dashboard():
-    quizzes = Quiz.query.all()
-    
-    # Fetch past attempts with quiz details
-    user_attempts = (
-        db.session.query(Scores, Quiz)
-        .join(Quiz, Scores.quiz_id == Quiz.id)
-        .filter(Scores.user_id == current_user.id)
-        .order_by(Scores.id.desc())  # Latest first
-        .all()
-    )
-    
-    return render_template("user_dashboard.html", quizzes=quizzes, user_attempts=user_attempts)
+    # Only what can be attempted today or later, from the per-day cached schedule
+    view = schedule.get()
+
+    # Fetch past attempts with quiz details, one page at a time (latest first)
+    page = keyset_paginate(attempts_of(current_user.id), Scores.id, descending=True)
+
+    return render_template("user_dashboard.html", quizzes=view.open, upcoming=view.upcoming, user_attempts=page.items, page=page)
+
+def _open_attempt(quiz_id):
+    # The attempt in the signed cookie, from this worker's memory if it has the same one. Without
+    # a cookie entry there is none open, even if this worker still remembers one submitted elsewhere.
+    saved = session.get("attempts", {}).get(str(quiz_id))
+    return attempt_sessions.resume(current_user.id, quiz_id, saved)
+
+
+def _remember_attempt(attempt_session):
+    # Entries of attempts opened but never submitted are dropped once they expire, so the
+    # cookie does not grow with every quiz a student ever opened
+    now = time.time()
+    saved = session.get("attempts", {})
+    attempts = {key: value for key, value in saved.items() if not attempt_sessions.cookie_expired(value, now)}
+    attempts[str(attempt_session.quiz_id)] = attempt_session.to_cookie()
+    if attempts != saved:
+        session["attempts"] = attempts
+
+
+def _forget_attempt(quiz_id):
+    attempts = session.get("attempts", {})
+    if attempts.pop(str(quiz_id), None) is not None:
+        session["attempts"] = attempts
+
+
+def _attempt_paper(quiz, attempt_session, answer_key, shuffle_options=True):
+    """The attempt's own paper, or None when the whole quiz is asked in order.
+
+    Drawn on the first visit and kept in memory. The cookie only holds the seed and the
+    pool's content version, so a worker taking the attempt over draws it again: the same
+    paper, unless the pool changed in between.
+    """
+    if attempt_session.question_ids is not None:
+        return paper_of(attempt_session.seed, attempt_session.question_ids, shuffle_options)
+    if not quiz.sample_size:
+        return None
+    if attempt_session.pool_version not in (None, answer_key.version):
+        logger.warning(f"Questions of quiz {quiz.id} changed since this attempt's paper was drawn; drawing it again")
+    paper = draw_paper(answer_key, quiz.sample_size, attempt_session.seed, shuffle_options)
+    attempt_session.question_ids = paper.question_ids
+    attempt_session.pool_version = answer_key.version
+    return paper
+
+
+def _paper_fragment(paper, attempt_session):
+    # This student's own paper: only its questions are loaded. Per student, so rendered
+    # every time instead of cached.
+    ids = paper.question_ids.tolist()
+    by_id = {question.id: question for question in Question.query.filter(Question.id.in_(ids))}
+    questions, option_orders = [], []
+    for q_id, options in zip(ids, paper.option_orders):
+        if q_id in by_id:  # deleted since the answer key was cached
+            questions.append(by_id[q_id])
+            option_orders.append(options)
+    html = render_template("user/_quiz_questions.html", questions=questions, option_orders=option_orders)
+    started = datetime.datetime.fromtimestamp(int(attempt_session.started_at), datetime.timezone.utc)
+    return Fragment(html, started)
+
 
 @user_blueprint.route("/quiz/<int:quiz_id>/attempt", methods=["GET", "POST"])
 @login_required
@@ -29,37 +142,146 @@ def attempt_quiz(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
 
     if request.method == "POST":
+        # The submission must belong to an attempt opened with GET, within its deadline
+        attempt_session = _open_attempt(quiz_id)
+        if attempt_session is None:
+            logger.warning("No open attempt for this quiz. Start the quiz first.")
+            return redirect(url_for("user.attempt_quiz", quiz_id=quiz_id))
+        on_time = attempt_sessions.finish(attempt_session)
+        _forget_attempt(quiz_id)
+        if not on_time:
+            logger.warning("Time is up: the submission arrived after the quiz deadline.")
+            return redirect(url_for("user.user_dashboard"))
+        if not in_window(quiz.date, attempt_session.started_at):
+            # Started outside the quiz's scheduled day (e.g. it was rescheduled meanwhile). An attempt
+            # started in time may still be submitted after midnight, within its own deadline.
+            logger.warning("This attempt was not started on the day the quiz is scheduled for.")
+            return redirect(url_for("user.user_dashboard"))
+        time_started = datetime.datetime.utcfromtimestamp(attempt_session.started_at)
+
         # Strip "q" prefix from keys to match correct_answers
         selected_options = {key[1:]: request.form[key] for key in request.form}  # Removing "q" from "q1", "q2"
-        correct_answers = {str(q.id): str(q.correct_option) for q in quiz.questions}
+        answer_key = answer_key_cache.get(quiz_id)
+        # A pooled attempt is graded on the questions drawn when it was opened
+        paper = _attempt_paper(quiz, attempt_session, answer_key, shuffle_options=False)
+        paper_seed = None if paper is None else paper.seed
 
-        # Debugging prints
-        print(f"Selected Options (Fixed): {selected_options}")
-        print(f"Correct Answers: {correct_answers}")
+        logger.debug("Selected options for quiz %s: %s", quiz_id, selected_options)
 
-        # Calculate score
-        score = sum(1 for q_id in correct_answers if selected_options.get(q_id) == correct_answers[q_id])
+        # Calculate score against the cached answer key
+        score = answer_key.grade(selected_options, None if paper is None else paper.question_ids)
 
-        # Save attempt in database
-        attempt = Scores(user_id=current_user.id, quiz_id=quiz_id, total_scored=score)
-        db.session.add(attempt)
-        db.session.commit()
+        # Save attempt in database, or hand it to the write-behind queue
+        if score_writer.enabled:
+            answers = {row["question_id"]: row["selected_option"] for row in answer_rows(None, answer_key, selected_options, paper)}
+            record = score_writer.submit(current_user.id, quiz_id, score, time_started=time_started, answers=answers,
+                                         paper_seed=paper_seed)
+            remember_pending_score(quiz_id, record)
+        else:
+            attempt = Scores(user_id=current_user.id, quiz_id=quiz_id, total_scored=score, time_started=time_started,
+                             paper_seed=paper_seed)
+            db.session.add(attempt)
+            db.session.flush()
+            record_attempts([(attempt.id, current_user.id, quiz_id, score)])
+            store_answers(answer_rows(attempt.id, answer_key, selected_options, paper))  # one executemany per submission
+            db.session.commit()
+        autosave.discard(current_user.id, quiz_id, attempt_session.started_at)
 
         return redirect(url_for("user.quiz_result", quiz_id=quiz_id, score=score))
 
-    return render_template("user/quiz_attempt.html", quiz=quiz)
+    # Attempts can only be started on the day the quiz is scheduled for. One started that day
+    # can still be reloaded after midnight, within its deadline, as it can be submitted then.
+    attempt_session = _open_attempt(quiz_id)  # take over one opened on another worker, or drop one finished elsewhere
+    resuming = (attempt_session is not None and attempt_sessions.is_open(attempt_session)
+                and in_window(quiz.date, attempt_session.started_at))
+    if not resuming and not in_window(quiz.date):
+        logger.warning(f"Quiz {quiz.name} is not open: it is scheduled for {quiz.date}.")
+        return redirect(url_for("user.user_dashboard"))
 
+    # Opening (or reloading) the quiz starts the clock once; nothing is written to the database
+    attempt_session = attempt_sessions.start(current_user.id, quiz_id, quiz.duration)
 
+    paper = None
+    if quiz.sample_size or attempt_session.question_ids is not None:
+        paper = _attempt_paper(quiz, attempt_session, answer_key_cache.get(quiz_id))
+    if paper is not None:
+        fragment = _paper_fragment(paper, attempt_session)
+    else:
+        # The question list is identical for every student: render it once per content version
+        fragment = quiz_fragments.get_or_render(quiz_id, lambda: render_template(
+            "user/_quiz_questions.html",
+            questions=Question.query.filter_by(quiz_id=quiz_id).order_by(Question.id).all(),
+        ))
+    _remember_attempt(attempt_session)  # after the draw, so the cookie copy holds the pool version too
+
+    # The page around the fragment shows the quiz name and the deadline, so fold them into the validator
+    etag = hashlib.sha1(f"{fragment.etag}:{quiz.name}:{attempt_session.deadline}".encode("utf-8")).hexdigest()[:20]
+    if request.if_none_match.contains_weak(etag):  # weak once the response is gzipped
+        response = make_response("", 304)
+    else:
+        response = make_response(render_template(
+            "user/quiz_attempt.html", quiz=quiz, questions_html=fragment.html, attempt_session=attempt_session,
+        ))
+    response.set_etag(etag)
+    response.last_modified = fragment.last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # browsers revalidate every time and usually get a 304
+    return response
+
+
+# Autosave: the attempt page posts answer changes here and reloads them on resume
+@user_blueprint.route("/quiz/<int:quiz_id>/autosave", methods=["POST"])
+@login_required
+def autosave_answers(quiz_id):
+    attempt_session = _open_attempt(quiz_id)
+    if attempt_session is None or not attempt_sessions.is_open(attempt_session):
+        return jsonify(error="No open attempt for this quiz"), 409
+
+    payload = request.get_json(silent=True) or {}
+    answers = payload.get("answers")
+    if not isinstance(answers, dict):
+        return jsonify(error="Expected {\"answers\": {question_id: option}}"), 400
+
+    # Served from the answer key cache: an autosave normally runs no SQL at all
+    question_ids = set(answer_key_cache.get(quiz_id).question_ids)
+    accepted = {}
+    for q_id, option in answers.items():
+        q_id, option = str(q_id).lstrip("q"), str(option)
+        if q_id.isdigit() and int(q_id) in question_ids and option in ("1", "2", "3", "4"):
+            accepted[int(q_id)] = int(option)
+    autosave.record(current_user.id, quiz_id, attempt_session.started_at, accepted)
+    return jsonify(saved=len(accepted))
+
+
+@user_blueprint.route("/quiz/<int:quiz_id>/draft")
+@login_required
+def draft_answers(quiz_id):
+    attempt_session = _open_attempt(quiz_id)
+    if attempt_session is None:
+        return jsonify(answers={})
+    answers = autosave.draft(current_user.id, quiz_id, attempt_session.started_at)
+    return jsonify(answers={str(q_id): option for q_id, option in answers.items()})
 
 
 @user_blueprint.route("/quiz/<int:quiz_id>/result")
 @login_required
 def quiz_result(quiz_id):
-    attempt = Scores.query.filter_by(user_id=current_user.id, quiz_id=quiz_id).order_by(Scores.id.desc()).first()
+    # A just-submitted attempt may still be waiting in the write-behind queue of this worker or
+    # of the one that took the submission; the session has its score until the row is written
+    saved = pending_score(quiz_id)
+    queued = score_writer.latest(current_user.id, quiz_id)
+    if queued is not None and (saved is None or queued["key"] == saved[1]):
+        return render_template("user/quiz_result.html", quiz_id=quiz_id, score=queued["total_scored"])
+    if saved is not None:
+        if db.session.execute(spooled_score(saved[1])).first() is None:
+            return render_template("user/quiz_result.html", quiz_id=quiz_id, score=saved[0])
+        forget_pending_score(quiz_id)  # written: read from the scores table from now on
+
+    score = db.session.execute(latest_score(current_user.id, quiz_id)).scalar()
 
-    if not attempt:
-        print("No attempt found for this quiz.")
+    if score is None:
+        logger.warning("No attempt found for this quiz.")
         return redirect(url_for("user.user_dashboard"))
 
-    return render_template("user/quiz_result.html", quiz_id=quiz_id, score=attempt.total_scored)
+    return render_template("user/quiz_result.html", quiz_id=quiz_id, score=score)
 
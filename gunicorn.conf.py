@@ -0,0 +1,31 @@
+# Gunicorn settings for `gunicorn -c gunicorn.conf.py wsgi:app`. Each value can be
+# overridden from the environment or the command line.
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# Several processes for CPU-bound rendering, a few threads each for requests waiting on
+# the database. Password hashes run in a separate pool per worker; with many workers set
+# QUIZMASTER_PASSWORD_HASH_WORKERS=1 so the pools don't oversubscribe the CPUs.
+# Caches in each worker are checked against version counters in the database (the catalog
+# and each quiz's content version), and pending write-behind scores travel in the session,
+# so any worker can serve any request.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Not preloaded: the write-behind, autosave and session-sweeper threads must start inside
+# each worker, and threads do not survive the fork from a preloaded master.
+preload_app = False
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound the growth of per-process caches
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
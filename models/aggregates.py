@@ -0,0 +1,268 @@
+import heapq
+import json
+import math
+from collections import Counter
+from sqlalchemy import case, func
+from sqlalchemy.dialects import sqlite, postgresql
+from models.models import db, Scores, QuizStats, UserStats
+
+LEADERBOARD_SIZE = 10
+# Keys looked up per IN (...) query, to stay under SQLite's bound-parameter limit
+KEY_CHUNK_SIZE = 5000
+
+
+def _rank(entry):
+    # Higher score first, then the earlier attempt
+    score, scores_id, _ = entry
+    return (-score, scores_id)
+
+
+def _merge_leaderboard(board, candidates):
+    # Keep each user's best attempt, then the top LEADERBOARD_SIZE overall
+    best = {}
+    for entry in board + candidates:
+        current = best.get(entry[2])
+        if current is None or _rank(entry) < _rank(current):
+            best[entry[2]] = entry
+    return heapq.nsmallest(LEADERBOARD_SIZE, best.values(), key=_rank)
+
+
+def _fold(attempts, key_index):
+    # Per-key [count, sum, sum of squares, max, histogram] for a batch of attempts
+    totals = {}
+    for attempt in attempts:
+        score = attempt[3]
+        t = totals.get(attempt[key_index])
+        if t is None:
+            t = totals[attempt[key_index]] = [0, 0, 0, score, Counter()]
+        t[0] += 1
+        t[1] += score
+        t[2] += score * score
+        t[3] = max(t[3], score)
+        t[4][score] += 1
+    return totals
+
+
+def _insert(model):
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    raise RuntimeError(f"Score aggregates need an upsert, not implemented for {dialect}")
+
+
+def _apply(model, key_column, totals, boards=None):
+    # Counters in one upsert, so two first attempts at the same quiz (or by the same user)
+    # cannot both insert its row; the upsert also locks the rows for the JSON merge below
+    statement = _insert(model)
+    table, new = model.__table__, statement.excluded
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[key_column.key],
+            set_={
+                "attempt_count": table.c.attempt_count + new.attempt_count,
+                "score_sum": table.c.score_sum + new.score_sum,
+                "score_sq_sum": table.c.score_sq_sum + new.score_sq_sum,
+                "max_score": case((new.max_score > table.c.max_score, new.max_score), else_=table.c.max_score),
+            },
+        ),
+        [
+            {key_column.key: key, "attempt_count": count, "score_sum": total, "score_sq_sum": squares, "max_score": best}
+            for key, (count, total, squares, best, _) in totals.items()
+        ],
+    )
+
+    keys = list(totals)
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        chunk = keys[start:start + KEY_CHUNK_SIZE]
+        for stats in model.query.filter(key_column.in_(chunk)).with_for_update().populate_existing():
+            key = getattr(stats, key_column.key)
+            merged = json.loads(stats.histogram)
+            for score, n in totals[key][4].items():
+                merged[str(score)] = merged.get(str(score), 0) + n
+            stats.histogram = json.dumps(merged)
+            if boards is not None:
+                stats.leaderboard = json.dumps(_merge_leaderboard(json.loads(stats.leaderboard), boards[key]))
+
+
+def record_attempts(attempts):
+    """Fold new attempts into QuizStats/UserStats in the current session.
+
+    ``attempts`` is a list of (scores_id, user_id, quiz_id, total_scored); call it after
+    the Scores rows are inserted and before the commit, so both land in one transaction.
+    Each touched stats row is read and written once per call, however many attempts it gets.
+    """
+    if not attempts:
+        return
+    boards = {}
+    for scores_id, user_id, quiz_id, score in attempts:
+        boards.setdefault(quiz_id, []).append([score, scores_id, user_id])
+
+    _apply(QuizStats, QuizStats.quiz_id, _fold(attempts, 2), boards)
+    _apply(UserStats, UserStats.user_id, _fold(attempts, 1))
+
+
+def summary(stats):
+    """Mean, standard deviation and histogram from a stats row, without touching Scores."""
+    count = stats.attempt_count
+    mean = stats.score_sum / count if count else 0.0
+    variance = stats.score_sq_sum / count - mean * mean if count else 0.0
+    histogram = {int(score): n for score, n in json.loads(stats.histogram).items()}
+    return {
+        "attempts": count,
+        "mean": mean,
+        "stddev": math.sqrt(max(variance, 0.0)),
+        "max": stats.max_score,
+        "histogram": dict(sorted(histogram.items())),
+    }
+
+
+def leaderboard(stats):
+    return [{"score": score, "scores_id": scores_id, "user_id": user_id} for score, scores_id, user_id in json.loads(stats.leaderboard)]
+
+
+def users_with_attempts(quiz_ids):
+    """Ids of users who attempted any of ``quiz_ids``; their UserStats must be rebuilt if those quizzes go."""
+    quiz_ids = list(quiz_ids)
+    if not quiz_ids:
+        return set()
+    return {row.user_id for row in db.session.query(Scores.user_id).filter(Scores.quiz_id.in_(quiz_ids)).distinct()}
+
+
+def user_attempt_totals(user_id):
+    """Per quiz ``[count, sum, sum of squares, max, histogram]`` of one user's attempts.
+
+    Read before the attempts are deleted, for remove_user_attempts() to subtract afterwards;
+    one grouped read over the user's index, however many attempts the quizzes have.
+    """
+    totals = {}
+    for quiz_id, score, n in (
+        db.session.query(Scores.quiz_id, Scores.total_scored, func.count(Scores.id))
+        .filter(Scores.user_id == user_id)
+        .group_by(Scores.quiz_id, Scores.total_scored)
+    ):
+        t = totals.get(quiz_id)
+        if t is None:
+            t = totals[quiz_id] = [0, 0, 0, score, Counter()]
+        t[0] += n
+        t[1] += score * n
+        t[2] += score * score * n
+        t[3] = max(t[3], score)
+        t[4][score] += n
+    return totals
+
+
+def remove_user_attempts(user_id, totals):
+    """Take a deleted user's attempts out of their quizzes' QuizStats. Does not commit.
+
+    Counters and histograms are subtracted and the maximum comes from what is left of the
+    histogram, so no Scores are read. Dropping the user's leaderboard entry leaves the rest
+    exact unless the board was full: only then is the next best attempt unknown, and that
+    quiz alone is rebuilt from Scores.
+    """
+    stale = []
+    quiz_ids = list(totals)
+    for start in range(0, len(quiz_ids), KEY_CHUNK_SIZE):
+        chunk = quiz_ids[start:start + KEY_CHUNK_SIZE]
+        for stats in QuizStats.query.filter(QuizStats.quiz_id.in_(chunk)).with_for_update().populate_existing():
+            count, total, squares, _, histogram = totals[stats.quiz_id]
+            if stats.attempt_count <= count:
+                db.session.delete(stats)  # no attempts left, as after a rebuild
+                continue
+            stats.attempt_count -= count
+            stats.score_sum -= total
+            stats.score_sq_sum -= squares
+            merged = json.loads(stats.histogram)
+            for score, n in histogram.items():
+                left = merged.get(str(score), 0) - n
+                if left > 0:
+                    merged[str(score)] = left
+                else:
+                    merged.pop(str(score), None)
+            stats.histogram = json.dumps(merged)
+            stats.max_score = max(int(score) for score in merged)
+
+            board = json.loads(stats.leaderboard)
+            kept = [entry for entry in board if entry[2] != user_id]
+            if len(kept) < len(board) and len(board) >= LEADERBOARD_SIZE:
+                stale.append(stats)
+            stats.leaderboard = json.dumps(kept)
+    if stale:
+        db.session.flush()
+        for stats in stale:
+            db.session.expunge(stats)  # replaced by the rebuilt rows
+        rebuild_quiz_stats([stats.quiz_id for stats in stale])
+
+
+def rebuild_quiz_stats(quiz_ids=None):
+    """Recompute QuizStats (all quizzes, or just ``quiz_ids``) from Scores. Does not commit."""
+    filters = [] if quiz_ids is None else [Scores.quiz_id.in_(list(quiz_ids))]
+    stale = QuizStats.query if quiz_ids is None else QuizStats.query.filter(QuizStats.quiz_id.in_(list(quiz_ids)))
+    stale.delete(synchronize_session=False)
+    rows = _rebuild(QuizStats, Scores.quiz_id, *filters)
+
+    # Leaderboards: best attempt per (quiz, user), then the top N per quiz
+    best = (
+        db.session.query(Scores.quiz_id, Scores.user_id, func.max(Scores.total_scored).label("score"))
+        .filter(*filters)
+        .group_by(Scores.quiz_id, Scores.user_id)
+        .subquery()
+    )
+    best_attempts = (
+        db.session.query(best.c.quiz_id, best.c.user_id, best.c.score, func.min(Scores.id).label("scores_id"))
+        .join(Scores, (Scores.quiz_id == best.c.quiz_id) & (Scores.user_id == best.c.user_id) & (Scores.total_scored == best.c.score))
+        .group_by(best.c.quiz_id, best.c.user_id, best.c.score)
+        .yield_per(10000)
+    )
+    boards = {}
+    for row in best_attempts:
+        board = boards.setdefault(row.quiz_id, [])
+        entry = (row.score, -row.scores_id, row.user_id)
+        if len(board) < LEADERBOARD_SIZE:
+            heapq.heappush(board, entry)
+        elif entry > board[0]:
+            heapq.heapreplace(board, entry)
+    for quiz_id, board in boards.items():
+        rows[quiz_id].leaderboard = json.dumps(_merge_leaderboard([], [[score, -neg_id, user_id] for score, neg_id, user_id in board]))
+
+
+def rebuild_user_stats(user_ids=None):
+    """Recompute UserStats (all users, or just ``user_ids``) from Scores. Does not commit."""
+    filters = [] if user_ids is None else [Scores.user_id.in_(list(user_ids))]
+    stale = UserStats.query if user_ids is None else UserStats.query.filter(UserStats.user_id.in_(list(user_ids)))
+    stale.delete(synchronize_session=False)
+    _rebuild(UserStats, Scores.user_id, *filters)
+
+
+def rebuild_all():
+    """Backfill every aggregate from the Scores table (a few grouped scans)."""
+    rebuild_quiz_stats()
+    rebuild_user_stats()
+    db.session.commit()
+
+
+def _rebuild(model, key_column, *filters):
+    key_name = key_column.key
+    totals = (
+        db.session.query(
+            key_column,
+            func.count(Scores.id),
+            func.sum(Scores.total_scored),
+            func.sum(Scores.total_scored * Scores.total_scored),
+            func.max(Scores.total_scored),
+        )
+        .filter(*filters)
+        .group_by(key_column)
+    )
+    rows = {
+        key: model(**{key_name: key}, attempt_count=count, score_sum=total, score_sq_sum=squares, max_score=best)
+        for key, count, total, squares, best in totals
+    }
+    histograms = {}
+    for key, score, count in db.session.query(key_column, Scores.total_scored, func.count(Scores.id)).filter(*filters).group_by(key_column, Scores.total_scored):
+        histograms.setdefault(key, {})[str(score)] = count
+    for key, stats in rows.items():
+        stats.histogram = json.dumps(histograms.get(key, {}))
+        db.session.add(stats)
+    return rows
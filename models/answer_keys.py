@@ -0,0 +1,118 @@
+from array import array
+from collections import OrderedDict
+from threading import Lock
+from models.models import db, Question
+from models.catalog import catalog
+
+# Number of quizzes whose answer keys are kept in memory
+DEFAULT_MAX_QUIZZES = 256
+
+
+class AnswerKey:
+    """Compact answer key of a quiz: parallel arrays of question ids and correct options."""
+
+    __slots__ = ("question_ids", "correct_options", "version", "_by_id")
+
+    def __init__(self, question_ids, correct_options, version=None):
+        self.question_ids = array("i", question_ids)
+        self.correct_options = array("b", correct_options)
+        self.version = version  # the quiz's content version it was loaded at (Quiz.content_version)
+        self._by_id = None
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def grade(self, selected_options, question_ids=None):
+        # selected_options maps question id (str) -> chosen option (str), as posted by the quiz form.
+        # question_ids restricts grading to the questions of a drawn paper (models/question_pools.py).
+        score = 0
+        if question_ids is None:
+            for q_id, correct in zip(self.question_ids, self.correct_options):
+                if selected_options.get(str(q_id)) == str(correct):
+                    score += 1
+            return score
+        by_id = self.correct_by_id()
+        for q_id in question_ids:
+            # A question deleted since the paper was drawn is not in the key and scores nothing
+            if selected_options.get(str(q_id)) == by_id.get(q_id):
+                score += 1
+        return score
+
+    def correct_by_id(self):
+        """Question id -> correct option (str)."""
+        by_id = self._by_id
+        if by_id is None:
+            # Built on the first sampled grading only; quizzes graded in full never pay for it
+            by_id = self._by_id = {q_id: str(correct) for q_id, correct in zip(self.question_ids, self.correct_options)}
+        return by_id
+
+
+class AnswerKeyCache:
+    """Bounded LRU cache of answer keys keyed by quiz id.
+
+    A cached key is only served while its version matches the quiz's content version in
+    the catalog snapshot, so a question change made through another worker reloads it here
+    within one catalog check. Each quiz also has a local generation, moved by
+    ``invalidate``; a key loaded while it moved is returned to its caller but not cached.
+    """
+
+    def __init__(self, max_quizzes=DEFAULT_MAX_QUIZZES):
+        self.max_quizzes = max_quizzes
+        self.hits = 0
+        self.misses = 0
+        self._keys = OrderedDict()
+        self._generations = {}
+        self._cleared = 0
+        self._lock = Lock()
+
+    def get(self, quiz_id):
+        version = catalog.content_version(quiz_id)
+        with self._lock:
+            key = self._keys.get(quiz_id)
+            if key is not None and key.version == version:
+                self._keys.move_to_end(quiz_id)
+                self.hits += 1
+                return key
+            self.misses += 1
+            generation = (self._cleared, self._generations.get(quiz_id, 0))
+
+        # Read after the version, so the key is never older than the version it is stored under
+        key = self._load(quiz_id)
+        key.version = version
+
+        with self._lock:
+            if (self._cleared, self._generations.get(quiz_id, 0)) != generation:
+                return key  # invalidated while loading: possibly stale, so not cached
+            self._keys[quiz_id] = key
+            self._keys.move_to_end(quiz_id)
+            while len(self._keys) > self.max_quizzes:
+                self._keys.popitem(last=False)
+        return key
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._keys.pop(quiz_id, None)
+            self._generations[quiz_id] = self._generations.get(quiz_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._cleared += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._keys), "max_size": self.max_quizzes, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _load(quiz_id):
+        # Only the two columns needed for grading, not full Question objects
+        rows = (
+            db.session.query(Question.id, Question.correct_option)
+            .filter(Question.quiz_id == quiz_id)
+            .order_by(Question.id)
+            .all()
+        )
+        return AnswerKey([row.id for row in rows], [row.correct_option for row in rows])
+
+
+answer_key_cache = AnswerKeyCache()
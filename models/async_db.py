@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from models.models import db
+from models.database import async_database_url, apply_sqlite_pragmas
+
+
+class AsyncDatabase:
+    """An AsyncEngine on the same database as ``db``, for async views (ASYNC_READS).
+
+    Flask runs every async view in an event loop of its own, and asyncio connections
+    cannot be shared between loops, so connections are not pooled: each request opens
+    one. That is cheap for SQLite; in front of Postgres use a pooler such as PgBouncer.
+    """
+
+    def __init__(self):
+        self.engine = None
+        self._sessionmaker = None
+
+    def init_app(self, app):
+        with app.app_context():
+            # db.engine.url has relative SQLite paths already resolved to the instance folder
+            url = async_database_url(db.engine.url)
+        self.engine = create_async_engine(url, poolclass=NullPool)
+        if url.get_backend_name() == "sqlite":
+            apply_sqlite_pragmas(self.engine.sync_engine, app.config.get("SQLITE_PRAGMAS", {}))
+        self._sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        # The engine's first connect runs one-off setup under an asyncio lock bound to the
+        # loop it happens on; do it here so requests on other loops never contend for it.
+        # On a thread of its own, as ASGI servers import the app inside their running loop.
+        warm_up = threading.Thread(target=asyncio.run, args=(self._connect_once(),))
+        warm_up.start()
+        warm_up.join()
+
+    async def _connect_once(self):
+        async with self.engine.connect():
+            pass
+
+    def session(self):
+        """``async with async_db.session() as session: ...``"""
+        if self._sessionmaker is None:
+            raise RuntimeError("async_db.init_app(app) has not been called; set ASYNC_READS")
+        return self._sessionmaker()
+
+
+async_db = AsyncDatabase()
@@ -0,0 +1,187 @@
+import sys
+import threading
+import time
+from array import array
+from models.question_pools import new_seed
+
+DEFAULT_GRACE_SECONDS = 30      # network and clock slack on top of the quiz duration
+DEFAULT_SWEEP_INTERVAL = 60
+UNTIMED_SESSION_TTL = 24 * 3600  # untimed attempts left open are dropped after a day
+
+
+def duration_seconds(duration):
+    """Quiz.duration (a time of day used as hh:mm) in seconds; 0 means untimed."""
+    if duration is None:
+        return 0
+    return duration.hour * 3600 + duration.minute * 60 + duration.second
+
+
+def _is_stale(started_at, deadline, grace, now):
+    if deadline is None:
+        return now > started_at + UNTIMED_SESSION_TTL
+    return now > deadline + grace
+
+
+class AttemptSession:
+    """One student's open attempt at one quiz. Times are Unix timestamps."""
+
+    __slots__ = ("user_id", "quiz_id", "started_at", "deadline", "seed", "pool_version", "question_ids")
+
+    def __init__(self, user_id, quiz_id, started_at, deadline, seed=None, pool_version=None, question_ids=None):
+        self.user_id = user_id
+        self.quiz_id = quiz_id
+        self.started_at = started_at
+        self.deadline = deadline  # None for untimed quizzes
+        self.seed = new_seed() if seed is None else seed  # the paper drawn if the quiz is a question pool
+        self.pool_version = pool_version  # the quiz's content version when that paper was drawn
+        self.question_ids = question_ids  # the drawn questions, graded as drawn; kept in memory only
+
+    def remaining(self, now=None):
+        if self.deadline is None:
+            return None
+        return max(0, int(self.deadline - (now or time.time())))
+
+    def to_cookie(self):
+        # No question ids: hundreds of them would push the session cookie past what browsers
+        # keep. The seed and pool version are enough to draw the same paper again.
+        return [self.started_at, self.deadline, self.seed, self.pool_version]
+
+    @classmethod
+    def from_cookie(cls, user_id, quiz_id, value):
+        # Cookies set before question pools hold no seed; such an attempt gets a fresh one.
+        # Older cookies hold the drawn question ids where the pool version now is.
+        started_at, deadline, seed, pool_version = (list(value) + [None, None])[:4]
+        question_ids = None
+        if isinstance(pool_version, list):
+            question_ids, pool_version = array("i", pool_version), None
+        return cls(user_id, quiz_id, float(started_at), None if deadline is None else float(deadline),
+                   None if seed is None else int(seed), pool_version, question_ids)
+
+
+class AttemptSessionStore:
+    """Open quiz attempts held in memory until they are submitted or expire.
+
+    Opening a quiz costs no database write: the start time only reaches the database with
+    the submitted Scores row. A background thread drops sessions whose deadline (plus
+    ``grace`` seconds) has passed. The store is per process, so routes also keep a copy in
+    the signed session cookie, which decides what is open: see ``resume``.
+    """
+
+    def __init__(self):
+        self.grace = DEFAULT_GRACE_SECONDS
+        self.sweep_interval = DEFAULT_SWEEP_INTERVAL
+        self.started = 0
+        self.submitted = 0
+        self.expired = 0
+        self.rejected = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self.grace = app.config.get("ATTEMPT_GRACE_SECONDS", self.grace)
+        self.sweep_interval = app.config.get("ATTEMPT_SWEEP_INTERVAL", self.sweep_interval)
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._run, name="attempt-session-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def start(self, user_id, quiz_id, duration):
+        """Return the user's open session for the quiz, creating it if needed.
+
+        Reloading the page keeps the original deadline; an expired session is replaced.
+        """
+        now = time.time()
+        key = (user_id, quiz_id)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and not self._is_late(session, now):
+                return session
+            seconds = duration_seconds(duration)
+            session = AttemptSession(user_id, quiz_id, now, now + seconds if seconds else None)
+            self._sessions[key] = session
+            self.started += 1
+            return session
+
+    def resume(self, user_id, quiz_id, saved):
+        """The open session the cookie copy ``saved`` stands for, or None without one.
+
+        The cookie is authoritative: an in-memory session it does not match (another
+        ``started_at``, or no cookie entry at all) was submitted or replaced through another
+        worker and is dropped; a session only in the cookie is taken over from it.
+        """
+        key = (user_id, quiz_id)
+        with self._lock:
+            session = self._sessions.get(key)
+            if saved is None:
+                if session is not None:
+                    del self._sessions[key]
+                return None
+            if session is None or session.started_at != float(saved[0]):
+                session = self._sessions[key] = AttemptSession.from_cookie(user_id, quiz_id, saved)
+            return session
+
+    def cookie_expired(self, saved, now=None):
+        """Whether the cookie copy ``saved`` is of an attempt the sweeper would have dropped."""
+        started_at, deadline = saved[0], saved[1]
+        return _is_stale(started_at, deadline, self.grace, now or time.time())
+
+    def get(self, user_id, quiz_id):
+        with self._lock:
+            return self._sessions.get((user_id, quiz_id))
+
+    def is_open(self, session, now=None):
+        return not self._is_late(session, now or time.time())
+
+    def finish(self, session, now=None):
+        """Close a session on submit. Returns False (and counts a rejection) if it ran out of time."""
+        now = now or time.time()
+        with self._lock:
+            if self._sessions.get((session.user_id, session.quiz_id)) is session:
+                del self._sessions[(session.user_id, session.quiz_id)]
+            if self._is_late(session, now):
+                self.rejected += 1
+                return False
+            self.submitted += 1
+            return True
+
+    def sweep(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            expired = [key for key, session in self._sessions.items() if self._is_stale(session, now)]
+            for key in expired:
+                del self._sessions[key]
+            self.expired += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            table_bytes = sys.getsizeof(self._sessions)
+        # Records plus the dict and its tuple keys; int/float fields are counted per record
+        record_bytes = sum(
+            sys.getsizeof(s) + sum(sys.getsizeof(getattr(s, name)) for name in AttemptSession.__slots__)
+            for s in sessions
+        )
+        key_bytes = sum(sys.getsizeof((s.user_id, s.quiz_id)) for s in sessions)
+        return {
+            "active": len(sessions),
+            "memory_bytes": table_bytes + record_bytes + key_bytes,
+            "started": self.started,
+            "submitted": self.submitted,
+            "expired": self.expired,
+            "rejected_late": self.rejected,
+        }
+
+    def _is_late(self, session, now):
+        return session.deadline is not None and now > session.deadline + self.grace
+
+    def _is_stale(self, session, now):
+        return _is_stale(session.started_at, session.deadline, self.grace, now)
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+
+attempt_sessions = AttemptSessionStore()
@@ -0,0 +1,242 @@
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlalchemy.exc import IntegrityError
+from models.models import db, DraftAnswer, Quiz, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 2.0  # seconds
+DEFAULT_MAX_PENDING = 50000   # buffered answers that trigger an early flush
+DEFAULT_MAX_RETRIES = 5       # consecutive failed flushes after which a batch is dropped
+
+
+class AutosaveBuffer:
+    """Coalesces autosaved answers in memory and upserts them into DraftAnswer in batches.
+
+    Each attempt keeps only the latest option per question, so a student changing their
+    mind ten times between flushes costs one row write. A background thread flushes every
+    ``flush_interval`` seconds, or sooner once ``max_pending`` answers are buffered.
+    Answers not yet flushed are lost if the process dies; the final submit does not depend
+    on them. Drafts of submitted attempts are deleted by the next flush as well, so a
+    submit itself writes nothing here.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.max_pending = DEFAULT_MAX_PENDING
+        self.max_retries = DEFAULT_MAX_RETRIES
+        self.received = 0
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self._pending = {}      # (user_id, quiz_id) -> [attempt_started, {question_id: option}]
+        self._pending_count = 0
+        self._discarded = {}    # (user_id, quiz_id) -> attempt_started of a submitted attempt
+        self._failed_flushes = 0  # in a row
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # orders flushes against discards
+        self._wakeup = threading.Event()
+        self._worker = None
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get("AUTOSAVE_FLUSH_INTERVAL", self.flush_interval)
+        self.max_pending = app.config.get("AUTOSAVE_MAX_PENDING", self.max_pending)
+        self.max_retries = app.config.get("AUTOSAVE_MAX_RETRIES", self.max_retries)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="autosave-flush", daemon=True)
+            self._worker.start()
+
+    def record(self, user_id, quiz_id, attempt_started, answers):
+        """Buffer ``answers`` ({question_id: option}) for an open attempt; later values win."""
+        key = (user_id, quiz_id)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None or entry[0] != attempt_started:
+                if entry is not None:
+                    self._pending_count -= len(entry[1])
+                entry = self._pending[key] = [attempt_started, {}]
+            before = len(entry[1])
+            entry[1].update(answers)
+            self._pending_count += len(entry[1]) - before
+            self.received += len(answers)
+            full = self._pending_count >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def draft(self, user_id, quiz_id, attempt_started):
+        """Saved answers of this attempt: the flushed rows overlaid with still-buffered ones."""
+        answers = dict(
+            db.session.execute(
+                select(DraftAnswer.question_id, DraftAnswer.selected_option).where(
+                    DraftAnswer.user_id == user_id,
+                    DraftAnswer.quiz_id == quiz_id,
+                    DraftAnswer.attempt_started == attempt_started,
+                )
+            ).all()
+        )
+        with self._lock:
+            entry = self._pending.get((user_id, quiz_id))
+            if entry is not None and entry[0] == attempt_started:
+                answers.update(entry[1])
+        return answers
+
+    def discard(self, user_id, quiz_id, attempt_started):
+        """Drop the draft of an attempt that was submitted.
+
+        Buffered answers go at once; rows already written (by any worker) are deleted with
+        the next flush. Only that attempt's rows, so a new attempt's drafts are kept.
+        """
+        key = (user_id, quiz_id)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is not None and entry[0] == attempt_started:
+                del self._pending[key]
+                self._pending_count -= len(entry[1])
+            self._discarded[key] = attempt_started
+
+    def forget(self, quiz_ids=(), user_ids=()):
+        """Drop buffered answers for deleted quizzes or users; they could no longer be written."""
+        quiz_ids, user_ids = set(quiz_ids), set(user_ids)
+        with self._lock:
+            for key in [key for key in self._pending if key[1] in quiz_ids or key[0] in user_ids]:
+                self._pending_count -= len(self._pending.pop(key)[1])
+            for key in [key for key in self._discarded if key[1] in quiz_ids or key[0] in user_ids]:
+                del self._discarded[key]  # their rows went with the cascade
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                discarded, self._discarded = self._discarded, {}
+                self._pending_count = 0
+            if not batch and not discarded:
+                return 0
+
+            now = datetime.utcnow()
+            rows = [
+                {"user_id": user_id, "quiz_id": quiz_id, "question_id": question_id,
+                 "selected_option": option, "attempt_started": started, "updated_at": now}
+                for (user_id, quiz_id), (started, answers) in batch.items()
+                for question_id, option in answers.items()
+            ]
+            try:
+                with self.app.app_context():
+                    written = self._write(rows, discarded)
+            except Exception as e:
+                self.failures += 1
+                self._failed_flushes += 1
+                if self._failed_flushes >= self.max_retries:
+                    # Drafts are a convenience: give up on them rather than retry one bad batch forever
+                    logger.error(f"Autosave flush of {len(rows)} answers failed {self._failed_flushes} times, dropped: {e}")
+                    self._failed_flushes = 0
+                    self.dropped += len(rows)
+                    return 0
+                logger.error(f"Autosave flush of {len(rows)} answers failed, will retry: {e}")
+                self._requeue(batch, discarded)
+                return 0
+
+        self._failed_flushes = 0
+        self.written += written
+        self.flushes += 1
+        return written
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending_attempts": len(self._pending),
+                "pending_answers": self._pending_count,
+                "received": self.received,
+                "written": self.written,
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "dropped": self.dropped,
+            }
+
+    def _write(self, rows, discarded):
+        try:
+            self._write_rows(rows, discarded)
+        except IntegrityError:
+            # The quiz or user of some attempts was deleted after their answers were buffered,
+            # possibly by another worker or the CLI, where forget() could not see them
+            kept = self._without_deleted(rows)
+            if len(kept) == len(rows):
+                raise
+            logger.warning(f"Dropped {len(rows) - len(kept)} autosaved answers of deleted quizzes or users")
+            self.dropped += len(rows) - len(kept)
+            self._write_rows(kept, discarded)
+            return len(kept)
+        return len(rows)
+
+    def _write_rows(self, rows, discarded):
+        try:
+            if discarded:
+                # Submitted attempts first: a new attempt's answers in ``rows`` have a later start
+                db.session.execute(
+                    DraftAnswer.__table__.delete().where(
+                        DraftAnswer.user_id == bindparam("u"),
+                        DraftAnswer.quiz_id == bindparam("q"),
+                        DraftAnswer.attempt_started == bindparam("s"),
+                    ),
+                    [{"u": user_id, "q": quiz_id, "s": started} for (user_id, quiz_id), started in discarded.items()],
+                )
+            if rows:
+                db.session.execute(self._upsert(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def _without_deleted(rows):
+        quiz_ids = set(db.session.scalars(select(Quiz.id).where(Quiz.id.in_({r["quiz_id"] for r in rows}))))
+        user_ids = set(db.session.scalars(select(User.id).where(User.id.in_({r["user_id"] for r in rows}))))
+        return [r for r in rows if r["quiz_id"] in quiz_ids and r["user_id"] in user_ids]
+
+    def _upsert(self):
+        dialect = db.engine.dialect.name
+        if dialect == "sqlite":
+            statement = sqlite.insert(DraftAnswer)
+        elif dialect == "postgresql":
+            statement = postgresql.insert(DraftAnswer)
+        else:
+            raise RuntimeError(f"Autosave upsert is not implemented for {dialect}")
+        return statement.on_conflict_do_update(
+            index_elements=[DraftAnswer.user_id, DraftAnswer.quiz_id, DraftAnswer.question_id],
+            set_={
+                "selected_option": statement.excluded.selected_option,
+                "attempt_started": statement.excluded.attempt_started,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+
+    def _requeue(self, batch, discarded):
+        # Put a failed batch back without overwriting answers that arrived since
+        with self._lock:
+            for key, started in discarded.items():
+                self._discarded.setdefault(key, started)
+            for key, (started, answers) in batch.items():
+                if self._discarded.get(key) == started:
+                    continue  # submitted meanwhile
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = [started, answers]
+                    self._pending_count += len(answers)
+                elif entry[0] == started:
+                    before = len(entry[1])
+                    entry[1] = {**answers, **entry[1]}
+                    self._pending_count += len(entry[1]) - before
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+autosave = AutosaveBuffer()
@@ -0,0 +1,71 @@
+from sqlalchemy import delete, select
+from models.models import db, Subject, Chapter, Quiz, User, Scores
+from models.aggregates import users_with_attempts, user_attempt_totals, remove_user_attempts, rebuild_user_stats
+
+DELETE_CHUNK_SIZE = 1000  # scores per delete transaction (about 0.1 s of write lock)
+REBUILD_CHUNK_SIZE = 500  # aggregates rebuilt per transaction
+
+# Set-based deletes of whole subtrees. Every foreign key down from subject, chapter, quiz
+# and user is ON DELETE CASCADE (SQLite with PRAGMA foreign_keys=ON), so deleting the root
+# row removes its chapters, quizzes, questions, drafts and aggregates in SQL without
+# loading anything into the session. The bulk of a subtree is its scores and their
+# attempt answers; those go first, DELETE_CHUNK_SIZE scores per transaction, so the
+# write lock is released between chunks and quiz submissions are not held up for the
+# length of the whole delete.
+
+
+def _delete_scores(where, chunk_size):
+    deleted = 0
+    while True:
+        chunk = select(Scores.id).where(where).limit(chunk_size).scalar_subquery()
+        result = db.session.execute(delete(Scores).where(Scores.id.in_(chunk)))
+        db.session.commit()
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            return deleted
+
+
+def _delete_quiz_tree(root, where, quiz_ids, chunk_size):
+    affected_users = users_with_attempts(quiz_ids)
+    if quiz_ids:
+        _delete_scores(Scores.quiz_id.in_(quiz_ids), chunk_size)
+    db.session.execute(delete(root).where(where))
+    db.session.commit()
+
+    affected_users = sorted(affected_users)
+    for start in range(0, len(affected_users), REBUILD_CHUNK_SIZE):
+        rebuild_user_stats(affected_users[start:start + REBUILD_CHUNK_SIZE])
+        db.session.commit()
+    return quiz_ids
+
+
+def remove_subject(subject_id, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete a subject and everything under it. Returns the ids of the deleted quizzes."""
+    quiz_ids = db.session.scalars(
+        select(Quiz.id).join(Chapter, Quiz.chapter_id == Chapter.id).where(Chapter.subject_id == subject_id)
+    ).all()
+    return _delete_quiz_tree(Subject, Subject.id == subject_id, quiz_ids, chunk_size)
+
+
+def remove_chapter(chapter_id, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete a chapter and everything under it. Returns the ids of the deleted quizzes."""
+    quiz_ids = db.session.scalars(select(Quiz.id).where(Quiz.chapter_id == chapter_id)).all()
+    return _delete_quiz_tree(Chapter, Chapter.id == chapter_id, quiz_ids, chunk_size)
+
+
+def remove_quiz(quiz_id, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete a quiz with its questions, scores and drafts. Returns ``[quiz_id]``."""
+    return _delete_quiz_tree(Quiz, Quiz.id == quiz_id, [quiz_id], chunk_size)
+
+
+def remove_user(user_id, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete a user with their scores, drafts and aggregates, then fix up the quizzes' aggregates.
+
+    The quizzes' aggregates are corrected by subtracting the user's attempts, not rebuilt
+    from Scores inside the final transaction (see remove_user_attempts).
+    """
+    totals = user_attempt_totals(user_id)
+    _delete_scores(Scores.user_id == user_id, chunk_size)
+    db.session.execute(delete(User).where(User.id == user_id))
+    remove_user_attempts(user_id, totals)
+    db.session.commit()
@@ -0,0 +1,180 @@
+import time
+from threading import Lock
+from sqlalchemy import event, select, update
+from models.models import db, Subject, Chapter, Quiz, CatalogVersion
+
+DEFAULT_CHECK_INTERVAL = 1.0  # seconds between version checks against the database
+
+
+class SubjectRecord:
+    __slots__ = ("id", "name", "description")
+
+    def __init__(self, id, name, description):
+        self.id = id
+        self.name = name
+        self.description = description
+
+
+class ChapterRecord:
+    __slots__ = ("id", "name", "description", "subject_id", "subject_name")
+
+    def __init__(self, id, name, description, subject_id, subject_name):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.subject_id = subject_id
+        self.subject_name = subject_name
+
+
+class QuizRecord:
+    __slots__ = ("id", "name", "description", "chapter_id", "date", "duration", "sample_size", "content_version",
+                 "chapter_name", "subject_name")
+
+    def __init__(self, id, name, description, chapter_id, date, duration, sample_size, content_version,
+                 chapter_name, subject_name):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.chapter_id = chapter_id
+        self.date = date
+        self.duration = duration
+        self.sample_size = sample_size
+        self.content_version = content_version
+        self.chapter_name = chapter_name
+        self.subject_name = subject_name
+
+
+class CatalogSnapshot:
+    """Read-only copy of the subject -> chapter -> quiz hierarchy at one catalog version.
+
+    Records are sorted by id; ``*_by_id`` map ids to records and ``chapters_of`` /
+    ``quizzes_of`` map a parent id to its children. Never modified once built.
+    """
+
+    __slots__ = ("version", "subjects", "chapters", "quizzes", "subject_by_id", "chapter_by_id", "quiz_by_id",
+                 "chapters_of", "quizzes_of")
+
+    def __init__(self, version, subjects, chapters, quizzes):
+        self.version = version
+        self.subjects = tuple(subjects)
+        self.chapters = tuple(chapters)
+        self.quizzes = tuple(quizzes)
+        self.subject_by_id = {s.id: s for s in self.subjects}
+        self.chapter_by_id = {c.id: c for c in self.chapters}
+        self.quiz_by_id = {q.id: q for q in self.quizzes}
+        chapters_of, quizzes_of = {}, {}
+        for chapter in self.chapters:
+            chapters_of.setdefault(chapter.subject_id, []).append(chapter)
+        for quiz in self.quizzes:
+            quizzes_of.setdefault(quiz.chapter_id, []).append(quiz)
+        self.chapters_of = {k: tuple(v) for k, v in chapters_of.items()}
+        self.quizzes_of = {k: tuple(v) for k, v in quizzes_of.items()}
+
+
+def _read_version():
+    return db.session.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar() or 0
+
+
+def load_snapshot():
+    # The version is read before the tables: a change committed in between makes the
+    # snapshot newer than its version, never older, and the next check rebuilds it again
+    version = _read_version()
+    subjects = [
+        SubjectRecord(*row)
+        for row in db.session.execute(select(Subject.id, Subject.name, Subject.description).order_by(Subject.id))
+    ]
+    subject_names = {s.id: s.name for s in subjects}
+    chapters = [
+        ChapterRecord(row.id, row.name, row.description, row.subject_id, subject_names.get(row.subject_id))
+        for row in db.session.execute(
+            select(Chapter.id, Chapter.name, Chapter.description, Chapter.subject_id).order_by(Chapter.id)
+        )
+    ]
+    chapter_by_id = {c.id: c for c in chapters}
+    quizzes = []
+    for row in db.session.execute(
+        select(Quiz.id, Quiz.name, Quiz.description, Quiz.chapter_id, Quiz.date, Quiz.duration, Quiz.sample_size,
+               Quiz.content_version)
+        .order_by(Quiz.id)
+    ):
+        chapter = chapter_by_id.get(row.chapter_id)
+        quizzes.append(QuizRecord(*row, chapter.name if chapter else None, chapter.subject_name if chapter else None))
+    return CatalogSnapshot(version, subjects, chapters, quizzes)
+
+
+class Catalog:
+    """This worker's catalog snapshot, rebuilt when the catalog version in the database moves.
+
+    Admin routes call ``changed()`` in the transaction of every subject, chapter or quiz
+    change. That bumps the version row, which other workers notice on their next check (at
+    most ``check_interval`` seconds later), and makes this worker check on its next read.
+    A rebuild swaps in a whole new snapshot, so readers never see a half-built one.
+    """
+
+    def __init__(self, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.rebuilds = 0
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.check_interval = app.config.get("CATALOG_CHECK_INTERVAL", self.check_interval)
+
+    def get(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and now - self._checked_at < self.check_interval:
+                return snapshot  # checked by another thread meanwhile
+            if snapshot is None or _read_version() != snapshot.version:
+                snapshot = self._snapshot = load_snapshot()
+                self.rebuilds += 1
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def changed(self):
+        """Bump the catalog version in the current transaction; the caller commits."""
+        result = db.session.execute(update(CatalogVersion).where(CatalogVersion.id == 1)
+                                    .values(version=CatalogVersion.version + 1))
+        if result.rowcount == 0:
+            db.session.add(CatalogVersion(id=1, version=1))
+        # Check again once it is committed, not before: a read in between would see the old version
+        event.listen(db.session(), "after_commit", self._expire, once=True)
+
+    def content_changed(self, quiz_id):
+        """Bump a quiz's content version (its questions changed) in the current transaction; the caller commits.
+
+        Workers compare their cached answer keys and question HTML with the version in
+        their snapshot, so each drops its copies by its next catalog check.
+        """
+        db.session.execute(update(Quiz).where(Quiz.id == quiz_id).values(content_version=Quiz.content_version + 1))
+        self.changed()
+
+    def content_version(self, quiz_id):
+        """The content version of a quiz in this worker's snapshot, or None if it has none yet."""
+        record = self.get().quiz_by_id.get(quiz_id)
+        return record.content_version if record is not None else None
+
+    def _expire(self, session):
+        self._checked_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "subjects": len(snapshot.subjects) if snapshot else 0,
+            "chapters": len(snapshot.chapters) if snapshot else 0,
+            "quizzes": len(snapshot.quizzes) if snapshot else 0,
+            "rebuilds": self.rebuilds,
+        }
+
+
+catalog = Catalog()
@@ -0,0 +1,75 @@
+import os
+from sqlalchemy import event
+from models.models import db
+
+DEFAULT_DATABASE_URI = "sqlite:///quizmasterdb.sqlite3"
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a quiz
+# submission is being written; NORMAL sync is durable across app crashes in WAL mode.
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,          # ms to wait for the writer lock instead of failing
+    "cache_size": -64000,          # negative = KiB, i.e. 64 MB page cache per connection
+    "mmap_size": 268435456,        # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",          # enforce FKs and run their ON DELETE CASCADE actions
+}
+
+
+def configure_database(app):
+    """Set the database URL and engine options before db.init_app(app).
+
+    DATABASE_URL in the environment overrides the configured URL (e.g. a Postgres URL in
+    production); DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT and DB_POOL_RECYCLE size
+    the connection pool.
+    """
+    uri = os.environ.get("DATABASE_URL") or app.config.get("SQLALCHEMY_DATABASE_URI") or DEFAULT_DATABASE_URI
+    if uri.startswith("postgres://"):
+        # SQLAlchemy only accepts the postgresql:// scheme
+        uri = "postgresql://" + uri[len("postgres://"):]
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    in_memory = uri in ("sqlite://", "sqlite:///") or ":memory:" in uri
+    if not in_memory:
+        options.setdefault("pool_size", int(os.environ.get("DB_POOL_SIZE", 10)))
+        options.setdefault("max_overflow", int(os.environ.get("DB_MAX_OVERFLOW", 20)))
+        options.setdefault("pool_timeout", int(os.environ.get("DB_POOL_TIMEOUT", 30)))
+    if not uri.startswith("sqlite"):
+        # Server databases drop idle connections; recycle and check them before use
+        options.setdefault("pool_recycle", int(os.environ.get("DB_POOL_RECYCLE", 1800)))
+        options.setdefault("pool_pre_ping", True)
+
+    app.config.setdefault("SQLITE_PRAGMAS", dict(DEFAULT_SQLITE_PRAGMAS))
+
+
+def init_database(app):
+    """Register connection hooks on the app's engine; call right after db.init_app(app)."""
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(engine, app.config.get("SQLITE_PRAGMAS", {}))
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    # For an AsyncEngine pass engine.sync_engine; the hook runs on the driver connection either way
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+# Async drivers for the dialects the app supports; used by models/async_db.py
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url):
+    """The async-driver equivalent of a (resolved) sqlalchemy URL, e.g. sqlite -> sqlite+aiosqlite."""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import numpy as np
+from sqlalchemy import insert
+from models.models import db, User, Scores
+from models.answer_keys import answer_key_cache
+from models.aggregates import record_attempts
+from models.item_analysis import matrix_rows, store_answers
+
+ID_CHUNK_SIZE = 5000
+
+
+class SubmissionFormatError(ValueError):
+    pass
+
+
+def parse_submissions(stream, filename):
+    """Read a CSV or JSON submissions file into a list of (user_id, {question_id: option}) pairs.
+
+    CSV: a ``user_id`` column followed by one column per question, headed by the
+    question id (``12``) or the quiz form field name (``q12``); cells hold 1-4 or are blank.
+    JSON: a list of ``{"user_id": 7, "answers": {"12": 3, ...}}`` objects.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8") if not isinstance(stream, io.TextIOBase) else stream
+
+    if filename.lower().endswith(".json"):
+        try:
+            records = json.load(text)
+            return [(int(r["user_id"]), {str(k).lstrip("q"): str(v) for k, v in r["answers"].items()}) for r in records]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise SubmissionFormatError(f"Invalid JSON submissions: {e}")
+
+    if filename.lower().endswith(".csv"):
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header or header[0].strip() != "user_id":
+            raise SubmissionFormatError("CSV must start with a 'user_id' column")
+        question_ids = [h.strip().lstrip("q") for h in header[1:]]
+        submissions = []
+        for line_no, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            try:
+                user_id = int(row[0])
+            except ValueError:
+                raise SubmissionFormatError(f"Line {line_no}: invalid user_id {row[0]!r}")
+            submissions.append((user_id, {q_id: cell.strip() for q_id, cell in zip(question_ids, row[1:]) if cell.strip()}))
+        return submissions
+
+    raise SubmissionFormatError("Submissions file must be .csv or .json")
+
+
+def build_response_matrix(answer_key, submissions):
+    # students x questions matrix of selected options, 0 where a question was left unanswered
+    columns = {str(q_id): i for i, q_id in enumerate(answer_key.question_ids)}
+    matrix = np.zeros((len(submissions), len(columns)), dtype=np.int8)
+    for row, (_, answers) in enumerate(submissions):
+        for q_id, option in answers.items():
+            col = columns.get(q_id)
+            if col is not None and option in ("1", "2", "3", "4"):
+                matrix[row, col] = int(option)
+    return matrix
+
+
+def grade_matrix(key_vector, matrix):
+    # One vectorized comparison for the whole batch
+    return (matrix == key_vector).sum(axis=1, dtype=np.int32)
+
+
+def grade_batch(quiz_id, submissions):
+    """Grade a batch of submissions for one quiz and store all Scores rows in one bulk insert.
+
+    Returns the numpy array of scores in submission order.
+    """
+    user_ids = [user_id for user_id, _ in submissions]
+    distinct_ids = sorted(set(user_ids))
+    known = set()
+    # Chunked to stay under SQLite's bound-parameter limit
+    for start in range(0, len(distinct_ids), ID_CHUNK_SIZE):
+        chunk = distinct_ids[start:start + ID_CHUNK_SIZE]
+        known.update(row.id for row in db.session.query(User.id).filter(User.id.in_(chunk)))
+    unknown = [user_id for user_id in distinct_ids if user_id not in known]
+    if unknown:
+        raise SubmissionFormatError(f"Unknown user ids: {unknown[:10]}")
+
+    answer_key = answer_key_cache.get(quiz_id)
+    key_vector = np.frombuffer(answer_key.correct_options, dtype=np.int8)
+    matrix = build_response_matrix(answer_key, submissions)
+    scores = grade_matrix(key_vector, matrix)
+
+    if submissions:
+        scores_ids = db.session.scalars(
+            insert(Scores).returning(Scores.id, sort_by_parameter_order=True),
+            [{"user_id": user_id, "quiz_id": quiz_id, "total_scored": int(score)} for user_id, score in zip(user_ids, scores)],
+        ).all()
+        record_attempts([(scores_id, user_id, quiz_id, int(score)) for scores_id, user_id, score in zip(scores_ids, user_ids, scores)])
+        store_answers(matrix_rows(scores_ids, answer_key.question_ids, matrix))
+        db.session.commit()
+    return scores
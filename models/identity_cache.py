@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from models.models import db, User
+
+DEFAULT_TTL = 60  # seconds
+DEFAULT_MAX_USERS = 10000
+
+
+class CachedUser:
+    """The part of a User that every request needs: enough for Flask-Login and admin checks.
+
+    Not a UserMixin: the mixin has no __slots__, so every instance would carry a __dict__
+    again. The members Flask-Login reads are defined here instead.
+    """
+
+    __slots__ = ("id", "username", "is_admin")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, is_admin):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+
+    def get_id(self):
+        return str(self.id)
+
+
+class IdentityCache:
+    """Short-TTL cache of CachedUser records keyed by user id."""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_users=DEFAULT_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self._users = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        row = db.session.query(User.id, User.username, User.is_admin).filter(User.id == user_id).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        user = CachedUser(row.id, row.username, row.is_admin)
+        with self._lock:
+            self._users[user_id] = (now + self.ttl, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        # Call after deleting a user or changing their username or role
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._users),
+                "max_size": self.max_users,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+identity_cache = IdentityCache()
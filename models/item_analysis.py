@@ -0,0 +1,176 @@
+import threading
+import time
+import numpy as np
+from sqlalchemy import select
+from models.models import db, Scores, AttemptAnswer, QuizStats
+from models.answer_keys import answer_key_cache
+
+INSERT_CHUNK_SIZE = 10000
+# Share of students in the upper and lower groups for the discrimination index
+GROUP_FRACTION = 0.27
+# Items easier or harder than this, or with discrimination below it, are flagged for review
+MIN_DIFFICULTY, MAX_DIFFICULTY, MIN_DISCRIMINATION = 0.2, 0.9, 0.2
+DEFAULT_REFRESH_INTERVAL = 60  # seconds a result is served while new attempts come in
+
+
+def answer_rows(scores_id, answer_key, selected_options, paper=None):
+    """AttemptAnswer rows for the answered questions of one submission (options as posted, str).
+
+    For a paper drawn from a question pool every question on the paper gets a row, with
+    option 0 when it was left blank, so item analysis can tell blank from not drawn.
+    """
+    rows = []
+    in_key = None if paper is None else answer_key.correct_by_id()
+    for q_id in (answer_key.question_ids if paper is None else paper.question_ids):
+        if in_key is not None and q_id not in in_key:
+            continue  # deleted since the paper was drawn
+        option = selected_options.get(str(q_id))
+        if option in ("1", "2", "3", "4"):
+            rows.append({"scores_id": scores_id, "question_id": q_id, "selected_option": int(option)})
+        elif paper is not None:
+            rows.append({"scores_id": scores_id, "question_id": q_id, "selected_option": 0})
+    return rows
+
+
+def matrix_rows(scores_ids, question_ids, matrix):
+    """AttemptAnswer rows from a students x questions response matrix (0 = unanswered)."""
+    students, columns = np.nonzero(matrix)
+    scores_ids = np.asarray(scores_ids)
+    question_ids = np.asarray(question_ids)
+    for start in range(0, len(students), INSERT_CHUNK_SIZE):
+        s, c = students[start:start + INSERT_CHUNK_SIZE], columns[start:start + INSERT_CHUNK_SIZE]
+        yield [
+            {"scores_id": int(a), "question_id": int(q), "selected_option": int(o)}
+            for a, q, o in zip(scores_ids[s], question_ids[c], matrix[s, c])
+        ]
+
+
+def store_answers(rows):
+    """Bulk-insert AttemptAnswer rows in the current transaction (one executemany per chunk)."""
+    if isinstance(rows, list):
+        rows = [rows[i:i + INSERT_CHUNK_SIZE] for i in range(0, len(rows), INSERT_CHUNK_SIZE)]
+    # Core insert on the session's connection: about twice as fast as the ORM bulk path for
+    # the millions of rows a batch import produces, and nothing needs the ORM objects
+    connection = db.session.connection()
+    for chunk in rows:
+        if chunk:
+            connection.execute(AttemptAnswer.__table__.insert(), chunk)
+
+
+def response_matrix(quiz_id, question_ids):
+    """students x questions int8 matrix of the stored selections of every attempt at a quiz.
+
+    0 is a blank answer; -1 a question that was not on the student's paper (question pools).
+    """
+    result = db.session.execute(
+        select(AttemptAnswer.scores_id, AttemptAnswer.question_id, AttemptAnswer.selected_option,
+               Scores.paper_seed.is_not(None))
+        .join(Scores, Scores.id == AttemptAnswer.scores_id)
+        .where(Scores.quiz_id == quiz_id)
+        .execution_options(yield_per=INSERT_CHUNK_SIZE)
+    )
+    # Converted to arrays chunk by chunk, so only one chunk of Row objects is alive at a time
+    chunks = [np.array(rows, dtype=np.int64) for rows in result.partitions()]
+    data = np.concatenate(chunks) if chunks else np.zeros((0, 4), dtype=np.int64)
+    key_ids = np.asarray(question_ids, dtype=np.int64)
+    order = np.argsort(key_ids)
+    # Answers to questions deleted since the attempt are dropped
+    positions = np.searchsorted(key_ids, data[:, 1], sorter=order).clip(0, max(len(key_ids) - 1, 0))
+    known = (key_ids[order][positions] == data[:, 1]) if len(key_ids) else np.zeros(len(data), dtype=bool)
+    data, positions = data[known], positions[known]
+    attempts, rows = np.unique(data[:, 0], return_inverse=True)
+    matrix = np.zeros((len(attempts), len(key_ids)), dtype=np.int8)
+    pooled = np.zeros(len(attempts), dtype=bool)
+    pooled[rows] = data[:, 3] != 0
+    matrix[pooled] = -1  # drawn papers store a row per question they held, blanks included
+    matrix[rows, order[positions]] = data[:, 2]
+    return matrix
+
+
+def analyze(key_vector, matrix):
+    """Item statistics for a response matrix, vectorized over all questions.
+
+    difficulty: share of students answering correctly (p-value; higher = easier).
+    discrimination: p in the top GROUP_FRACTION of total scores minus p in the bottom one.
+    distractors: share of students choosing each option 1-4, and leaving it blank (0).
+    Each share is over the students who were given the question (matrix >= 0).
+    """
+    students = matrix.shape[0]
+    correct = matrix == key_vector
+    presented = matrix >= 0
+    share = lambda hits, rows=slice(None): hits[rows].sum(axis=0) / np.maximum(presented[rows].sum(axis=0), 1)
+    difficulty = share(correct)
+
+    group = max(1, int(round(students * GROUP_FRACTION)))
+    if students >= 2:
+        ranking = np.argsort(correct.sum(axis=1), kind="stable")
+        discrimination = share(correct, ranking[-group:]) - share(correct, ranking[:group])
+    else:
+        discrimination = np.zeros(len(key_vector))
+
+    # (5, questions): row k is the share of students who chose option k (0 = blank)
+    distractors = np.stack([share(matrix == option) for option in range(5)])
+    return difficulty, discrimination, distractors
+
+
+class ItemAnalysisCache:
+    """Item statistics per quiz, recomputed when the quiz gets new attempts or its answer key changes.
+
+    New attempts trigger at most one recomputation per ``refresh_interval`` seconds; in
+    between the last result is served, so a live exam does not rebuild the response
+    matrix on every admin page load. A changed answer key always recomputes.
+    """
+
+    def __init__(self):
+        self.refresh_interval = DEFAULT_REFRESH_INTERVAL
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.refresh_interval = app.config.get("ITEM_ANALYSIS_REFRESH_INTERVAL", self.refresh_interval)
+
+    def get(self, quiz_id, fresh=False):
+        answer_key = answer_key_cache.get(quiz_id)
+        stats = db.session.get(QuizStats, quiz_id)
+        attempts = stats.attempt_count if stats else 0
+        now = time.monotonic()
+        with self._lock:
+            cached = self._results.get(quiz_id)
+        if cached is not None and cached[0] is answer_key and (
+            cached[1] == attempts or (not fresh and now - cached[2] < self.refresh_interval)
+        ):
+            return cached[3]
+
+        key_vector = np.frombuffer(answer_key.correct_options, dtype=np.int8)
+        matrix = response_matrix(quiz_id, list(answer_key.question_ids))
+        difficulty, discrimination, distractors = analyze(key_vector, matrix)
+        presented = (matrix >= 0).sum(axis=0)
+        result = {
+            "students": matrix.shape[0],
+            "items": {
+                q_id: {
+                    "presented": int(presented[i]),
+                    "difficulty": float(difficulty[i]),
+                    "discrimination": float(discrimination[i]),
+                    "blank": float(distractors[0, i]),
+                    "options": {option: float(distractors[option, i]) for option in range(1, 5)},
+                    "flagged": bool(presented[i] > 0 and (
+                        difficulty[i] < MIN_DIFFICULTY or difficulty[i] > MAX_DIFFICULTY
+                        or discrimination[i] < MIN_DISCRIMINATION
+                        # a wrong option more popular than the key usually means a broken key
+                        or distractors[1:, i].max() > distractors[int(key_vector[i]), i]
+                    )),
+                }
+                for i, q_id in enumerate(answer_key.question_ids)
+            },
+        }
+        with self._lock:
+            self._results[quiz_id] = (answer_key, attempts, now, result)
+        return result
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._results.pop(quiz_id, None)
+
+
+item_analysis = ItemAnalysisCache()
@@ -0,0 +1,221 @@
+import datetime
+from sqlalchemy import text, select, inspect
+from sqlalchemy.schema import CreateTable
+from models.models import db, User, Chapter, Quiz, Question, Scores, QuizStats, UserStats, DraftAnswer, AttemptAnswer, CatalogVersion
+from models.user_search import create_user_search_index
+from models.aggregates import rebuild_quiz_stats, rebuild_user_stats
+
+# Small built-in migration runner. Fresh databases get their tables and indexes from
+# db.create_all(); migrations bring existing databases up to the same schema and must
+# therefore be idempotent. Append new migrations to the end of MIGRATIONS, never reorder.
+
+
+def _create_user_search_index(connection):
+    create_user_search_index(connection)
+
+
+def _create_lookup_indexes(connection):
+    for table in (Chapter.__table__, Quiz.__table__, Question.__table__, Scores.__table__):
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _backfill_score_aggregates(connection):
+    QuizStats.__table__.create(connection, checkfirst=True)
+    UserStats.__table__.create(connection, checkfirst=True)
+    rebuild_quiz_stats()
+    rebuild_user_stats()
+
+
+def _add_scores_time_started(connection):
+    if "time_started" not in {column["name"] for column in inspect(connection).get_columns(Scores.__tablename__)}:
+        connection.execute(text(f"ALTER TABLE {Scores.__tablename__} ADD COLUMN time_started DATETIME"))
+
+
+def _create_draft_answers(connection):
+    DraftAnswer.__table__.create(connection, checkfirst=True)
+
+
+def _create_attempt_answers(connection):
+    AttemptAnswer.__table__.create(connection, checkfirst=True)
+
+
+def _cascade_score_deletes(connection):
+    # Quiz and user deletes remove their scores (and, through them, attempt answers) in SQL
+    for index in DraftAnswer.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    stale = [
+        fk for fk in inspect(connection).get_foreign_keys(Scores.__tablename__)
+        if (fk.get("options") or {}).get("ondelete", "").upper() != "CASCADE"
+    ]
+    if not stale:
+        return
+    if connection.dialect.name == "sqlite":
+        _rebuild_sqlite_table(Scores.__table__)
+        return
+    for fk in stale:
+        columns = ", ".join(f'"{column}"' for column in fk["constrained_columns"])
+        referred = ", ".join(f'"{column}"' for column in fk["referred_columns"])
+        connection.execute(text(f'ALTER TABLE {Scores.__tablename__} DROP CONSTRAINT "{fk["name"]}"'))
+        connection.execute(text(
+            f'ALTER TABLE {Scores.__tablename__} ADD CONSTRAINT "{fk["name"]}" FOREIGN KEY ({columns}) '
+            f'REFERENCES "{fk["referred_table"]}" ({referred}) ON DELETE CASCADE'
+        ))
+
+
+def _rebuild_sqlite_table(table):
+    """Recreate ``table`` from its model definition, keeping its rows.
+
+    SQLite cannot alter constraints in place, so this is the rebuild described at
+    https://www.sqlite.org/lang_altertable.html#otheralter. Foreign keys must be off, or
+    dropping the old table would cascade into its children, and they cannot be switched
+    inside a transaction; hence a connection of its own.
+    """
+    name, new_name = table.name, f"{table.name}_new"
+    with db.engine.connect() as connection:
+        foreign_keys = connection.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        try:
+            columns = ", ".join(c["name"] for c in inspect(connection).get_columns(name) if c["name"] in table.c)
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {new_name}")
+            create = str(CreateTable(table).compile(connection))
+            connection.exec_driver_sql(create.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {new_name} ", 1))
+            connection.exec_driver_sql(f"INSERT INTO {new_name} ({columns}) SELECT {columns} FROM {name}")
+            connection.exec_driver_sql(f"DROP TABLE {name}")
+            connection.exec_driver_sql(f"ALTER TABLE {new_name} RENAME TO {name}")
+            for index in table.indexes:
+                index.create(connection)
+            connection.commit()
+        except Exception:
+            connection.invalidate()  # never return a connection with foreign keys off to the pool
+            raise
+        connection.exec_driver_sql(f"PRAGMA foreign_keys = {foreign_keys}")
+
+
+def _add_question_pools(connection):
+    for table, column, ddl in ((Quiz, "sample_size", "INTEGER"), (Scores, "paper_seed", "BIGINT")):
+        if column not in {c["name"] for c in inspect(connection).get_columns(table.__tablename__)}:
+            connection.execute(text(f"ALTER TABLE {table.__tablename__} ADD COLUMN {column} {ddl}"))
+
+
+def _create_catalog_version(connection):
+    CatalogVersion.__table__.create(connection, checkfirst=True)
+    if connection.execute(select(CatalogVersion.id).where(CatalogVersion.id == 1)).first() is None:
+        connection.execute(CatalogVersion.__table__.insert().values(id=1, version=0))
+
+
+def _create_quiz_date_index(connection):
+    for index in Quiz.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def _add_scores_spool_key(connection):
+    if "spool_key" not in {column["name"] for column in inspect(connection).get_columns(Scores.__tablename__)}:
+        connection.execute(text(f"ALTER TABLE {Scores.__tablename__} ADD COLUMN spool_key VARCHAR(96)"))
+    for index in Scores.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def _add_quiz_content_version(connection):
+    if "content_version" not in {column["name"] for column in inspect(connection).get_columns(Quiz.__tablename__)}:
+        connection.execute(text(f"ALTER TABLE {Quiz.__tablename__} ADD COLUMN content_version INTEGER NOT NULL DEFAULT 0"))
+
+
+MIGRATIONS = [
+    (1, "full-text index for user search", _create_user_search_index),
+    (2, "indexes on hot foreign-key and lookup columns", _create_lookup_indexes),
+    (3, "per-quiz and per-user score aggregates", _backfill_score_aggregates),
+    (4, "attempt start time on scores", _add_scores_time_started),
+    (5, "autosaved draft answers", _create_draft_answers),
+    (6, "per-question answers of each attempt", _create_attempt_answers),
+    (7, "ON DELETE CASCADE from quizzes and users to their scores", _cascade_score_deletes),
+    (8, "question pools: per-quiz sample size and per-attempt paper seed", _add_question_pools),
+    (9, "catalog version counter", _create_catalog_version),
+    (10, "index on quiz dates for scheduling", _create_quiz_date_index),
+    (11, "idempotency key on write-behind scores", _add_scores_spool_key),
+    (12, "per-quiz content version for cross-worker cache checks", _add_quiz_content_version),
+]
+
+
+def current_version(connection):
+    connection.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = connection.execute(text("SELECT version FROM schema_version")).scalar()
+    if version is None:
+        connection.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+        version = 0
+    return version
+
+
+def run_migrations():
+    """Apply pending migrations, each in its own transaction. Returns the descriptions applied.
+
+    Migrations run on the session's connection, so they may use the ORM as well.
+    """
+    applied = []
+    version = current_version(db.session.connection())
+    db.session.commit()
+
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        try:
+            connection = db.session.connection()
+            migrate(connection)
+            connection.execute(text("UPDATE schema_version SET version = :version"), {"version": number})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        applied.append(f"{number}: {description}")
+    return applied
+
+
+# Statements behind the hottest pages, with the indexed access path each should use
+def hot_queries():
+    return {
+        "login / register (user by email)": select(User.id, User.password).where(User.email == "a@example.com"),
+        "quiz_result (latest attempt)": (
+            select(Scores.id, Scores.total_scored)
+            .where(Scores.user_id == 1, Scores.quiz_id == 1)
+            .order_by(Scores.id.desc()).limit(1)
+        ),
+        "quiz_result (write-behind attempt written yet)": select(Scores.id).where(Scores.spool_key == "spool:1"),
+        "user_dashboard (past attempts)": (
+            select(Scores.id, Scores.total_scored, Quiz.name)
+            .join(Quiz, Scores.quiz_id == Quiz.id)
+            .where(Scores.user_id == 1)
+            .order_by(Scores.id.desc()).limit(51)
+        ),
+        "manage_questions / answer key": (
+            select(Question.id, Question.correct_option)
+            .where(Question.quiz_id == 1).order_by(Question.id).limit(51)
+        ),
+        "manage_chapters (chapters of a subject)": select(Chapter.id, Chapter.name).where(Chapter.subject_id == 1),
+        "manage_quizzes (quizzes of a chapter)": select(Quiz.id, Quiz.name).where(Quiz.chapter_id == 1),
+        "user_dashboard (open and upcoming quizzes)": (
+            select(Quiz.id).where(Quiz.date >= datetime.date(2025, 1, 1)).order_by(Quiz.date, Quiz.id)
+        ),
+        "per-quiz scores": select(Scores.id, Scores.total_scored).where(Scores.quiz_id == 1).order_by(Scores.id),
+    }
+
+
+def explain_hot_queries():
+    """Run EXPLAIN QUERY PLAN for every hot query (SQLite only).
+
+    Returns ``{name: (plan_lines, problems)}``; a query has problems when any step scans a
+    whole table or sorts through a temporary b-tree instead of reading an index in order.
+    """
+    results = {}
+    with db.engine.connect() as connection:
+        # EXPLAIN alone does not re-read the schema; a real read makes a pooled connection see new indexes
+        connection.exec_driver_sql("SELECT count(*) FROM sqlite_master")
+        for name, statement in hot_queries().items():
+            compiled = statement.compile(connection)
+            params = tuple(compiled.params[key] for key in compiled.positiontup)
+            plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+            problems = [
+                step for step in plan
+                if step.startswith("USE TEMP B-TREE") or (step.startswith("SCAN") and "USING" not in step)
+            ]
+            results[name] = (plan, problems)
+    return results
@@ -14,7 +14,7 @@ class User(db.Model, UserMixin):
     dob = db.Column(db.String(20))
     is_admin = db.Column(db.Boolean, default=False)
 
-    scores = db.relationship("Scores", back_populates="user", overlaps="user_scores,scores")
+    scores = db.relationship("Scores", back_populates="user", cascade="all, delete-orphan", passive_deletes=True, overlaps="user_scores,scores")
 
 class Subject(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -31,9 +31,12 @@ class Chapter(db.Model):
     description = db.Column(db.Text, nullable=True)
     subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete="CASCADE"), nullable=False)
 
-    __table_args__ = (db.UniqueConstraint("name", "subject_id", name="uq_chapter_name_subject"),)
+    __table_args__ = (
+        db.UniqueConstraint("name", "subject_id", name="uq_chapter_name_subject"),
+        db.Index("ix_chapter_subject_id", "subject_id", "id"),
+    )
 
-    subject = db.relationship("Subject", backref=db.backref("chapters", cascade="all, delete-orphan"))
+    subject = db.relationship("Subject", backref=db.backref("chapters", cascade="all, delete-orphan", passive_deletes=True))
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -42,9 +45,18 @@ class Quiz(db.Model):
     chapter_id = db.Column(db.Integer, db.ForeignKey("chapter.id", ondelete="CASCADE"), nullable=False)
     date = db.Column(db.Date, nullable=False)
     duration = db.Column(db.Time, nullable=False)
+    sample_size = db.Column(db.Integer, nullable=True)  # questions drawn per attempt; NULL: all of them, in order
+    # Moved with every change to the quiz's questions; cached answer keys and question HTML are
+    # checked against it in every worker (models/catalog.py)
+    content_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
-    chapter = db.relationship("Chapter", backref=db.backref("quizzes", cascade="all, delete-orphan"))
-    scores = db.relationship("Scores", back_populates="quiz", lazy=True, cascade="all, delete-orphan", overlaps="quiz_scores,scores")
+    __table_args__ = (
+        db.Index("ix_quiz_chapter_id", "chapter_id", "id"),
+        db.Index("ix_quiz_date", "date", "id"),  # open and upcoming quizzes (models/schedule.py)
+    )
+
+    chapter = db.relationship("Chapter", backref=db.backref("quizzes", cascade="all, delete-orphan", passive_deletes=True))
+    scores = db.relationship("Scores", back_populates="quiz", lazy=True, cascade="all, delete-orphan", passive_deletes=True, overlaps="quiz_scores,scores")
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -56,18 +68,82 @@ class Question(db.Model):
     option4 = db.Column(db.String(255), nullable=False)
     correct_option = db.Column(db.Integer, nullable=False)  
 
-    quiz = db.relationship("Quiz", backref=db.backref("questions", cascade="all, delete-orphan"))
+    __table_args__ = (db.Index("ix_question_quiz_id", "quiz_id", "id"),)
+
+    quiz = db.relationship("Quiz", backref=db.backref("questions", cascade="all, delete-orphan", passive_deletes=True))
 
 
 class Scores(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)  
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
     time_stamp_of_attempt = db.Column(db.DateTime, default=datetime.utcnow)
+    time_started = db.Column(db.DateTime)  # when the attempt was opened; NULL for imported scores
     total_scored = db.Column(db.Integer, nullable=False)
+    paper_seed = db.Column(db.BigInteger)  # seed of the drawn paper (models/question_pools.py); NULL: the whole quiz
+    spool_key = db.Column(db.String(96))  # "<spool>:<sequence>" of write-behind rows, so a replayed spool inserts nothing twice
+
+    __table_args__ = (
+        db.Index("ix_scores_user_quiz_id", "user_id", "quiz_id", "id"),  # quiz_result: latest attempt of a user for a quiz
+        db.Index("ix_scores_user_id", "user_id", "id"),  # dashboard: a user's attempts, latest first
+        db.Index("ix_scores_quiz_id", "quiz_id", "id"),  # per-quiz reporting and deletes
+        db.Index("ux_scores_spool_key", "spool_key", unique=True),
+    )
 
     quiz = db.relationship("Quiz", back_populates="scores", overlaps="quiz_scores,scores")  
     user = db.relationship("User", back_populates="scores", overlaps="user_scores,scores")
 
 
 
+# Incrementally maintained score aggregates, updated in the same transaction as each Scores insert
+class QuizStats(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id", ondelete="CASCADE"), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_sq_sum = db.Column(db.Integer, nullable=False, default=0)
+    max_score = db.Column(db.Integer, nullable=False, default=0)
+    histogram = db.Column(db.Text, nullable=False, default="{}")  # JSON {score: attempts}
+    leaderboard = db.Column(db.Text, nullable=False, default="[]")  # JSON top-N [[score, scores_id, user_id], ...]
+
+    quiz = db.relationship("Quiz", backref=db.backref("stats", uselist=False, cascade="all, delete-orphan", passive_deletes=True))
+
+
+class UserStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_sq_sum = db.Column(db.Integer, nullable=False, default=0)
+    max_score = db.Column(db.Integer, nullable=False, default=0)
+    histogram = db.Column(db.Text, nullable=False, default="{}")  # JSON {score: attempts}
+
+    user = db.relationship("User", backref=db.backref("stats", uselist=False, cascade="all, delete-orphan", passive_deletes=True))
+
+
+# Single row, bumped with every subject, chapter or quiz change (models/catalog.py)
+class CatalogVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Autosaved answers of attempts still in progress, written in batches by models/autosave.py
+class DraftAnswer(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id", ondelete="CASCADE"), primary_key=True)
+    question_id = db.Column(db.Integer, primary_key=True)
+    selected_option = db.Column(db.Integer, nullable=False)
+    attempt_started = db.Column(db.Float, nullable=False)  # start time of the attempt session it belongs to
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index("ix_draft_answer_quiz_id", "quiz_id"),)  # ON DELETE CASCADE from quiz
+
+    user = db.relationship("User", backref=db.backref("draft_answers", cascade="all, delete-orphan", passive_deletes=True))
+    quiz = db.relationship("Quiz", backref=db.backref("draft_answers", cascade="all, delete-orphan", passive_deletes=True))
+
+
+# One row per answered question of a submitted attempt, for item analysis
+class AttemptAnswer(db.Model):
+    scores_id = db.Column(db.Integer, db.ForeignKey("scores.id", ondelete="CASCADE"), primary_key=True)
+    question_id = db.Column(db.Integer, primary_key=True)
+    selected_option = db.Column(db.SmallInteger, nullable=False)
+
+    attempt = db.relationship("Scores", backref=db.backref("answers", cascade="all, delete-orphan", passive_deletes=True))
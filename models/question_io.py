@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+from sqlalchemy import insert
+from models.models import db, Question
+
+QUESTION_FIELDS = ("question_statement", "option1", "option2", "option3", "option4", "correct_option")
+IMPORT_CHUNK_SIZE = 1000
+# Only the first errors are kept, so a file full of bad rows still imports in constant memory
+MAX_REPORTED_ERRORS = 100
+
+
+class QuestionFormatError(ValueError):
+    pass
+
+
+def clean_question(raw):
+    """Validate one question's fields (a form or an imported row) and return them ready for Question.
+
+    Raises QuestionFormatError with the same messages add_question shows.
+    """
+    values = {field: str(raw.get(field) or "").strip() for field in QUESTION_FIELDS}
+    if not all(values.values()):
+        raise QuestionFormatError("All fields are required.")
+    if values["correct_option"] not in ("1", "2", "3", "4"):
+        raise QuestionFormatError("Correct option must be 1, 2, 3, or 4.")
+    values["correct_option"] = int(values["correct_option"])
+    return values
+
+
+def _text(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def iter_question_rows(stream, filename):
+    """Yield (line_no, row_dict_or_None, error_or_None) for each record of a CSV or JSONL file."""
+    text = _text(stream)
+    name = filename.lower()
+
+    if name.endswith(".csv"):
+        reader = csv.DictReader(text)
+        missing = [field for field in QUESTION_FIELDS if field not in (reader.fieldnames or [])]
+        if missing:
+            raise QuestionFormatError(f"CSV header is missing columns: {', '.join(missing)}")
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    if name.endswith(".jsonl"):
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_no, None, "Expected a JSON object"
+                continue
+            yield line_no, row, None
+        return
+
+    raise QuestionFormatError("Questions file must be .csv or .jsonl")
+
+
+def import_questions(quiz_id, stream, filename, chunk_size=IMPORT_CHUNK_SIZE):
+    """Stream questions from a CSV/JSONL file into ``quiz_id`` with chunked executemany inserts.
+
+    Invalid rows are skipped and reported; the valid ones are committed in one transaction.
+    Returns ``{"imported": n, "error_count": n, "errors": [(line_no, message), ...]}``.
+    """
+    imported = 0
+    error_count = 0
+    errors = []
+    chunk = []
+
+    def report(line_no, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append((line_no, message))
+
+    try:
+        for line_no, row, error in iter_question_rows(stream, filename):
+            if error is None:
+                try:
+                    chunk.append(dict(clean_question(row), quiz_id=quiz_id))
+                except QuestionFormatError as e:
+                    error = str(e)
+            if error is not None:
+                report(line_no, error)
+                continue
+            if len(chunk) >= chunk_size:
+                db.session.execute(insert(Question), chunk)
+                imported += len(chunk)
+                chunk = []
+        if chunk:
+            db.session.execute(insert(Question), chunk)
+            imported += len(chunk)
+        db.session.commit()
+    except (QuestionFormatError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        raise QuestionFormatError(str(e))
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"imported": imported, "error_count": error_count, "errors": errors}
+
+
+def export_questions(quiz_id, fmt="csv"):
+    """Yield a quiz's questions as CSV or JSONL text, in the format import_questions reads."""
+    if fmt not in ("csv", "jsonl"):
+        raise QuestionFormatError("Export format must be csv or jsonl")
+    rows = (
+        db.session.query(*(getattr(Question, field) for field in QUESTION_FIELDS))
+        .filter(Question.quiz_id == quiz_id)
+        .order_by(Question.id)
+        .execution_options(yield_per=IMPORT_CHUNK_SIZE)
+    )
+
+    if fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(dict(zip(QUESTION_FIELDS, row)), ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(QUESTION_FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
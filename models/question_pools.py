@@ -0,0 +1,72 @@
+import random
+import secrets
+from array import array
+from itertools import permutations
+
+OPTIONS = (1, 2, 3, 4)
+OPTION_ORDERS = tuple(permutations(OPTIONS))
+
+# A quiz with Quiz.sample_size set is a question pool: every attempt gets its own paper of
+# sample_size questions drawn from the pool, in random order, with each question's
+# options shuffled. The pool is the answer key's sorted question id array
+# (models/answer_keys.py), already cached in memory, so a draw costs O(sample_size) and
+# never runs ORDER BY RANDOM() over the questions table. The drawn question ids are kept
+# with the attempt session in memory and graded as drawn; the session cookie only holds
+# the seed and the pool's content version, from which another worker draws the same paper.
+# The option orders follow from the seed alone (kept in Scores.paper_seed).
+
+
+class Paper:
+    """The questions of one attempt, in display order, with the display order of their options."""
+
+    __slots__ = ("seed", "question_ids", "option_orders")
+
+    def __init__(self, seed, question_ids, option_orders):
+        self.seed = seed
+        self.question_ids = question_ids
+        self.option_orders = option_orders
+
+    def __len__(self):
+        return len(self.question_ids)
+
+
+def new_seed():
+    return secrets.randbits(63)
+
+
+def sample_indices(rng, n, k):
+    """``k`` distinct indices from ``range(n)`` in random order, in O(k) time and memory.
+
+    Floyd's algorithm, then a shuffle (its picks are uniform as a set, not as a sequence).
+    Written out rather than left to random.sample so that papers re-drawn from a stored
+    seed stay the same across Python versions.
+    """
+    picked, order = set(), []
+    for j in range(n - k, n):
+        t = rng.randrange(j + 1)
+        pick = j if t in picked else t
+        picked.add(pick)
+        order.append(pick)
+    rng.shuffle(order)
+    return order
+
+
+def draw_paper(answer_key, sample_size, seed, shuffle_options=True):
+    """The paper for ``seed``: up to ``sample_size`` questions of the quiz's answer key."""
+    rng = random.Random(seed)
+    pool = answer_key.question_ids
+    indices = sample_indices(rng, len(pool), min(sample_size, len(pool)))
+    return paper_of(seed, (pool[i] for i in indices), shuffle_options)
+
+
+def paper_of(seed, question_ids, shuffle_options=True):
+    """The paper of ``seed`` holding ``question_ids`` as drawn, e.g. when the attempt page is reloaded.
+
+    Option orders come from their own generator, so they only depend on the seed and the
+    number of questions, not on the pool they were drawn from. Grading only needs the
+    questions; ``shuffle_options=False`` skips them.
+    """
+    question_ids = array("i", question_ids)
+    rng = random.Random(f"options:{seed}")
+    option_orders = [rng.choice(OPTION_ORDERS) for _ in question_ids] if shuffle_options else None
+    return Paper(seed, question_ids, option_orders)
@@ -0,0 +1,94 @@
+import datetime
+import time
+from threading import Lock
+from sqlalchemy import select
+from models.models import db, Quiz
+from models.catalog import catalog
+
+
+def quiz_window(quiz_date):
+    """Epoch seconds ``(opens_at, closes_at)`` of the day a quiz is scheduled on (server local time).
+
+    The window is the whole day: a quiz has a date but no start time, so there is nothing
+    to open it at a given hour, and ``Quiz.duration`` is not the window's length. The
+    duration bounds each attempt instead: one started inside the window runs for the
+    duration from its own start (its deadline), so the last submissions of a day can
+    arrive, and their pages be reloaded, up to one duration after the window closes.
+    """
+    opens = datetime.datetime.combine(quiz_date, datetime.time.min)
+    return opens.timestamp(), (opens + datetime.timedelta(days=1)).timestamp()
+
+
+def in_window(quiz_date, at=None):
+    opens_at, closes_at = quiz_window(quiz_date)
+    return opens_at <= (time.time() if at is None else at) < closes_at
+
+
+class ScheduleView:
+    """Quizzes open during one window (a day) and those scheduled after it, by date then id."""
+
+    __slots__ = ("version", "opens_at", "closes_at", "open", "upcoming")
+
+    def __init__(self, version, opens_at, closes_at, open, upcoming):
+        self.version = version
+        self.opens_at = opens_at
+        self.closes_at = closes_at
+        self.open = tuple(open)
+        self.upcoming = tuple(upcoming)
+
+
+def load_view(snapshot, day):
+    # Only quizzes from ``day`` on, read in date order from ix_quiz_date: past quizzes, however
+    # many, are never touched. Names and durations come from the catalog snapshot.
+    records = [
+        snapshot.quiz_by_id[quiz_id]
+        for quiz_id in db.session.scalars(select(Quiz.id).where(Quiz.date >= day).order_by(Quiz.date, Quiz.id))
+        if quiz_id in snapshot.quiz_by_id
+    ]
+    opens_at, closes_at = quiz_window(day)
+    return ScheduleView(
+        snapshot.version, opens_at, closes_at,
+        [r for r in records if r.date == day], [r for r in records if r.date > day],
+    )
+
+
+class QuizSchedule:
+    """The open and upcoming quizzes for the current window, shared by every request.
+
+    Rebuilt when the window rolls over (at midnight) or the catalog version moves, never
+    per request: in between, ``get()`` is a comparison of two numbers.
+    """
+
+    def __init__(self):
+        self.rebuilds = 0
+        self._view = None
+        self._lock = Lock()
+
+    def get(self, now=None):
+        now = time.time() if now is None else now
+        snapshot = catalog.get()
+        view = self._view
+        if view is not None and view.version == snapshot.version and view.opens_at <= now < view.closes_at:
+            return view
+        with self._lock:
+            view = self._view
+            if view is None or view.version != snapshot.version or not view.opens_at <= now < view.closes_at:
+                view = self._view = load_view(snapshot, datetime.date.fromtimestamp(now))
+                self.rebuilds += 1
+            return view
+
+    def clear(self):
+        with self._lock:
+            self._view = None
+
+    def stats(self):
+        view = self._view
+        return {
+            "version": view.version if view else None,
+            "open": len(view.open) if view else 0,
+            "upcoming": len(view.upcoming) if view else 0,
+            "rebuilds": self.rebuilds,
+        }
+
+
+schedule = QuizSchedule()
@@ -0,0 +1,141 @@
+import csv
+import io
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models.models import db, User, Subject, Chapter, Quiz, Scores
+
+# Rows fetched per round trip; with stream_results the driver never holds more than this
+EXPORT_BATCH_SIZE = 10000
+
+EXPORT_COLUMNS = (
+    "scores_id", "time_stamp_of_attempt", "total_scored",
+    "user_id", "username", "full_name", "email",
+    "quiz_id", "quiz_name", "chapter_id", "chapter_name", "subject_id", "subject_name",
+)
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_filters(args):
+    """Read start/end (YYYY-MM-DD), subject_id and after_id from a request's query string."""
+    filters = {}
+    for name in ("start", "end"):
+        value = args.get(name, "").strip()
+        if value:
+            try:
+                filters[name] = datetime.strptime(value, "%Y-%m-%d").date()
+            except ValueError:
+                raise ExportError(f"{name} must be a date in YYYY-MM-DD format")
+    for name in ("subject_id", "after_id"):
+        value = args.get(name, "").strip()
+        if value:
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                raise ExportError(f"{name} must be an integer")
+    return filters
+
+
+def export_statement(start=None, end=None, subject_id=None, after_id=None):
+    """Every attempt with its user, quiz, chapter and subject, in Scores.id order.
+
+    ``start``/``end`` are inclusive dates. ``after_id`` resumes an interrupted export: pass
+    the last ``scores_id`` already received.
+    """
+    statement = (
+        select(
+            Scores.id, Scores.time_stamp_of_attempt, Scores.total_scored,
+            User.id, User.username, User.full_name, User.email,
+            Quiz.id, Quiz.name, Chapter.id, Chapter.name, Subject.id, Subject.name,
+        )
+        .join(User, Scores.user_id == User.id)
+        .join(Quiz, Scores.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .order_by(Scores.id)
+    )
+    if start is not None:
+        statement = statement.where(Scores.time_stamp_of_attempt >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        statement = statement.where(Scores.time_stamp_of_attempt < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if subject_id is not None:
+        statement = statement.where(Subject.id == subject_id)
+    if after_id is not None:
+        statement = statement.where(Scores.id > after_id)
+    return statement
+
+
+def more_than(limit, **filters):
+    """Whether more than ``limit`` attempts match; reads at most ``limit + 1`` index entries."""
+    statement = export_statement(**filters).with_only_columns(Scores.id).offset(limit).limit(1)
+    return db.session.execute(statement).first() is not None
+
+
+def iter_batches(**filters):
+    """Yield lists of export rows, EXPORT_BATCH_SIZE at a time, from a server-side cursor."""
+    result = db.session.execute(export_statement(**filters).execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def export_csv(header=True, **filters):
+    """Yield the export as CSV text chunks (one per batch)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for rows in iter_batches(**filters):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_parquet(sink, **filters):
+    """Write the export to ``sink`` (a path or binary file) as Parquet, one row group per batch.
+
+    Needs the optional pyarrow package. Returns the number of rows written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs the pyarrow package (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("scores_id", pa.int64()), ("time_stamp_of_attempt", pa.timestamp("us")), ("total_scored", pa.int32()),
+        ("user_id", pa.int64()), ("username", pa.string()), ("full_name", pa.string()), ("email", pa.string()),
+        ("quiz_id", pa.int64()), ("quiz_name", pa.string()), ("chapter_id", pa.int64()), ("chapter_name", pa.string()),
+        ("subject_id", pa.int64()), ("subject_name", pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in iter_batches(**filters):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema,
+            ))
+            count += len(rows)
+    return count
+
+
+def last_exported_id(path):
+    """The scores_id of the last complete row in a CSV export, for resuming it; None if empty."""
+    with open(path, "rb") as f:
+        f.seek(0, io.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 64 * 1024))
+        tail = f.read().decode("utf-8", errors="ignore")
+    if not tail.endswith("\n"):
+        raise ExportError(f"{path} ends with a partial row; truncate it to the last complete line first")
+    for line in reversed(tail.splitlines()):
+        first = line.split(",", 1)[0]
+        if first.isdigit():
+            return int(first)
+    return None
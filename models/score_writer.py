@@ -0,0 +1,247 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from models.models import db, Scores, Quiz, User
+from models.aggregates import record_attempts
+from models.item_analysis import store_answers
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreWriteBehind:
+    """Write-behind queue for Scores inserts.
+
+    Graded attempts are appended to a local spool file (fsync'd) and queued in memory;
+    a background thread inserts them in batched transactions once ``batch_size`` rows
+    are pending or ``flush_interval`` seconds have passed. Each process owns its own
+    spool, locked with flock, so spools left behind by a crashed process are replayed
+    by the next process that starts. Every record carries a key unique to its spool
+    (Scores.spool_key), so a segment replayed after its rows were committed, but before
+    it was removed, inserts nothing twice.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 200
+        self.flush_interval = 0.5
+        self.fsync = True
+        self.flushed = 0
+        self._pending = []
+        self._failed = []
+        self._recent = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._segment = 0
+        self._sequence = 0
+        self._spool = None
+        self._spool_path = None
+        self._worker = None
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("SCORES_WRITE_BEHIND", False)
+        if not self.enabled:
+            return
+
+        self.batch_size = app.config.get("SCORES_WRITE_BEHIND_BATCH_SIZE", self.batch_size)
+        self.flush_interval = app.config.get("SCORES_WRITE_BEHIND_INTERVAL", self.flush_interval)
+        self.fsync = app.config.get("SCORES_SPOOL_FSYNC", self.fsync)
+        spool_dir = app.config.get("SCORES_SPOOL_DIR") or os.path.join(app.instance_path, "spool")
+        os.makedirs(spool_dir, exist_ok=True)
+
+        self._spool_dir = spool_dir
+        # pid plus start time, so a restarted process never reuses a crashed one's spool
+        started = int(datetime.utcnow().timestamp() * 1000)
+        self._spool_path = os.path.join(spool_dir, f"scores-{os.getpid()}-{started}.jsonl")
+        self._open_spool()
+
+        self._worker = threading.Thread(target=self._run, name="scores-write-behind", daemon=True)
+        self._worker.start()
+
+    def submit(self, user_id, quiz_id, total_scored, time_started=None, answers=None, paper_seed=None):
+        # answers: {question_id: option} of the answered questions, stored as AttemptAnswer rows
+        record = {
+            "user_id": user_id,
+            "quiz_id": quiz_id,
+            "total_scored": total_scored,
+            "time_stamp_of_attempt": datetime.utcnow().isoformat(),
+            "time_started": time_started.isoformat() if time_started else None,
+            "answers": answers or {},
+            "paper_seed": paper_seed,
+        }
+        with self._lock:
+            self._sequence += 1
+            record["key"] = f"{os.path.basename(self._spool_path)}:{self._sequence}"
+            self._spool.write(json.dumps(record) + "\n")
+            self._spool.flush()
+            if self.fsync:
+                os.fsync(self._spool.fileno())
+            self._pending.append(record)
+            self._recent[(user_id, quiz_id)] = record
+            pending = len(self._pending)
+
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return record
+
+    def latest(self, user_id, quiz_id):
+        # Most recent not-yet-committed attempt of this user for this quiz, if any
+        with self._lock:
+            return self._recent.get((user_id, quiz_id))
+
+    def queue_depth(self):
+        with self._lock:
+            return len(self._pending) + sum(len(batch) for _, _, batch in self._failed)
+
+    def flush(self):
+        with self._lock:
+            failed, self._failed = self._failed, []
+            if self._pending:
+                batch, self._pending = self._pending, []
+                # Rotate the spool so the segment being flushed can be removed once committed.
+                # The old handle stays open, keeping the segment locked against replay elsewhere.
+                self._segment += 1
+                segment_path = f"{self._spool_path}.{self._segment}"
+                os.replace(self._spool_path, segment_path)
+                failed.append((segment_path, self._spool, batch))
+                self._open_spool()
+
+        flushed = 0
+        for segment_path, handle, batch in failed:
+            try:
+                self._insert(batch)
+            except Exception as e:
+                logger.error(f"Write-behind flush of {len(batch)} scores failed: {e}")
+                with self._lock:
+                    self._failed.append((segment_path, handle, batch))
+                continue
+
+            os.remove(segment_path)
+            handle.close()
+            with self._lock:
+                for record in batch:
+                    key = (record["user_id"], record["quiz_id"])
+                    if self._recent.get(key) is record:
+                        del self._recent[key]
+                self.flushed += len(batch)
+            flushed += len(batch)
+        return flushed
+
+    def _run(self):
+        try:
+            self._replay_orphaned_spools()
+        except Exception:
+            logger.exception("Replaying orphaned score spools failed")
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep the thread alive: the queued scores are retried on the next round
+                logger.exception("Write-behind flush failed")
+
+    def _insert(self, records):
+        try:
+            self._insert_rows(records)
+        except IntegrityError:
+            # The quiz or user of some attempts was deleted while they were queued
+            kept = self._without_deleted(records)
+            if len(kept) == len(records):
+                raise
+            logger.warning(f"Dropped {len(records) - len(kept)} queued scores of deleted quizzes or users")
+            if kept:
+                self._insert_rows(kept)
+
+    def _without_deleted(self, records):
+        with self.app.app_context():
+            quiz_ids = set(db.session.scalars(select(Quiz.id).where(Quiz.id.in_({r["quiz_id"] for r in records}))))
+            user_ids = set(db.session.scalars(select(User.id).where(User.id.in_({r["user_id"] for r in records}))))
+        return [r for r in records if r["quiz_id"] in quiz_ids and r["user_id"] in user_ids]
+
+    def _insert_rows(self, records):
+        # Spools written before time_started or paper_seed existed lack the keys; executemany needs uniform rows
+        rows = [
+            {
+                "user_id": r["user_id"],
+                "quiz_id": r["quiz_id"],
+                "total_scored": r["total_scored"],
+                "time_stamp_of_attempt": datetime.fromisoformat(r["time_stamp_of_attempt"]),
+                "time_started": datetime.fromisoformat(r["time_started"]) if r.get("time_started") else None,
+                "paper_seed": r.get("paper_seed"),
+                "spool_key": r.get("key"),
+            }
+            for r in records
+        ]
+        with self.app.app_context():
+            try:
+                # Rows of a segment replayed after it was committed are there already
+                keys = [row["spool_key"] for row in rows if row["spool_key"] is not None]
+                if keys:
+                    done = set(db.session.scalars(select(Scores.spool_key).where(Scores.spool_key.in_(keys))))
+                    if done:
+                        records = [r for r, row in zip(records, rows) if row["spool_key"] not in done]
+                        rows = [row for row in rows if row["spool_key"] not in done]
+                        logger.warning(f"Skipped {len(done)} spooled scores that were already inserted")
+                        if not rows:
+                            return
+                scores_ids = db.session.scalars(insert(Scores).returning(Scores.id, sort_by_parameter_order=True), rows).all()
+                record_attempts([(scores_id, r["user_id"], r["quiz_id"], r["total_scored"]) for scores_id, r in zip(scores_ids, rows)])
+                store_answers([
+                    {"scores_id": scores_id, "question_id": int(q_id), "selected_option": option}
+                    for scores_id, r in zip(scores_ids, records)
+                    for q_id, option in r.get("answers", {}).items()
+                ])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _open_spool(self):
+        # Created and locked under a name the replay glob does not match, then moved into
+        # place: another process must never see the new spool unlocked and replay it
+        temporary = os.path.join(self._spool_dir, f".{os.path.basename(self._spool_path)}.new")
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.replace(temporary, self._spool_path)
+        self._spool = os.fdopen(fd, "a", encoding="utf-8")
+
+    def _replay_orphaned_spools(self):
+        # Spools whose owning process is gone are no longer flock'ed
+        for path in sorted(glob.glob(os.path.join(self._spool_dir, "scores-*.jsonl*"))):
+            if path == self._spool_path:
+                continue
+            try:
+                f = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                # A crash mid-write can leave a truncated last line
+                records = []
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass
+                try:
+                    if records:
+                        self._insert(records)
+                except Exception as e:
+                    logger.error(f"Could not replay score spool {path}: {e}")
+                    continue
+                os.remove(path)
+                logger.info(f"Replayed {len(records)} spooled scores from {path}")
+
+
+score_writer = ScoreWriteBehind()
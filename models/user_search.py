@@ -0,0 +1,97 @@
+import re
+from sqlalchemy import text
+from models.models import db, User
+
+# External-content FTS5 index over the user table, kept in sync by triggers
+# so register and delete_user need no extra code.
+FTS_TABLE = "user_search"
+
+CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        username, full_name, email, qualification,
+        content='user', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON user BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, username, full_name, email, qualification)
+        VALUES (new.id, new.username, new.full_name, new.email, new.qualification);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON user BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, username, full_name, email, qualification)
+        VALUES ('delete', old.id, old.username, old.full_name, old.email, old.qualification);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_au AFTER UPDATE ON user BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, username, full_name, email, qualification)
+        VALUES ('delete', old.id, old.username, old.full_name, old.email, old.qualification);
+        INSERT INTO {FTS_TABLE}(rowid, username, full_name, email, qualification)
+        VALUES (new.id, new.username, new.full_name, new.email, new.qualification);
+    END""",
+]
+
+_index_ready = None
+
+
+def fts_supported(connection):
+    if connection.dialect.name != "sqlite":
+        return False
+    options = {row[0] for row in connection.execute(text("PRAGMA compile_options"))}
+    return "ENABLE_FTS5" in options
+
+
+def create_user_search_index(connection):
+    """Create the FTS5 index and its triggers, and backfill it from existing users."""
+    if not fts_supported(connection):
+        return False
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    for statement in CREATE_STATEMENTS:
+        connection.execute(text(statement))
+    if not exists:
+        # Username matches weigh most, then full name and email, then qualification
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 5.0, 5.0, 1.0)')"))
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def index_ready():
+    global _index_ready
+    if _index_ready is None:
+        with db.engine.connect() as connection:
+            _index_ready = fts_supported(connection) and connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+            ).first() is not None
+    return _index_ready
+
+
+def match_expression(search_query):
+    # Every word must match as a prefix of some indexed token: "jo gm" -> "jo"* AND "gm"*
+    words = re.findall(r"\w+", search_query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_users(search_query, offset=0, limit=None):
+    """Rank users matching ``search_query`` on username, full name, email and qualification.
+
+    Falls back to the old username ILIKE scan when the database has no FTS5 index.
+    """
+    if not index_ready():
+        users = User.query.filter(User.username.ilike(f"%{search_query}%")).order_by(User.id)
+        return users.offset(offset).limit(limit).all() if limit else users.yield_per(1000)
+
+    expression = match_expression(search_query)
+    if not expression:
+        return []
+
+    # Rank and limit inside the index first, then join only the rows on this page
+    params = {"expression": expression}
+    page = ""
+    if limit:
+        page = " LIMIT :limit OFFSET :offset"
+        params.update(limit=limit, offset=offset)
+    statement = (
+        f"SELECT u.id, u.username, u.email, u.full_name, u.qualification "
+        f"FROM (SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :expression "
+        f"ORDER BY rank{page}) AS hits "
+        f"JOIN user AS u ON u.id = hits.rowid ORDER BY hits.rank, u.id"
+    )
+    return db.session.execute(text(statement), params).all()
@@ -0,0 +1,80 @@
+import os
+import sys
+from datetime import date, time as dtime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, init_db
+from models.models import db, User, Subject, Chapter, Quiz, Question, Scores
+from models.aggregates import rebuild_all
+from models.answer_keys import answer_key_cache
+from models.catalog import catalog
+from models.schedule import schedule
+from models.identity_cache import identity_cache
+from controllers.fragment_cache import quiz_fragments
+from controllers.password_hashing import login_throttle
+
+STUDENT_ID = 2
+QUIZ_ID = 1
+POOLED_QUIZ_ID = 2
+QUESTIONS = 30
+
+
+def _clear_process_caches():
+    # Caches are per process, not per app: a test must not see another test's database
+    for cache in (answer_key_cache, catalog, schedule, identity_cache, quiz_fragments, login_throttle):
+        cache.clear()
+
+
+@pytest.fixture
+def app_settings():
+    """Config on top of the test defaults; override the fixture in a module to change it."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_settings):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    _clear_process_caches()
+    app = create_app({"TESTING": True, "LOG_LEVEL": "WARNING", **app_settings})
+    with app.app_context():
+        init_db()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    _clear_process_caches()
+
+
+@pytest.fixture
+def seeded(app):
+    """One student, one subject/chapter, a quiz of QUESTIONS questions and a pooled quiz drawing 10."""
+    with app.app_context():
+        db.session.add(User(id=STUDENT_ID, username="student", email="student@example.com", password="x",
+                            full_name="Student", qualification="BSc", dob="2000-01-01"))
+        db.session.add(Subject(id=1, name="Subject"))
+        db.session.add(Chapter(id=1, name="Chapter", subject_id=1))
+        db.session.add(Quiz(id=QUIZ_ID, name="Quiz", chapter_id=1, date=date.today(), duration=dtime(1, 0)))
+        db.session.add(Quiz(id=POOLED_QUIZ_ID, name="Pooled quiz", chapter_id=1, date=date.today(),
+                            duration=dtime(1, 0), sample_size=10))
+        for quiz_id in (QUIZ_ID, POOLED_QUIZ_ID):
+            for n in range(1, QUESTIONS + 1):
+                db.session.add(Question(quiz_id=quiz_id, question_statement=f"Question {n}?", option1="A",
+                                        option2="B", option3="C", option4="D", correct_option=(n % 4) + 1))
+        for n in range(20):
+            db.session.add(Scores(user_id=STUDENT_ID, quiz_id=QUIZ_ID, total_scored=n % QUESTIONS))
+        db.session.commit()
+        rebuild_all()
+    return app
+
+
+def login(client, user_id, is_admin=False):
+    # What auth.login leaves in the session, without going through password hashing
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+        session["user_id"] = user_id
+        session["is_admin"] = is_admin
+    return client
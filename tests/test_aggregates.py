@@ -0,0 +1,71 @@
+import json
+import random
+from datetime import date, time as dtime
+
+from models.models import db, User, Subject, Chapter, Quiz, Scores, QuizStats, UserStats
+from models.aggregates import LEADERBOARD_SIZE, rebuild_all
+from models.cascade_delete import remove_user
+
+USERS = 3 * LEADERBOARD_SIZE
+
+
+def _aggregates():
+    return (
+        {s.quiz_id: (s.attempt_count, s.score_sum, s.score_sq_sum, s.max_score, json.loads(s.histogram),
+                     json.loads(s.leaderboard)) for s in QuizStats.query},
+        {s.user_id: (s.attempt_count, s.score_sum, s.score_sq_sum, s.max_score, json.loads(s.histogram))
+         for s in UserStats.query},
+    )
+
+
+def _seed(app):
+    rng = random.Random(7)
+    with app.app_context():
+        db.session.add(Subject(id=1, name="Subject"))
+        db.session.add(Chapter(id=1, name="Chapter", subject_id=1))
+        for quiz_id in (1, 2, 3):
+            db.session.add(Quiz(id=quiz_id, name=f"Quiz {quiz_id}", chapter_id=1, date=date.today(),
+                                duration=dtime(1, 0)))
+        for user_id in range(2, USERS + 2):
+            db.session.add(User(id=user_id, username=f"u{user_id}", email=f"u{user_id}@example.com", password="x"))
+        db.session.flush()
+        for user_id in range(2, USERS + 2):
+            for _ in range(3):
+                db.session.add(Scores(user_id=user_id, quiz_id=1, total_scored=rng.randint(0, 20)))
+            if user_id < 6:  # quiz 2: a board that is not full
+                db.session.add(Scores(user_id=user_id, quiz_id=2, total_scored=rng.randint(0, 20)))
+        db.session.add(Scores(user_id=2, quiz_id=3, total_scored=5))  # quiz 3: this user's attempt only
+        db.session.commit()
+        rebuild_all()
+
+
+def _best_user(quiz_id):
+    return json.loads(db.session.get(QuizStats, quiz_id).leaderboard)[0][2]
+
+
+def _check_delete(app, pick):
+    _seed(app)
+    with app.app_context():
+        remove_user(pick())
+        db.session.expire_all()
+        incremental = _aggregates()
+        rebuild_all()
+        db.session.expire_all()
+        assert incremental == _aggregates()
+
+
+def test_removing_a_user_off_the_leaderboards_matches_a_rebuild(app):
+    def pick():
+        top = {entry[2] for entry in json.loads(db.session.get(QuizStats, 1).leaderboard)}
+        return min(user_id for user_id in range(2, USERS + 2) if user_id not in top)
+    _check_delete(app, pick)
+
+
+def test_removing_a_leader_matches_a_rebuild(app):
+    _check_delete(app, lambda: _best_user(1))
+
+
+def test_removing_the_only_attempter_drops_the_quiz_stats(app):
+    _check_delete(app, lambda: 2)
+    with app.app_context():
+        assert db.session.get(QuizStats, 3) is None
@@ -0,0 +1,88 @@
+import re
+import time
+from datetime import time as dtime
+
+from models.attempt_sessions import attempt_sessions
+from models.schedule import in_window
+from conftest import login, POOLED_QUIZ_ID, STUDENT_ID
+
+
+def _saved_attempt(client, quiz_id):
+    with client.session_transaction() as session:
+        return session.get("attempts", {}).get(str(quiz_id))
+
+
+def test_cookie_decides_which_attempt_is_open():
+    user_id, quiz_id = 90001, 1
+    opened = attempt_sessions.start(user_id, quiz_id, dtime(1, 0))
+    saved = opened.to_cookie()
+
+    assert attempt_sessions.resume(user_id, quiz_id, saved) is opened
+    # No cookie entry: submitted through another worker, so the copy here is dropped
+    assert attempt_sessions.resume(user_id, quiz_id, None) is None
+    assert attempt_sessions.get(user_id, quiz_id) is None
+    # A cookie entry this worker has not seen is taken over
+    resumed = attempt_sessions.resume(user_id, quiz_id, saved)
+    assert resumed is not opened and resumed.started_at == opened.started_at
+    attempt_sessions.resume(user_id, quiz_id, None)
+
+
+def test_reopening_after_a_submit_on_another_worker_starts_a_new_attempt(seeded):
+    student = login(seeded.test_client(), STUDENT_ID)
+    assert student.get(f"/user/quiz/{POOLED_QUIZ_ID}/attempt").status_code == 200
+    first = _saved_attempt(student, POOLED_QUIZ_ID)
+
+    assert student.post(f"/user/quiz/{POOLED_QUIZ_ID}/attempt", data={}).status_code == 302
+    assert _saved_attempt(student, POOLED_QUIZ_ID) is None
+    # The worker that served the first GET still holds the attempt in memory
+    attempt_sessions.resume(STUDENT_ID, POOLED_QUIZ_ID, first)
+
+    assert student.get(f"/user/quiz/{POOLED_QUIZ_ID}/attempt").status_code == 200
+    second = _saved_attempt(student, POOLED_QUIZ_ID)
+    assert second[0] != first[0]  # started_at
+    assert second[2] != first[2]  # seed, so a new paper
+
+
+def _paper(client, quiz_id):
+    html = client.get(f"/user/quiz/{quiz_id}/attempt").get_data(as_text=True)
+    return list(dict.fromkeys(re.findall(r'name="q(\d+)"', html)))
+
+
+def test_paper_is_drawn_again_from_the_cookie_on_another_worker(seeded):
+    student = login(seeded.test_client(), STUDENT_ID)
+    paper = _paper(student, POOLED_QUIZ_ID)
+    saved = _saved_attempt(student, POOLED_QUIZ_ID)
+    assert len(paper) == 10
+    assert len(saved) == 4 and not any(isinstance(value, list) for value in saved)  # no question ids
+
+    # Another worker only has the cookie
+    attempt_sessions.resume(STUDENT_ID, POOLED_QUIZ_ID, None)
+    with student.session_transaction() as session:
+        session["attempts"] = {str(POOLED_QUIZ_ID): saved}
+    assert _paper(student, POOLED_QUIZ_ID) == paper
+
+
+def test_expired_attempts_are_pruned_from_the_cookie(seeded):
+    student = login(seeded.test_client(), STUDENT_ID)
+    with student.session_transaction() as session:
+        session["attempts"] = {"999": [0.0, 60.0, 1, None], "998": [time.time(), None, 2, None]}
+
+    assert student.get(f"/user/quiz/{POOLED_QUIZ_ID}/attempt").status_code == 200
+    with student.session_transaction() as session:
+        assert sorted(session["attempts"]) == sorted(["998", str(POOLED_QUIZ_ID)])
+
+
+def test_attempt_open_at_midnight_can_still_be_reloaded(seeded, monkeypatch):
+    student = login(seeded.test_client(), STUDENT_ID)
+    paper = _paper(student, POOLED_QUIZ_ID)
+
+    # Past midnight: the window has closed, the attempt's deadline has not
+    def after_midnight(quiz_date, at=None):
+        return at is not None and in_window(quiz_date, at)
+    monkeypatch.setattr("controllers.user_routes.in_window", after_midnight)
+
+    assert _paper(student, POOLED_QUIZ_ID) == paper
+    attempt_sessions.resume(STUDENT_ID, POOLED_QUIZ_ID, None)
+    with student.session_transaction() as session:
+        session.pop("attempts")
+    assert student.get(f"/user/quiz/{POOLED_QUIZ_ID}/attempt").status_code == 302
@@ -0,0 +1,31 @@
+from sqlalchemy import text
+
+from models.models import db
+from models.migrations import MIGRATIONS, run_migrations, explain_hot_queries
+
+
+def _problems():
+    return {name: problems for name, (plan, problems) in explain_hot_queries().items() if problems}
+
+
+def test_hot_queries_use_indexes_after_migrations(app):
+    with app.app_context():
+        assert run_migrations() == []  # init_db applied them all
+        assert _problems() == {}
+
+
+def test_migrations_rebuild_dropped_indexes(app):
+    # A database from before the migrations: none of the named indexes, schema version 0
+    with app.app_context():
+        indexes = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex_%'"
+        )).scalars().all()
+        for name in indexes:
+            db.session.execute(text(f'DROP INDEX "{name}"'))
+        db.session.execute(text("UPDATE schema_version SET version = 0"))
+        db.session.commit()
+        assert _problems()
+
+        assert len(run_migrations()) == len(MIGRATIONS)
+        assert _problems() == {}
+        assert run_migrations() == []
@@ -0,0 +1,64 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from controllers.password_hashing import normalize_method
+from models.models import db, User
+
+PASSWORD = "correct horse"
+
+
+@pytest.mark.parametrize("method", ["pbkdf2", "pbkdf2:sha256", "pbkdf2:sha512", "pbkdf2:sha256:600000",
+                                    "scrypt", "scrypt:16384:8:1"])
+def test_normalized_method_is_the_prefix_werkzeug_writes(method):
+    assert generate_password_hash(PASSWORD, method=method).split("$", 1)[0] == normalize_method(method)
+
+
+def _add_user(app, method):
+    with app.app_context():
+        user = User(username="student", email="student@example.com", full_name="Student", qualification="BSc",
+                    dob="2000-01-01", password=generate_password_hash(PASSWORD, method=method))
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def _stored_hash(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).password
+
+
+def _login(app, password=PASSWORD):
+    return app.test_client().post("/auth/login", data={"email": "student@example.com", "password": password})
+
+
+@pytest.mark.parametrize("app_settings", [{"PASSWORD_HASH_METHOD": "scrypt"}, {"PASSWORD_HASH_METHOD": "pbkdf2"}])
+def test_login_with_an_unchanged_method_does_not_rehash(app, app_settings):
+    user_id = _add_user(app, app_settings["PASSWORD_HASH_METHOD"])
+    stored = _stored_hash(app, user_id)
+
+    for _ in range(2):
+        assert _login(app).status_code == 302
+        assert _stored_hash(app, user_id) == stored
+
+
+@pytest.mark.parametrize("app_settings", [{"PASSWORD_HASH_METHOD": "scrypt"}])
+def test_login_with_an_outdated_method_rehashes_once(app):
+    user_id = _add_user(app, "pbkdf2:sha256:600000")
+
+    assert _login(app).status_code == 302
+    upgraded = _stored_hash(app, user_id)
+    assert upgraded.startswith("scrypt:32768:8:1$")
+    assert _login(app).status_code == 302
+    assert _stored_hash(app, user_id) == upgraded
+
+
+@pytest.mark.parametrize("app_settings", [{"PASSWORD_HASH_METHOD": "scrypt", "LOGIN_LIMIT_PER_ACCOUNT": 3,
+                                           "LOGIN_LIMIT_PER_IP": 3}])
+def test_only_failed_logins_are_throttled(app):
+    _add_user(app, "scrypt")
+
+    for _ in range(5):
+        assert _login(app).status_code == 302
+    for _ in range(3):
+        assert _login(app, "wrong").status_code == 200
+    assert _login(app).status_code == 429
@@ -0,0 +1,107 @@
+import re
+from datetime import date, timedelta, time as dtime
+
+import pytest
+from sqlalchemy import select
+
+from app import create_app
+from models.models import db, User, Subject, Chapter, Quiz, Scores
+from models.aggregates import rebuild_all
+from controllers.query_budget import QueryBudgetExceeded
+from conftest import login, QUIZ_ID, POOLED_QUIZ_ID, STUDENT_ID
+
+# Statements a single request may issue. None of the pages may grow with the number of
+# questions (30 per quiz) or of past attempts: that would be an N+1 query.
+BUDGET = 10
+
+# Values for the URL arguments of the GET routes, all present in the seeded database
+ARGUMENTS = {"quiz_id": QUIZ_ID, "chapter_id": 1, "subject_id": 1, "question_id": 1, "id": 1}
+
+# Query strings that switch a listing to another code path
+VARIANTS = {
+    "admin.manage_users": ["", "?search=student", "?search=student&all=1"],
+    "admin.manage_quizzes_all": ["", "?all=1"],
+    "admin.export_scores": ["", "?format=jsonl"],
+    "admin.export_questions_view": ["", "?format=jsonl"],
+}
+
+# Rows added on top of the seeded database, so a listing issuing a query per row goes over
+ROWS = 2 * BUDGET
+
+
+def _get_routes():
+    # Every GET route of the user and admin blueprints, from the URL map of a throwaway app
+    app = create_app({"TESTING": True, "LOG_LEVEL": "ERROR", "SQLALCHEMY_DATABASE_URI": "sqlite://"})
+    routes = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.endpoint):
+        if rule.endpoint.split(".")[0] not in ("user", "admin") or "GET" not in rule.methods:
+            continue
+        path = re.sub(r"<(?:\w+:)?(\w+)>", lambda match: str(ARGUMENTS[match.group(1)]), rule.rule)
+        routes.extend((rule.endpoint, path + query) for query in VARIANTS.get(rule.endpoint, [""]))
+    return routes
+
+
+@pytest.fixture
+def app_settings():
+    return {"SQL_QUERY_BUDGET": BUDGET}
+
+
+@pytest.fixture
+def crowded(seeded):
+    with seeded.app_context():
+        for n in range(ROWS):
+            db.session.add(User(username=f"student{n}", email=f"student{n}@example.com", password="x",
+                                full_name=f"Student {n}", qualification="BSc", dob="2000-01-01"))
+            db.session.add(Subject(name=f"Subject {n}"))
+            db.session.add(Chapter(name=f"Chapter {n}", subject_id=1))
+            db.session.add(Quiz(name=f"Quiz {n}", chapter_id=1, date=date.today() + timedelta(days=n % 3),
+                                duration=dtime(1, 0)))
+        db.session.commit()
+        quiz_ids = db.session.scalars(select(Quiz.id)).all()
+        db.session.add_all(Scores(user_id=user_id, quiz_id=quiz_id, total_scored=1)
+                           for user_id in db.session.scalars(select(User.id)) for quiz_id in quiz_ids[:3])
+        db.session.commit()
+        rebuild_all()
+    return seeded
+
+
+@pytest.mark.parametrize("quiz_id", [QUIZ_ID, POOLED_QUIZ_ID])
+def test_student_and_admin_flows_stay_within_budget(seeded, quiz_id):
+    student = login(seeded.test_client(), STUDENT_ID)
+    admin = login(seeded.test_client(), 1, is_admin=True)
+
+    # Twice: cold caches on the first round, warm ones on the second
+    for _ in range(2):
+        assert student.get("/user/dashboard").status_code == 200
+
+        response = student.get(f"/user/quiz/{quiz_id}/attempt")
+        assert response.status_code == 200
+        answers = {name: "1" for name in set(re.findall(r'name="(q\d+)"', response.get_data(as_text=True)))}
+        assert answers
+
+        response = student.post(f"/user/quiz/{quiz_id}/attempt", data=answers)
+        assert response.status_code == 302
+        assert "/result" in response.location
+
+        assert student.get(f"/user/quiz/{quiz_id}/result").status_code == 200
+        assert admin.get(f"/admin/quizzes/{quiz_id}/questions").status_code == 200
+
+
+@pytest.mark.parametrize("app_settings", [{"SQL_QUERY_BUDGET": BUDGET,
+                                           "SQL_QUERY_BUDGET_OVERRIDES": {"user.user_dashboard": 0}}])
+def test_exceeding_the_budget_fails_the_request(seeded):
+    student = login(seeded.test_client(), STUDENT_ID)
+
+    with pytest.raises(QueryBudgetExceeded):
+        student.get("/user/dashboard")
+
+
+@pytest.mark.parametrize("endpoint, path", _get_routes())
+def test_every_get_route_stays_within_budget(crowded, endpoint, path):
+    client = (login(crowded.test_client(), 1, is_admin=True) if endpoint.startswith("admin.")
+              else login(crowded.test_client(), STUDENT_ID))
+
+    # Twice: cold caches on the first request, warm ones on the second
+    for _ in range(2):
+        response = client.get(path)  # raises QueryBudgetExceeded over the budget
+        assert response.status_code < 400, f"{path}: {response.status_code}"
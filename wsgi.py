@@ -0,0 +1,11 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Run `flask --app app init-db` once per deploy first (tables, migrations, default admin).
+Settings come from QUIZMASTER_* environment variables, e.g. QUIZMASTER_SECRET_KEY, and the
+database from DATABASE_URL (see app.create_app and models/database.py).
+"""
+from app import create_app
+
+app = create_app()